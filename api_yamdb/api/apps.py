@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.core.signals import request_finished, request_started
+        from django.db.backends.signals import connection_created
+
+        from .db import (count_connection, prepare_connections,
+                         release_connections)
+
+        connection_created.connect(count_connection)
+        # После close_old_connections Django: соединения, закрытые
+        # по CONN_MAX_AGE, уже не проверяются.
+        request_started.connect(prepare_connections)
+        request_finished.connect(release_connections)
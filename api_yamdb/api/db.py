@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import DB_CONNECTIONS, DB_CONNECTIONS_CLOSED
+
+
+def count_connection(sender, connection, **kwargs):
+    DB_CONNECTIONS.labels(connection.alias).inc()
+
+
+def prepare_connections(**kwargs):
+    """
+    Перед запросом закрывает постоянные соединения потока, простоявшие
+    дольше IDLE_TIMEOUT, и проверяет простоявшие дольше
+    HEALTH_CHECK_AFTER: сервер или балансировщик мог их оборвать.
+    Закрытое соединение откроется заново при первом запросе к БД.
+    """
+    config = settings.DB_POOL
+    now = time.monotonic()
+    for connection in connections.all():
+        released_at = getattr(connection, 'released_at', None)
+        if (connection.connection is None or released_at is None
+                or connection.in_atomic_block):
+            continue
+        idle = now - released_at
+        if idle >= config['IDLE_TIMEOUT']:
+            reason = 'idle'
+        elif (idle >= config['HEALTH_CHECK_AFTER']
+                and not connection.is_usable()):
+            reason = 'unusable'
+        else:
+            continue
+        connection.close()
+        DB_CONNECTIONS_CLOSED.labels(connection.alias, reason).inc()
+
+
+def release_connections(**kwargs):
+    """После запроса запоминает, с какого момента соединения простаивают."""
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.released_at = now
@@ -0,0 +1,43 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGIHandler Django 3.2 перебирает потоковый ответ прямо в цикле
+    событий, и генератор, который читает БД (выгрузки reviews.export),
+    падает с SynchronousOnlyOperation после отправленных заголовков.
+    Здесь каждый кусок потокового ответа берётся в потоке синхронных
+    view: с тем же соединением с БД и без блокировки цикла событий.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            await super().send_response(response, send)
+            return
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()
+        ]
+        headers += [
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        ]
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        part = await next_part(parts, None)
+        while part is not None:
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+            part = await next_part(parts, None)
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
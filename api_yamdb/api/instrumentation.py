@@ -0,0 +1,127 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Границы корзин гистограмм в миллисекундах.
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+PHASES = ('db', 'serialize', 'render', 'total')
+
+
+class RequestTiming:
+    """Замеры одного запроса: время в БД, во view, на рендер и общее."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_finished = None
+        self.finished = None
+        self.db = 0.0
+        self.view_db = 0.0
+        self.queries = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db += elapsed
+            self.queries += 1
+            if self.view_started is not None and self.view_finished is None:
+                self.view_db += elapsed
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+
+    def finish_view(self):
+        # До рендера: дальше время уходит на рендер ответа.
+        self.view_finished = time.perf_counter()
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        if self.view_started is not None and self.view_finished is None:
+            self.view_finished = self.finished
+
+    def durations(self):
+        """Длительности фаз в миллисекундах."""
+        total = self.finished - self.started
+        serialize = render = 0.0
+        if self.view_started is not None and self.view_finished is not None:
+            serialize = max(
+                self.view_finished - self.view_started - self.view_db, 0.0)
+            render = self.finished - self.view_finished
+        return {
+            'db': self.db * 1000,
+            'serialize': serialize * 1000,
+            'render': render * 1000,
+            'total': total * 1000,
+        }
+
+
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS_MS, value)] += 1
+        self.sum += value
+
+    def snapshot(self):
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(BUCKETS_MS + ('+Inf',), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'buckets': buckets, 'sum': round(self.sum, 3),
+                'count': cumulative}
+
+
+class Registry:
+    """Агрегированные в процессе гистограммы по маршруту и действию."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, route, action, durations, queries):
+        with self.lock:
+            series = self.series.get((route, action))
+            if series is None:
+                series = self.series[(route, action)] = {
+                    phase: Histogram() for phase in PHASES + ('queries',)
+                }
+            for phase in PHASES:
+                series[phase].observe(durations[phase])
+            series['queries'].observe(queries)
+
+    def snapshot(self):
+        with self.lock:
+            return [
+                {
+                    'route': route,
+                    'action': action,
+                    **{name: histogram.snapshot()
+                       for name, histogram in series.items()},
+                }
+                for (route, action), series in sorted(
+                    self.series.items(), key=lambda item: str(item[0]))
+            ]
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+
+
+registry = Registry()
+
+
+def get_route(request):
+    """Имя маршрута router_v1 (например, api:title-list) и действие."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved', request.method.lower()
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return match.view_name, action
@@ -0,0 +1,91 @@
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+LATENCY_BUCKETS = (
+    .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUESTS = Counter(
+    'yamdb_http_requests_total',
+    'HTTP-запросы по маршруту, методу и статусу.',
+    ['route', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'yamdb_http_request_duration_seconds',
+    'Время обработки запроса.',
+    ['route', 'method'],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'yamdb_db_queries_per_request',
+    'Количество SQL-запросов на HTTP-запрос (замеряемые запросы).',
+    ['route'],
+    buckets=QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    'yamdb_db_time_seconds',
+    'Время в БД на HTTP-запрос (замеряемые запросы).',
+    ['route'],
+    buckets=LATENCY_BUCKETS,
+)
+RESPONSE_CACHE = Counter(
+    'yamdb_response_cache_total',
+    'Обращения к кэшу ответов: hit, miss, not_modified.',
+    ['namespace', 'result'],
+)
+MAIL_SEND_LATENCY = Histogram(
+    'yamdb_mail_send_duration_seconds',
+    'Время отправки письма из очереди.',
+    buckets=LATENCY_BUCKETS,
+)
+DB_CONNECTIONS = Counter(
+    'yamdb_db_connections_total',
+    'Открытые соединения с БД.',
+    ['alias'],
+)
+DB_CONNECTIONS_CLOSED = Counter(
+    'yamdb_db_connections_closed_total',
+    'Постоянные соединения, закрытые перед запросом: idle, unusable.',
+    ['alias', 'reason'],
+)
+THROTTLE_CHECKS = Counter(
+    'yamdb_throttle_checks_total',
+    'Проверки лимитов запросов: local - по аренде процесса без кэша, '
+    'shared - через общий кэш, denied - отказ.',
+    ['kind', 'result'],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'yamdb_worker_requests_in_progress',
+    'Запросы в обработке во всех живых воркерах.',
+    multiprocess_mode='livesum',
+)
+WORKER_STARTED = Gauge(
+    'yamdb_worker_started_timestamp_seconds',
+    'Время запуска воркера gunicorn.',
+    multiprocess_mode='liveall',
+)
+WORKERS = Gauge(
+    'yamdb_gunicorn_workers',
+    'Число воркеров gunicorn по данным мастер-процесса.',
+    multiprocess_mode='livesum',
+)
+
+
+def get_registry():
+    """
+    В режиме нескольких процессов (PROMETHEUS_MULTIPROC_DIR) метрики
+    собираются из файлов всех воркеров, иначе - из памяти процесса.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics():
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
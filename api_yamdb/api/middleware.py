@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+import zlib
+
+from django.conf import settings
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+
+from .instrumentation import RequestTiming, get_route, registry
+from .metrics import (DB_QUERIES, DB_TIME, REQUEST_LATENCY, REQUESTS,
+                      REQUESTS_IN_PROGRESS)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('api.requests')
+
+# Суффикс кодировки в ETag сжатого ответа: "<etag>-gzip".
+ETAG_ENCODING_RE = re.compile(r'-(br|gzip)"')
+
+
+class AsyncCapableMiddleware:
+    """
+    Middleware, который под ASGI остаётся асинхронным и не переводит
+    запрос в общий синхронный поток Django (тогда асинхронные view
+    выполнялись бы по одному). Наследники реализуют before и after.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Как в django.utils.deprecation.MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.before(request)
+        response = self.get_response(request)
+        return self.after(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.before(request)
+        response = await self.get_response(request)
+        return self.after(request, response, state)
+
+    def before(self, request):
+        return None
+
+    def after(self, request, response, state):
+        return response
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Считает запросы и их длительность для /metrics по маршруту router_v1.
+    Количество и время SQL-запросов берутся из InstrumentationMiddleware
+    для замеряемых (sampled) запросов.
+    """
+
+    def before(self, request):
+        REQUESTS_IN_PROGRESS.inc()
+        return time.perf_counter()
+
+    def after(self, request, response, started):
+        REQUESTS_IN_PROGRESS.dec()
+        route, _ = get_route(request)
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        REQUEST_LATENCY.labels(route, request.method).observe(
+            time.perf_counter() - started)
+        timing = getattr(request, '_timing', None)
+        if timing is not None:
+            DB_QUERIES.labels(route).observe(timing.queries)
+            DB_TIME.labels(route).observe(timing.db)
+        return response
+
+
+class InstrumentationMiddleware(AsyncCapableMiddleware):
+    """
+    Замеряет время в БД, сериализацию (время во view без БД), рендер
+    и общее время запроса. Результат отдаётся в заголовке Server-Timing,
+    пишется в лог одной JSON-строкой и копится в гистограммах.
+    Доля замеряемых запросов задаётся INSTRUMENTATION['SAMPLE_RATE'].
+    Под ASGI запросы к БД выполняются не в потоке middleware, поэтому
+    замер БД подключает асинхронный view (см. reviews.async_views).
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        config = getattr(settings, 'INSTRUMENTATION', {})
+        self.sample_rate = config.get('SAMPLE_RATE', 1.0)
+        self.log_requests = config.get('LOG_REQUESTS', True)
+        if self.is_async:
+            # Иначе Django вызывал бы хуки через общий синхронный поток.
+            self.process_view = self.async_process_view
+            self.process_template_response = (
+                self.async_process_template_response)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timing = self.before(request)
+        if timing is None:
+            return self.get_response(request)
+        with connection.execute_wrapper(timing.db_wrapper):
+            response = self.get_response(request)
+        return self.after(request, response, timing)
+
+    def before(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        request._timing = RequestTiming()
+        return request._timing
+
+    def after(self, request, response, timing):
+        if timing is None:
+            return response
+        timing.finish()
+
+        durations = timing.durations()
+        route, action = get_route(request)
+        response['Server-Timing'] = ', '.join(
+            f'{phase};dur={duration:.2f}'
+            for phase, duration in durations.items()
+        )
+        registry.observe(route, action, durations, timing.queries)
+        if self.log_requests:
+            logger.info(json.dumps({
+                'route': route,
+                'action': action,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': timing.queries,
+                **{f'{phase}_ms': round(duration, 3)
+                   for phase, duration in durations.items()},
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request)
+
+    def process_template_response(self, request, response):
+        self.finish_view(request)
+        return response
+
+    async def async_process_view(self, request, *args):
+        self.start_view(request)
+
+    async def async_process_template_response(self, request, response):
+        self.finish_view(request)
+        return response
+
+    def start_view(self, request):
+        timing = getattr(request, '_timing', None)
+        if timing is not None:
+            timing.start_view()
+
+    def finish_view(self, request):
+        timing = getattr(request, '_timing', None)
+        if timing is not None:
+            timing.finish_view()
+
+
+def parse_accept_encoding(header):
+    """Кодировки из Accept-Encoding с их весами q."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        weight = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding.strip():
+            accepted[coding.strip().lower()] = weight
+    return accepted
+
+
+def compress(content, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(content, quality=config['BROTLI_QUALITY'])
+    # wbits=31 - формат gzip; время в заголовке нулевое, как у Django.
+    compressor = zlib.compressobj(config['GZIP_LEVEL'], zlib.DEFLATED, 31)
+    return compressor.compress(content) + compressor.flush()
+
+
+def add_etag_encoding(etag, encoding):
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+class CompressionMiddleware(AsyncCapableMiddleware):
+    """
+    Сжимает ответы на GET и HEAD (brotli, если есть модуль brotli,
+    иначе gzip - по Accept-Encoding) типов COMPRESSION['CONTENT_TYPES']
+    размером от COMPRESSION['MIN_SIZE'] байт. Ответы на запись не
+    сжимаются: в них бывают токены (атака BREACH).
+
+    ETag сжатого ответа получает суффикс кодировки и остаётся сильным.
+    Суффикс в If-None-Match снимается до view, так что проверка 304
+    в ResponseCacheMixin выполняется без запросов к БД и сериализации,
+    а ответ 304 получает тот ETag, который прислал клиент.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.config = settings.COMPRESSION
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def before(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None, None
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            request.META['HTTP_IF_NONE_MATCH'] = ETAG_ENCODING_RE.sub(
+                '"', if_none_match)
+        accepted = parse_accept_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding in self.encodings:
+            if accepted.get(encoding, accepted.get('*', 0)) > 0:
+                return encoding, if_none_match
+        return None, if_none_match
+
+    def after(self, request, response, state):
+        encoding, if_none_match = state
+        if response.status_code == 304:
+            return self.not_modified(response, encoding, if_none_match)
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if content_type not in self.config['CONTENT_TYPES']:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if (
+            encoding is None
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < self.config['MIN_SIZE']
+        ):
+            return response
+        response.content = compress(response.content, encoding, self.config)
+        response['Content-Length'] = str(len(response.content))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            response['ETag'] = add_etag_encoding(response['ETag'], encoding)
+        return response
+
+    def not_modified(self, response, encoding, if_none_match):
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding and if_none_match and response.has_header('ETag'):
+            etag = add_etag_encoding(response['ETag'], encoding)
+            if etag in if_none_match:
+                response['ETag'] = etag
+        return response
@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from reviews.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                           GetTokenView, ReviewsViewSet, TitleViewSet,
-                           UserRegView, UserViewSet)
+from reviews.async_views import async_read_urls
+from reviews.views import (CategoryViewSet, CommentViewSet, ExportView,
+                           GenreViewSet, GetTokenView, ReviewsViewSet,
+                           SearchView, TitleViewSet, UserRegView, UserViewSet)
+
+from .views import InstrumentationView
 
 app_name = 'api'
 
@@ -32,9 +36,18 @@ router_v1.register(
 )
 router_v1.register('users', UserViewSet, basename='user')
 
+v1_urls = router_v1.urls
+if settings.ASYNC_READ_VIEWS:
+    v1_urls = async_read_urls(
+        v1_urls, (TitleViewSet, ReviewsViewSet, CommentViewSet))
+
 
 urlpatterns = [
-    path('v1/', include(router_v1.urls)),
+    path('v1/', include(v1_urls)),
     path('v1/auth/signup/', UserRegView.as_view(), name='auth_signup'),
     path('v1/auth/token/', GetTokenView.as_view(), name='token'),
+    path('v1/search/', SearchView.as_view(), name='search'),
+    path('v1/export/<str:dataset>/', ExportView.as_view(), name='export'),
+    path('v1/instrumentation/', InstrumentationView.as_view(),
+         name='instrumentation'),
 ]
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from reviews.permissions import IsAdmin
+
+from .instrumentation import BUCKETS_MS, registry
+from .metrics import render_metrics
+
+
+class InstrumentationView(APIView):
+    """Гистограммы времени запросов по маршрутам и действиям процесса."""
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return Response({
+            'buckets_ms': BUCKETS_MS,
+            'series': registry.snapshot(),
+        })
+
+
+def metrics(request):
+    """
+    Метрики в формате Prometheus, собранные со всех воркеров.
+    Без METRICS_TOKEN в настройках метрики закрыты.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token or not constant_time_compare(
+            request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
@@ -1,7 +1,12 @@
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from api.handlers import StreamingASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
-application = get_asgi_application()
+# Как get_asgi_application(), но потоковые ответы (выгрузки) читают БД
+# вне цикла событий.
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
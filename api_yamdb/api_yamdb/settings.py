@@ -2,6 +2,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
@@ -30,6 +32,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.InstrumentationMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +68,17 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 # Database
 
+# DB_POOL_MODE:
+#   persistent - соединение живёт в процессе до DB_CONN_MAX_AGE секунд
+#                и переиспользуется запросами; простаивающие соединения
+#                проверяет и закрывает api.db;
+#   pgbouncer  - то же, но DB_HOST указывает на pgbouncer в режиме
+#                transaction: серверные курсоры отключены;
+#   none       - новое соединение на каждый запрос.
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', default='persistent')
+if DB_POOL_MODE not in ('persistent', 'pgbouncer', 'none'):
+    raise ImproperlyConfigured(f'Неизвестный DB_POOL_MODE: {DB_POOL_MODE}')
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
@@ -70,10 +86,61 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default=5432)
+        'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_MODE == 'none'
+            else int(os.getenv('DB_CONN_MAX_AGE', default=600))
+        ),
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'pgbouncer',
+    }
+}
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', default=5)),
+        # Оборванное соединение обнаруживается без запроса к нему.
+        'keepalives': 1,
+        'keepalives_idle': 60,
+        'keepalives_interval': 10,
+        'keepalives_count': 3,
+    }
+
+# Постоянное соединение, простоявшее дольше HEALTH_CHECK_AFTER секунд,
+# перед запросом проверяется (SELECT 1), дольше IDLE_TIMEOUT - закрывается.
+DB_POOL = {
+    'HEALTH_CHECK_AFTER': int(os.getenv('DB_HEALTH_CHECK_AFTER', default=30)),
+    'IDLE_TIMEOUT': int(os.getenv('DB_CONN_IDLE_TIMEOUT', default=300)),
+}
+
+
+# Cache
+# Кэш ответов и их версии (ETag), счётчики лимитов запросов и время отзыва
+# токенов JWT должны быть общими для всех процессов и контейнеров (web,
+# mail, rankings, команды manage.py). В docker-compose это сервис redis:
+# REDIS_URL задан в docker-compose.yaml. Без REDIS_URL кэш живёт в памяти
+# процесса - для разработки и тестов. Другой backend - CACHE_BACKEND
+# и CACHE_LOCATION.
+REDIS_URL = os.getenv('REDIS_URL', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django_redis.cache.RedisCache' if REDIS_URL
+            else 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=REDIS_URL or 'yamdb'),
     }
 }
 
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', default=300))
+
+# Сжатие ответов API (api.middleware.CompressionMiddleware).
+COMPRESSION = {
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', default=860)),
+    'GZIP_LEVEL': int(os.getenv('COMPRESSION_GZIP_LEVEL', default=6)),
+    'BROTLI_QUALITY': int(os.getenv('COMPRESSION_BROTLI_QUALITY', default=4)),
+    'CONTENT_TYPES': ('application/json',),
+}
+
 
 # Password validation
 
@@ -114,14 +181,44 @@ AUTH_USER_MODEL = 'reviews.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'reviews.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'reviews.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
+    # Сколько прокси перед приложением дописывают адрес клиента
+    # в X-Forwarded-For (nginx в docker-compose); 0 - адрес из REMOTE_ADDR.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
+    # Ограничиваются только запросы записи, см. reviews/throttling.py.
+    'DEFAULT_THROTTLE_CLASSES': [
+        'reviews.throttling.IPThrottle',
+        'reviews.throttling.UserThrottle',
+        'reviews.throttling.RouteThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'ip': os.getenv('THROTTLE_IP_RATE', default='300/min'),
+        'user': os.getenv('THROTTLE_USER_RATE', default='120/min'),
+        'route': None,
+        'signup.ip': os.getenv('THROTTLE_SIGNUP_IP_RATE', default='10/hour'),
+        'signup.route': os.getenv(
+            'THROTTLE_SIGNUP_ROUTE_RATE', default='600/min'),
+        'token.ip': os.getenv('THROTTLE_TOKEN_IP_RATE', default='30/min'),
+    },
+}
 
+# Счётчики лимитов должны быть общими для всех воркеров: по умолчанию
+# это кэш default, в docker-compose - redis (см. CACHES).
+THROTTLING = {
+    'CACHE': os.getenv('THROTTLE_CACHE', default='default'),
+    'FAST_PATH_SHARE': float(
+        os.getenv('THROTTLE_FAST_PATH_SHARE', default=0.5)),
+    'LEASE_SHARE': float(os.getenv('THROTTLE_LEASE_SHARE', default=0.1)),
 }
 
 SIMPLE_JWT = {
@@ -129,6 +226,12 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Пользователь собирается из claims токена без запроса к БД;
+# '0' - пользователь читается из БД на каждый запрос.
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', default='1') == '1'
+# Сколько секунд процесс помнит время отзыва токенов пользователя.
+JWT_DENYLIST_LOCAL_TTL = int(os.getenv('JWT_DENYLIST_LOCAL_TTL', default=5))
+
 # Static files (CSS, JavaScript, Images)
 
 STATIC_URL = '/static/'
@@ -138,12 +241,74 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 
 
+# Request instrumentation (Server-Timing, логи запросов, гистограммы)
+
+INSTRUMENTATION = {
+    'SAMPLE_RATE': float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', default=1.0)),
+    'LOG_REQUESTS': os.getenv('INSTRUMENTATION_LOG_REQUESTS', default='1') == '1',
+}
+
+# Асинхронное чтение произведений, отзывов и комментариев под ASGI
+# (см. reviews.async_views); asgi.py включает его по умолчанию.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='0') == '1'
+
+# Токен для /metrics (Authorization: Bearer <token>); пустой - /metrics
+# отвечает 403.
+# Для нескольких воркеров gunicorn задайте PROMETHEUS_MULTIPROC_DIR
+# (см. gunicorn.conf.py).
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Mail server emulation
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь исходящих писем (см. команду send_mail_queue).
+# Задержка повтора удваивается с каждой попыткой до MAX_RETRY_DELAY секунд.
+# Взятое в работу письмо другие обработчики не трогают CLAIM_TIMEOUT секунд:
+# после падения обработчика оно уйдёт повторно через это время.
+MAIL_QUEUE = {
+    'BATCH_SIZE': int(os.getenv('MAIL_QUEUE_BATCH_SIZE', default=100)),
+    'MAX_ATTEMPTS': int(os.getenv('MAIL_QUEUE_MAX_ATTEMPTS', default=5)),
+    'RETRY_DELAY': int(os.getenv('MAIL_QUEUE_RETRY_DELAY', default=30)),
+    'MAX_RETRY_DELAY': int(os.getenv('MAIL_QUEUE_MAX_RETRY_DELAY', default=3600)),
+    'POLL_INTERVAL': float(os.getenv('MAIL_QUEUE_POLL_INTERVAL', default=2)),
+    'CLAIM_TIMEOUT': int(os.getenv('MAIL_QUEUE_CLAIM_TIMEOUT', default=300)),
+}
+
+# Срок действия кода подтверждения из письма регистрации, секунды.
+CONFIRMATION_CODE_TTL = int(
+    os.getenv('CONFIRMATION_CODE_TTL', default=24 * 60 * 60))
+
 # Rating settings
 RATING_SCORE = {
     'max': 10,
     'min': 1
 }
+
+# Рейтинги произведений (см. команду refresh_rankings): минимум оценок
+# для байесовского среднего и окно в днях для трендов.
+RANKINGS = {
+    'MIN_VOTES': int(os.getenv('RANKINGS_MIN_VOTES', default=5)),
+    'TRENDING_DAYS': int(os.getenv('RANKINGS_TRENDING_DAYS', default=7)),
+}
+
+# Full-text search (конфигурация to_tsvector для PostgreSQL)
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='simple')
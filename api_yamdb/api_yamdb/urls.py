@@ -1,9 +1,11 @@
+from api.views import metrics
 from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
 
 urlpatterns = [
     path('api/', include('api.urls')),
+    path('metrics', metrics, name='metrics'),
     path('admin/', admin.site.urls),
     path(
         'redoc/',
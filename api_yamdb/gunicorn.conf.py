@@ -0,0 +1,35 @@
+"""
+Настройки gunicorn для сбора метрик со всех воркеров.
+Каждый воркер пишет метрики в файлы PROMETHEUS_MULTIPROC_DIR,
+а /metrics в любом воркере агрегирует их.
+"""
+import os
+import shutil
+import time
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/yamdb-metrics')
+
+# Файлы прошлого запуска дали бы неверные счётчики. Конфиг перечитывается
+# при HUP, поэтому каталог очищается только при первом запуске мастера.
+if not os.environ.get('YAMDB_METRICS_DIR_READY'):
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+    os.environ['YAMDB_METRICS_DIR_READY'] = '1'
+
+
+def post_fork(server, worker):
+    from api.metrics import WORKER_STARTED
+
+    WORKER_STARTED.set(time.time())
+
+
+def nworkers_changed(server, new_value, old_value):
+    from api.metrics import WORKERS
+
+    WORKERS.set(new_value)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (Category, Comment, Genre, OutgoingEmail, Review,
+                            Title, User)
 
 
 @admin.register(User)
@@ -63,8 +64,12 @@ class TitleAdmin(admin.ModelAdmin):
     )
     search_fields = ('name',)
     list_filter = ('category',)
+    list_select_related = ('category',)
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('genre')
+
     def genre_info(self, object):
         return ", ".join([genre.name for genre in object.genre.all()])
 
@@ -102,3 +107,21 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ('review',)
     list_filter = ('author', 'review')
     empty_value_display = '-пусто-'
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    """Настройки админ панели для очереди писем."""
+
+    list_display = (
+        'pk',
+        'recipient',
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at',
+    )
+    list_filter = ('status',)
+    search_fields = ('recipient',)
+    empty_value_display = '-пусто-'
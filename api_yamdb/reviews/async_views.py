@@ -0,0 +1,64 @@
+import functools
+from contextlib import nullcontext
+
+from api.db import prepare_connections, release_connections
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+from django.http import HttpResponse
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+
+def run_view(view, request, *args, **kwargs):
+    """
+    Выполняет view DRF в потоке пула: запросы к БД, сериализацию и рендер.
+    Соединения с БД в потоках пула закрываются по тем же правилам
+    CONN_MAX_AGE и проверок простоя, что и в обычном цикле запроса.
+    """
+    close_old_connections()
+    prepare_connections()
+    timing = getattr(request, '_timing', None)
+    wrapper = (connection.execute_wrapper(timing.db_wrapper)
+               if timing is not None else nullcontext())
+    try:
+        with wrapper:
+            response = view(request, *args, **kwargs)
+            if timing is not None:
+                timing.finish_view()
+            response.render()
+    finally:
+        close_old_connections()
+        release_connections()
+    # Готовый ответ без render(): Django не станет переходить ради него
+    # в синхронный поток.
+    return HttpResponse(
+        response.content,
+        status=response.status_code,
+        headers=response.headers,
+    )
+
+
+def async_read_view(view):
+    """
+    Асинхронная обёртка view набора DRF. Чтение (GET, HEAD, OPTIONS)
+    выполняется в пуле потоков параллельно с другими запросами, запись -
+    как у синхронных view, в общем синхронном потоке Django.
+    Ответы и права доступа те же, что у исходного view.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await sync_to_async(
+            run_view, thread_sensitive=request.method not in SAFE_METHODS,
+        )(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_read_urls(urls, viewsets):
+    """Заменяет view указанных наборов в маршрутах роутера на асинхронные."""
+    return [
+        URLPattern(pattern.pattern, async_read_view(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if getattr(pattern.callback, 'cls', None) in viewsets else pattern
+        for pattern in urls
+    ]
@@ -0,0 +1,133 @@
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .cache import is_shared
+from .models import User
+
+DENYLIST_KEY = 'jwt-revoked-at:{}'
+
+# Локальная копия денилиста: user_id -> (действует до, время отзыва).
+_local_denylist = {}
+
+
+class ClaimsAccessToken(AccessToken):
+    """Токен доступа с ролью и флагами пользователя в claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['iat'] = time.time()
+        token['role'] = user.role
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """
+    Пользователь, собранный из claims токена без запроса к БД.
+    Для записи в БД используется pk, не сам объект.
+    """
+
+    @cached_property
+    def role(self):
+        return self.token.get('role', User.USER)
+
+    @property
+    def is_admin(self):
+        return self.role == User.ADMIN or self.is_superuser
+
+    @property
+    def is_moderator(self):
+        return self.role == User.MODERATOR or self.is_staff
+
+
+def get_denylist_timeout():
+    return int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+
+def revoke_user_tokens(user_id):
+    """
+    Отзывает токены пользователя, выпущенные до этого момента. Время отзыва
+    хранится в строке пользователя; общий кэш только ускоряет его чтение,
+    поэтому вытеснение ключа или перезапуск кэша отзыв не теряют.
+    """
+    revoked_at = time.time()
+    User.objects.filter(pk=user_id).update(
+        tokens_revoked_at=datetime.fromtimestamp(revoked_at, timezone.utc))
+    if is_shared():
+        key = DENYLIST_KEY.format(user_id)
+        cache.set(key, revoked_at, timeout=get_denylist_timeout())
+        # Повтор после фиксации: читатель мог положить в кэш старое
+        # значение из БД между вытеснением ключа и фиксацией транзакции.
+        transaction.on_commit(lambda: cache.set(
+            key, revoked_at, timeout=get_denylist_timeout()))
+    _local_denylist.pop(user_id, None)
+    return revoked_at
+
+
+def read_revoked_at(user_id):
+    """
+    Время отзыва из БД: 0 - токены не отзывались, бесконечность -
+    пользователя больше нет.
+    """
+    row = User.objects.filter(pk=user_id).values_list(
+        'tokens_revoked_at', flat=True)
+    if not row:
+        return float('inf')
+    return row[0].timestamp() if row[0] else 0
+
+
+def get_revoked_at(user_id):
+    """
+    Время отзыва токенов пользователя. Ответ запоминается в процессе
+    на JWT_DENYLIST_LOCAL_TTL секунд: отзыв доходит до других процессов
+    с такой задержкой. Промах общего кэша читается из БД; кэш в памяти
+    процесса отзывы других процессов не видит и не используется.
+    """
+    now = time.monotonic()
+    local = _local_denylist.get(user_id)
+    if local is not None and local[0] > now:
+        return local[1]
+    if is_shared():
+        key = DENYLIST_KEY.format(user_id)
+        revoked_at = cache.get(key)
+        if revoked_at is None:
+            revoked_at = read_revoked_at(user_id)
+            # add, а не set: значение, записанное отзывом, не затирается.
+            cache.add(key, revoked_at, timeout=get_denylist_timeout())
+    else:
+        revoked_at = read_revoked_at(user_id)
+    _local_denylist[user_id] = (
+        now + settings.JWT_DENYLIST_LOCAL_TTL, revoked_at)
+    return revoked_at
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    Собирает пользователя из claims токена (см. ClaimsAccessToken),
+    отозванные токены и токены удалённых пользователей отсекаются
+    по времени отзыва (get_revoked_at). Токены без claims роли
+    и JWT_STATELESS_AUTH = False - пользователь читается из БД,
+    как в JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_STATELESS_AUTH or 'role' not in validated_token:
+            return super().get_user(validated_token)
+        user = ClaimsUser(validated_token)
+        revoked_at = get_revoked_at(user.pk)
+        if validated_token.get('iat', 0) <= revoked_at:
+            raise AuthenticationFailed(
+                'Токен отозван', code='token_revoked')
+        return user
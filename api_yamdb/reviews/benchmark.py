@@ -0,0 +1,352 @@
+import gzip
+import json
+import math
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .confirmation import make_confirmation_code
+from .models import (Category, Comment, Genre, GenreTitle, OutgoingEmail,
+                     Review, Title, User)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BENCH_PREFIX = 'bench'
+
+# Бюджеты по умолчанию: запросов к БД на один HTTP-запрос и p95 в мс.
+DEFAULT_BUDGETS = {
+    'titles-list': {'queries': 3, 'p95_ms': 250},
+    'titles-detail': {'queries': 2, 'p95_ms': 250},
+    'titles-stats': {'queries': 3, 'p95_ms': 250},
+    'genres-list': {'queries': 2, 'p95_ms': 250},
+    'categories-list': {'queries': 2, 'p95_ms': 250},
+    'reviews-list': {'queries': 8, 'p95_ms': 250},
+    'reviews-detail': {'queries': 3, 'p95_ms': 250},
+    'comments-list': {'queries': 8, 'p95_ms': 250},
+    'comments-detail': {'queries': 2, 'p95_ms': 250},
+    'users-list': {'queries': 2, 'p95_ms': 250},
+    'users-detail': {'queries': 1, 'p95_ms': 250},
+}
+
+
+def seed_dataset(titles=100, reviews_per_title=10, comments_per_review=2,
+                 genres=10, categories=5):
+    """
+    Заполняет БД синтетическими данными и возвращает администратора.
+    Отзывы к одному произведению пишут разные пользователи,
+    поэтому пользователей создаётся столько, сколько отзывов на произведение.
+    """
+    User.objects.bulk_create([
+        User(username=f'{BENCH_PREFIX}-user-{i}',
+             email=f'{BENCH_PREFIX}-user-{i}@yamdb.ru')
+        for i in range(max(reviews_per_title, 1))
+    ])
+    users = list(User.objects.filter(
+        username__startswith=f'{BENCH_PREFIX}-user-'
+    ).values_list('pk', flat=True))
+    Category.objects.bulk_create([
+        Category(name=f'Category {i}', slug=f'{BENCH_PREFIX}-category-{i}')
+        for i in range(categories)
+    ])
+    category_ids = list(Category.objects.filter(
+        slug__startswith=f'{BENCH_PREFIX}-'
+    ).values_list('pk', flat=True))
+    Genre.objects.bulk_create([
+        Genre(name=f'Genre {i}', slug=f'{BENCH_PREFIX}-genre-{i}')
+        for i in range(genres)
+    ])
+    genre_ids = list(Genre.objects.filter(
+        slug__startswith=f'{BENCH_PREFIX}-'
+    ).values_list('pk', flat=True))
+
+    Title.objects.bulk_create([
+        Title(
+            name=f'{BENCH_PREFIX} title {i}',
+            year=1900 + i % 120,
+            description='Описание ' * 10,
+            category_id=category_ids[i % len(category_ids)],
+        )
+        for i in range(titles)
+    ], batch_size=1000)
+    title_ids = list(Title.objects.filter(
+        name__startswith=f'{BENCH_PREFIX} title '
+    ).values_list('pk', flat=True))
+    GenreTitle.objects.bulk_create([
+        GenreTitle(title_id=title_id, genre_id=genre_ids[(i + shift) % len(
+            genre_ids)])
+        for i, title_id in enumerate(title_ids)
+        for shift in range(min(2, len(genre_ids)))
+    ], batch_size=1000)
+
+    Review.objects.bulk_create([
+        Review(
+            title_id=title_id,
+            author_id=users[j],
+            text=f'Отзыв {j}',
+            score=1 + (i + j) % 10,
+        )
+        for i, title_id in enumerate(title_ids)
+        for j in range(reviews_per_title)
+    ], batch_size=1000)
+    review_ids = Review.objects.filter(
+        title_id__in=title_ids
+    ).values_list('pk', flat=True)
+    Comment.objects.bulk_create([
+        Comment(review_id=review_id, author_id=users[k % len(users)],
+                text=f'Комментарий {k}')
+        for review_id in review_ids.iterator()
+        for k in range(comments_per_review)
+    ], batch_size=1000)
+    titles = Title.objects.filter(pk__in=title_ids)
+    titles.recalculate_rating()
+    titles.rebuild_histogram()
+    return User.objects.create(
+        username=f'{BENCH_PREFIX}-admin',
+        email=f'{BENCH_PREFIX}-admin@yamdb.ru',
+        role=User.ADMIN,
+    )
+
+
+def get_endpoints(admin):
+    """Список и детальный просмотр каждого маршрута router_v1."""
+    title = Title.objects.filter(review__isnull=False).order_by('pk').first()
+    title = title or Title.objects.order_by('pk').first()
+    review = Review.objects.filter(
+        title=title, comments__isnull=False).order_by('pk').first()
+    review = review or Review.objects.filter(title=title).first()
+    comment = Comment.objects.filter(review=review).order_by('pk').first()
+    endpoints = [
+        ('genres-list', reverse('api:genres-list'), None),
+        ('categories-list', reverse('api:categories-list'), None),
+        ('users-list', reverse('api:user-list'), admin),
+        ('users-detail', reverse(
+            'api:user-detail', args=[admin.username]), admin),
+    ]
+    if title is not None:
+        endpoints += [
+            ('titles-list', reverse('api:title-list'), None),
+            ('titles-detail', reverse('api:title-detail', args=[title.pk]),
+             None),
+            ('titles-stats', reverse('api:title-stats', args=[title.pk]),
+             None),
+        ]
+    if review is not None:
+        endpoints += [
+            ('reviews-list', reverse('api:review-list', args=[title.pk]),
+             None),
+            ('reviews-detail', reverse(
+                'api:review-detail', args=[title.pk, review.pk]), None),
+        ]
+    if comment is not None:
+        endpoints += [
+            ('comments-list', reverse(
+                'api:comments-list', args=[title.pk, review.pk]), None),
+            ('comments-detail', reverse(
+                'api:comments-detail', args=[title.pk, review.pk, comment.pk]
+            ), None),
+        ]
+    return endpoints
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def measure(client, url, repeat=20, user=None, params=None, headers=None):
+    """
+    Замеряет запросы к БД, задержку и количество сериализованных строк.
+    bytes - размер тела в том виде, в каком оно уходит клиенту
+    (сжатое, если в headers передан Accept-Encoding).
+    """
+    client.force_authenticate(user=user)
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url, params or {}, **(headers or {}))
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context))
+    content = response.content
+    if response.get('Content-Encoding') == 'gzip':
+        content = gzip.decompress(content)
+    elif response.get('Content-Encoding') == 'br':
+        content = brotli.decompress(content)
+    data = json.loads(content)
+    if isinstance(data, dict) and 'results' in data:
+        rows = len(data['results'])
+    elif isinstance(data, list):
+        rows = len(data)
+    else:
+        rows = 1
+    return {
+        'url': url,
+        'status': response.status_code,
+        'queries': max(queries),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'rows': rows,
+        'bytes': len(response.content),
+        'raw_bytes': len(content),
+    }
+
+
+def check_budgets(results, budgets):
+    """Возвращает список превышений бюджетов."""
+    violations = []
+    for name, result in results.items():
+        budget = budgets.get(name, {})
+        for metric, limit in budget.items():
+            if result.get(metric, 0) > limit:
+                violations.append(
+                    f'{name}: {metric}={result[metric]} > {limit}')
+        if result['status'] != 200:
+            violations.append(f'{name}: status={result["status"]}')
+    return violations
+
+
+def run_benchmark(admin, repeat=20, params=None, headers=None):
+    client = APIClient()
+    return {
+        name: measure(client, url, repeat=repeat, user=user, params=params,
+                      headers=headers)
+        for name, url, user in get_endpoints(admin)
+    }
+
+
+def run_signup_benchmark(count=500):
+    """
+    Регистрирует count пользователей и получает для каждого токен:
+    операций в секунду, задержки и запросы к БД на операцию. Код из письма
+    не читается: перед получением токена пользователю записывается
+    новый код, и эта запись в замер не входит. Запросы выполняются
+    без внешней транзакции, как под сервером, поэтому пользователей
+    после замера удаляет delete_signup_users.
+    """
+    client = APIClient()
+    timings = {'signup': [], 'token': []}
+    queries = {'signup': [], 'token': []}
+    errors = {'signup': 0, 'token': 0}
+
+    def call(name, url, data):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.post(url, data)
+            timings[name].append(time.perf_counter() - started)
+        queries[name].append(len(context))
+        errors[name] += response.status_code != 200
+        return response
+
+    for number in range(count):
+        username = f'{BENCH_PREFIX}_signup_{number}'
+        call('signup', reverse('api:auth_signup'), {
+            'username': username, 'email': f'{username}@yamdb.ru'})
+        code, stored_code = make_confirmation_code(username)
+        User.objects.filter(username=username).update(
+            confirmation_code=stored_code)
+        call('token', reverse('api:token'), {
+            'username': username, 'confirmation_code': code})
+    return {
+        name: {
+            'per_second': round(len(values) / sum(values), 1),
+            'p50_ms': round(statistics.median(values) * 1000, 3),
+            'p95_ms': round(percentile(values, 95) * 1000, 3),
+            'queries': max(queries[name]),
+            'errors': errors[name],
+        }
+        for name, values in timings.items()
+    }
+
+
+def delete_signup_users():
+    OutgoingEmail.objects.filter(
+        recipient__startswith=f'{BENCH_PREFIX}_signup_').delete()
+    return User.objects.filter(
+        username__startswith=f'{BENCH_PREFIX}_signup_').delete()
+
+
+def discover_read_paths(base_url, timeout=10):
+    """
+    Пути чтения произведений, отзывов и комментариев на работающем
+    сервере: идентификаторы берутся из первых элементов списков.
+    """
+    paths = ['/api/v1/titles/']
+    titles = requests.get(base_url + paths[0], timeout=timeout).json()
+    if not titles['results']:
+        return paths
+    title = f"/api/v1/titles/{titles['results'][0]['id']}/"
+    paths += [title, title + 'reviews/']
+    reviews = requests.get(base_url + paths[-1], timeout=timeout).json()
+    if reviews['results']:
+        paths.append(
+            f"{title}reviews/{reviews['results'][0]['id']}/comments/")
+    return paths
+
+
+def read_counter(base_url, name, token='', timeout=10):
+    """
+    Сумма значений счётчика Prometheus name по всем меткам на /metrics
+    работающего сервера; None, если метрики недоступны.
+    """
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    try:
+        response = requests.get(
+            base_url + '/metrics', headers=headers, timeout=timeout)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    total = 0.0
+    for line in response.text.splitlines():
+        series, _, value = line.rpartition(' ')
+        if series == name or series.startswith(name + '{'):
+            total += float(value)
+    return total
+
+
+def run_load(base_url, paths, total=500, concurrency=16, timeout=10):
+    """
+    Отправляет total GET-запросов по кругу по paths из concurrency потоков
+    (у каждого потока своё keep-alive соединение) и считает пропускную
+    способность и задержки.
+    """
+    local = threading.local()
+
+    def fetch(number):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = local.session.get(
+                base_url + paths[number % len(paths)], timeout=timeout)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return ok, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, range(total)))
+    elapsed = time.perf_counter() - started
+    timings = [timing for _, timing in results]
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': sum(1 for ok, _ in results if not ok),
+        'rps': round(total / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+    }
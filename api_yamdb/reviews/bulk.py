@@ -0,0 +1,101 @@
+from django.db import connection, transaction
+
+from .cache import invalidate
+from .models import Category, Genre, GenreTitle, Title
+from .search import index_objects
+from .serializers import BulkTitleSerializer
+
+MAX_ITEMS = 1000
+INSERT_BATCH_SIZE = 500
+
+
+def validate_items(items):
+    """
+    Проверяет поля каждого элемента без запросов к БД.
+    Возвращает ошибки по индексам и данные корректных элементов.
+    """
+    errors, valid = {}, []
+    for index, item in enumerate(items):
+        serializer = BulkTitleSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors[index] = serializer.errors
+    return errors, valid
+
+
+def resolve_slugs(valid):
+    """Слаги жанров и категорий всего пакета - по одному запросу."""
+    genre_slugs = {slug for _, data in valid for slug in data['genre']}
+    category_slugs = {data['category'] for _, data in valid}
+    genres = dict(Genre.objects.filter(
+        slug__in=genre_slugs).values_list('slug', 'pk'))
+    categories = dict(Category.objects.filter(
+        slug__in=category_slugs).values_list('slug', 'pk'))
+    return genres, categories
+
+
+def build_title(data, genres, categories):
+    errors = {}
+    missing = [slug for slug in data['genre'] if slug not in genres]
+    if missing:
+        errors['genre'] = [f'Жанры не найдены: {", ".join(missing)}.']
+    if data['category'] not in categories:
+        errors['category'] = [f'Категория не найдена: {data["category"]}.']
+    if errors:
+        return None, errors
+    return Title(
+        name=data['name'],
+        year=data['year'],
+        description=data['description'],
+        category_id=categories[data['category']],
+    ), None
+
+
+def insert_titles(titles):
+    """
+    Вставляет произведения пачками. Без RETURNING (SQLite в Django 3.2)
+    bulk_create не возвращает первичные ключи, там строки сохраняются
+    по одной, а поиск обновляют сигналы.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        Title.objects.bulk_create(titles, batch_size=INSERT_BATCH_SIZE)
+        index_objects(titles)
+    else:
+        for title in titles:
+            title.save()
+
+
+def create_titles(items):
+    """
+    Создаёт произведения из элементов запроса одной транзакцией.
+    Некорректные элементы пропускаются. Возвращает результаты
+    по каждому элементу в порядке запроса.
+    """
+    errors, valid = validate_items(items)
+    genres, categories = resolve_slugs(valid)
+    created = []
+    for index, data in valid:
+        title, title_errors = build_title(data, genres, categories)
+        if title_errors:
+            errors[index] = title_errors
+        else:
+            created.append((index, title, data['genre']))
+
+    with transaction.atomic():
+        insert_titles([title for _, title, _ in created])
+        GenreTitle.objects.bulk_create([
+            GenreTitle(title_id=title.pk, genre_id=genres[slug])
+            for _, title, slugs in created for slug in dict.fromkeys(slugs)
+        ], batch_size=INSERT_BATCH_SIZE)
+        if created:
+            invalidate('titles')
+
+    results = [
+        {'index': index, 'status': 'error', 'errors': item_errors}
+        for index, item_errors in errors.items()
+    ] + [
+        {'index': index, 'status': 'created', 'id': title.pk}
+        for index, title, _ in created
+    ]
+    return sorted(results, key=lambda result: result['index'])
@@ -0,0 +1,86 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'response-version:{}'
+RESPONSE_KEY = 'response:{}:{}:{}'
+# Backend'ы, которые хранят данные в памяти или на диске одного процесса
+# (контейнера): записи в них не видны другим процессам.
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
+
+
+def is_shared(alias='default'):
+    """Общий ли кэш alias для всех процессов и контейнеров."""
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_BACKENDS
+
+
+def get_version_timeout():
+    """
+    Время жизни версии. В общем кэше версия живёт до смены. В кэше
+    процесса смену версии другим процессом (командой, сервисом rankings)
+    не видно, поэтому версия живёт не дольше закэшированного ответа:
+    ответ и ETag устаревают не больше чем на RESPONSE_CACHE_TIMEOUT.
+    """
+    return None if is_shared() else get_timeout()
+
+
+def get_version(namespace):
+    """
+    Возвращает текущую версию пространства имён и время её смены.
+    Ключи закэшированных ответов включают версию, поэтому смена версии
+    делает все старые ответы недостижимыми без перебора ключей.
+    """
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    cache.add(key, (uuid.uuid4().hex, int(time.time())),
+              timeout=get_version_timeout())
+    return cache.get(key)
+
+
+def get_versions(*namespaces):
+    """Общая версия нескольких пространств имён и время последней смены."""
+    versions = [get_version(namespace) for namespace in namespaces]
+    return (
+        ':'.join(version for version, _ in versions),
+        max(changed for _, changed in versions),
+    )
+
+
+def bump_version(*namespaces):
+    now = int(time.time())
+    cache.set_many({
+        VERSION_KEY.format(namespace): (uuid.uuid4().hex, now)
+        for namespace in namespaces
+    }, timeout=get_version_timeout())
+
+
+def invalidate(*namespaces):
+    """
+    Сбрасывает кэш после фиксации транзакции: иначе параллельный запрос
+    успеет положить в кэш старые данные под новой версией.
+    """
+    transaction.on_commit(lambda: bump_version(*namespaces))
+
+
+def response_key(namespace, version, request, variant=''):
+    path = hashlib.md5(
+        (variant + request.get_full_path()).encode()).hexdigest()
+    return RESPONSE_KEY.format(namespace, version, path)
+
+
+def get_etag(key):
+    return '"{}"'.format(hashlib.md5(key.encode()).hexdigest())
+
+
+def get_timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
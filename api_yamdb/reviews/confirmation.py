@@ -0,0 +1,39 @@
+import base64
+import secrets
+import time
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+KEY_SALT = 'reviews.confirmation'
+
+
+def get_digest(username, issued, code):
+    digest = salted_hmac(
+        KEY_SALT, f'{username}:{issued}:{code}', algorithm='sha256'
+    ).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def make_confirmation_code(username, now=None):
+    """
+    Новый код подтверждения и его запись для БД: время выдачи в hex
+    и HMAC от имени пользователя, времени и кода (около 30 символов).
+    Сам код в БД не хранится, а без SECRET_KEY запись не подобрать.
+    """
+    issued = int(time.time() if now is None else now)
+    code = secrets.token_urlsafe(9)
+    return code, f'{issued:x}${get_digest(username, issued, code)}'
+
+
+def check_confirmation_code(username, stored, code, now=None):
+    """Код выдан этому пользователю и не старше CONFIRMATION_CODE_TTL."""
+    issued, separator, digest = stored.partition('$')
+    try:
+        issued = int(issued, 16)
+    except ValueError:
+        return False
+    now = time.time() if now is None else now
+    if not separator or now - issued > settings.CONFIRMATION_CODE_TTL:
+        return False
+    return constant_time_compare(digest, get_digest(username, issued, code))
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from api.metrics import MAIL_SEND_LATENCY
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from reviews.models import OutgoingEmail
+
+
+def enqueue_mail(subject, message, from_email, recipient_list):
+    """
+    Ставит письмо в очередь вместо отправки: аналог send_mail,
+    который не ждёт почтовый сервер.
+    """
+    return OutgoingEmail.objects.bulk_create(
+        OutgoingEmail(subject=subject, body=message,
+                      from_email=from_email, recipient=recipient)
+        for recipient in recipient_list
+    )
+
+
+def get_retry_delay(attempts):
+    config = settings.MAIL_QUEUE
+    return timedelta(seconds=min(
+        config['RETRY_DELAY'] * 2 ** (attempts - 1),
+        config['MAX_RETRY_DELAY'],
+    ))
+
+
+def claim_batch(batch_size):
+    """
+    Берёт в работу письма, которым пора уходить. Строки блокируются только
+    на время захвата: взятым письмам next_attempt_at сдвигается
+    на CLAIM_TIMEOUT, поэтому несколько обработчиков очереди не отправят
+    письмо дважды, а отправка идёт вне транзакции.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING,
+            next_attempt_at__lte=now,
+        ).order_by('next_attempt_at', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        emails = list(queryset[:batch_size])
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(next_attempt_at=now + timedelta(
+            seconds=settings.MAIL_QUEUE['CLAIM_TIMEOUT']))
+    return emails
+
+
+def mark_sent(email):
+    # В письме код подтверждения: после отправки текст не хранится.
+    OutgoingEmail.objects.filter(pk=email.pk).update(
+        body='',
+        status=OutgoingEmail.SENT,
+        sent_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    )
+
+
+def mark_failed(email, error):
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'
+    if email.attempts >= settings.MAIL_QUEUE['MAX_ATTEMPTS']:
+        email.status = OutgoingEmail.FAILED
+        email.body = ''
+    else:
+        email.next_attempt_at = (
+            timezone.now() + get_retry_delay(email.attempts))
+    email.save(update_fields=[
+        'attempts', 'last_error', 'status', 'next_attempt_at', 'body'])
+
+
+def send_batch(mail_connection, batch_size=None):
+    """
+    Отправляет очередную пачку писем через одно соединение с почтовым
+    сервером. Результат каждого письма сохраняется сразу после отправки:
+    ошибка одного письма записывается в его строку и не возвращает
+    в очередь уже отправленные. После ошибки соединение закрывается
+    и открывается заново для следующего письма. Возвращает количество
+    отправленных и неотправленных писем.
+    """
+    batch_size = batch_size or settings.MAIL_QUEUE['BATCH_SIZE']
+    sent = failed = 0
+    for email in claim_batch(batch_size):
+        message = EmailMessage(
+            email.subject, email.body, email.from_email,
+            [email.recipient], connection=mail_connection,
+        )
+        try:
+            mail_connection.open()
+            with MAIL_SEND_LATENCY.time():
+                message.send()
+        except Exception as error:
+            mark_failed(email, error)
+            failed += 1
+            close_quietly(mail_connection)
+        else:
+            mark_sent(email)
+            sent += 1
+    return sent, failed
+
+
+def close_quietly(mail_connection):
+    try:
+        mail_connection.close()
+    except Exception:
+        pass
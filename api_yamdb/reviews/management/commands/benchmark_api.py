@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from reviews.benchmark import (DEFAULT_BUDGETS, check_budgets, run_benchmark,
+                               seed_dataset)
+
+
+class Command(BaseCommand):
+    """
+    Замеряет запросы к БД, p50/p95 и объём ответа для каждого
+    маршрута API на синтетическом наборе данных.
+    По умолчанию данные создаются внутри транзакции, которая
+    откатывается после замеров, так что база остаётся чистой.
+    """
+    help = 'Бенчмарк маршрутов API с проверкой бюджетов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=100)
+        parser.add_argument('--reviews', type=int, default=10,
+                            help='Отзывов на произведение.')
+        parser.add_argument('--comments', type=int, default=2,
+                            help='Комментариев на отзыв.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--page', type=int, default=None)
+        parser.add_argument('--accept-encoding', default=None,
+                            help='Заголовок Accept-Encoding запросов, '
+                                 'например "br, gzip".')
+        parser.add_argument('--budgets', default=None,
+                            help='JSON-файл с бюджетами маршрутов.')
+        parser.add_argument('--output', default=None,
+                            help='Файл для результатов в формате JSON.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Не откатывать созданные данные.')
+
+    def handle(self, *args, **options):
+        budgets = DEFAULT_BUDGETS
+        if options['budgets']:
+            with open(options['budgets'], encoding='utf-8') as file:
+                budgets = {**budgets, **json.load(file)}
+        params = {'page': options['page']} if options['page'] else None
+        headers = None
+        if options['accept_encoding']:
+            headers = {'HTTP_ACCEPT_ENCODING': options['accept_encoding']}
+
+        with transaction.atomic():
+            admin = seed_dataset(
+                titles=options['titles'],
+                reviews_per_title=options['reviews'],
+                comments_per_review=options['comments'],
+            )
+            results = run_benchmark(
+                admin, repeat=options['repeat'], params=params,
+                headers=headers)
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+        report = json.dumps({
+            'dataset': {
+                'titles': options['titles'],
+                'reviews_per_title': options['reviews'],
+                'comments_per_review': options['comments'],
+            },
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+
+        violations = check_budgets(results, budgets)
+        if violations:
+            raise CommandError(
+                'Превышены бюджеты:\n' + '\n'.join(violations))
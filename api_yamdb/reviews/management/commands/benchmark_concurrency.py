@@ -0,0 +1,67 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from reviews.benchmark import discover_read_paths, read_counter, run_load
+
+DB_CONNECTIONS = 'yamdb_db_connections_total'
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает пропускную способность развёртываний (например, gunicorn
+    под WSGI и uvicorn под ASGI) на параллельных запросах чтения
+    произведений, отзывов и комментариев. Серверы запускаются заранее
+    и должны смотреть в одну базу.
+
+    Для каждого прогона по /metrics считается, сколько соединений с БД
+    открыл сервер (db_connections): с постоянными соединениями оно не
+    растёт с числом запросов.
+    """
+    help = 'Нагрузочное сравнение WSGI и ASGI развёртываний.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='имя=URL, например wsgi=http://127.0.0.1:8000; '
+                 'можно указать несколько раз.')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=[1, 8, 32])
+        parser.add_argument('--path', action='append', default=None,
+                            help='Путь для запросов; по умолчанию '
+                                 'определяется по первому произведению.')
+        parser.add_argument('--output', default=None,
+                            help='Файл для результатов в формате JSON.')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, separator, url = target.partition('=')
+            if not separator:
+                raise CommandError(f'Ожидается имя=URL: {target}')
+            targets.append((name, url.rstrip('/')))
+        paths = options['path'] or discover_read_paths(targets[0][1])
+
+        results = {
+            name: [
+                self.run(url, paths, options['requests'], concurrency)
+                for concurrency in options['concurrency']
+            ]
+            for name, url in targets
+        }
+        report = json.dumps({'paths': paths, 'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+
+    def run(self, url, paths, total, concurrency):
+        token = settings.METRICS_TOKEN
+        before = read_counter(url, DB_CONNECTIONS, token)
+        result = run_load(url, paths, total=total, concurrency=concurrency)
+        after = read_counter(url, DB_CONNECTIONS, token)
+        if before is not None and after is not None:
+            result['db_connections'] = int(after - before)
+        return result
@@ -0,0 +1,44 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from reviews.benchmark import delete_signup_users, run_signup_benchmark
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный замер регистрации и выдачи токена по коду подтверждения
+    на текущей базе. Созданные пользователи и письма удаляются после
+    замера. Все регистрации идут с одного адреса, поэтому лимиты
+    запросов на время замера отключены.
+    """
+    help = 'Бенчмарк регистрации: регистраций и токенов в секунду.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500)
+        parser.add_argument('--output', default=None,
+                            help='Файл для результатов в формате JSON.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Не удалять созданных пользователей.')
+
+    def handle(self, *args, **options):
+        delete_signup_users()
+        unthrottled = override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}})
+        try:
+            with unthrottled:
+                results = run_signup_benchmark(options['count'])
+        finally:
+            if not options['keep']:
+                delete_signup_users()
+
+        report = json.dumps({'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+
+        if any(result['errors'] for result in results.values()):
+            raise CommandError('Часть запросов завершилась с ошибкой.')
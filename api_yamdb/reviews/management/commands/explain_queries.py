@@ -0,0 +1,149 @@
+import json
+import re
+
+from api.urls import router_v1
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from reviews.benchmark import seed_dataset
+from reviews.models import Comment, Genre, Review, Title
+
+# Маршруты, где полный просмотр таблицы ожидаем: список без фильтров.
+FULL_SCAN_ALLOWED = ('title', 'genres', 'categories', 'user')
+
+SEQ_SCAN_RE = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'SCAN (\w+)(?! USING)'),
+}
+
+
+def get_plan(queryset):
+    if connection.vendor == 'postgresql':
+        return queryset.explain(analyze=True)
+    return queryset.explain()
+
+
+def find_seq_scans(plan):
+    pattern = SEQ_SCAN_RE.get(connection.vendor)
+    if pattern is None:
+        return []
+    return sorted(set(pattern.findall(plan)))
+
+
+class Command(BaseCommand):
+    """
+    Выполняет EXPLAIN (ANALYZE на PostgreSQL) для queryset каждого
+    маршрута router_v1 и горячих фильтров на синтетических данных
+    и отмечает последовательные сканирования таблиц.
+    """
+    help = 'Проверяет планы запросов маршрутов API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=2000)
+        parser.add_argument('--reviews', type=int, default=10)
+        parser.add_argument('--comments', type=int, default=2)
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Использовать данные, уже лежащие в БД.')
+        parser.add_argument('--fail-on-seq-scan', action='store_true')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options['no_seed']:
+                seed_dataset(
+                    titles=options['titles'],
+                    reviews_per_title=options['reviews'],
+                    comments_per_review=options['comments'],
+                )
+            self.analyze()
+            report = [
+                self.explain(name, queryset)
+                for name, queryset in self.get_probes()
+            ]
+            transaction.set_rollback(not options['no_seed'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            for probe in report:
+                style = self.style.WARNING if probe['flagged'] else str
+                self.stdout.write(style(
+                    f"{probe['name']}: seq scans {probe['seq_scans'] or '-'}"
+                ))
+                self.stdout.write(probe['plan'] + '\n')
+
+        flagged = [probe['name'] for probe in report if probe['flagged']]
+        if flagged and options['fail_on_seq_scan']:
+            raise CommandError(
+                'Последовательное сканирование: ' + ', '.join(flagged))
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            if connection.vendor == 'postgresql':
+                # На небольшом наборе планировщик честно выбирает
+                # Seq Scan; проверяется, может ли запрос взять индекс.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def explain(self, name, queryset):
+        plan = get_plan(queryset)
+        seq_scans = find_seq_scans(plan)
+        return {
+            'name': name,
+            'sql': str(queryset.query),
+            'plan': plan,
+            'seq_scans': seq_scans,
+            'flagged': bool(seq_scans) and name not in FULL_SCAN_ALLOWED,
+        }
+
+    def get_view_queryset(self, viewset, kwargs, params=None):
+        view = viewset(action='list', kwargs=kwargs, format_kwarg=None)
+        view.request = Request(
+            APIRequestFactory().get('/', params or {}))
+        queryset = view.filter_queryset(view.get_queryset())
+        return queryset[:view.paginator.get_page_size(view.request)]
+
+    def get_probes(self):
+        review = Review.objects.filter(
+            comments__isnull=False).order_by('pk').first()
+        title = Title.objects.filter(category__isnull=False).first()
+        genre = Genre.objects.first()
+        url_kwargs = {
+            'title_id': review.title_id if review else 0,
+            'review_id': review.pk if review else 0,
+        }
+        probes = []
+        for prefix, viewset, basename in router_v1.registry:
+            kwargs = {
+                key: value for key, value in url_kwargs.items()
+                if f'<{key}>' in prefix
+            }
+            probes.append(
+                (basename, self.get_view_queryset(viewset, kwargs)))
+        if title is None or review is None or genre is None:
+            return probes
+
+        title_view = next(
+            viewset for _, viewset, basename in router_v1.registry
+            if basename == 'title'
+        )
+        filters = {
+            'titles-by-year': {'year': title.year},
+            'titles-by-category': {'category': title.category.slug},
+            'titles-by-category-year': {
+                'category': title.category.slug, 'year': title.year},
+            'titles-by-genre': {'genre': genre.slug},
+            'titles-by-name': {'name': title.name},
+        }
+        probes += [
+            (name, self.get_view_queryset(title_view, {}, params))
+            for name, params in filters.items()
+        ]
+        probes += [
+            ('review-exists-by-author', Review.objects.filter(
+                title_id=review.title_id, author_id=review.author_id)),
+            ('comments-by-review', Comment.objects.filter(
+                review_id=review.pk).order_by('-pub_date', '-id')[:5]),
+        ]
+        return probes
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from reviews.export import DATASETS, EXPORT_BATCH_SIZE, EXPORT_FORMATS, export
+
+
+class Command(BaseCommand):
+    """
+    Выгружает произведения, отзывы или комментарии в NDJSON или CSV
+    так же, как /api/v1/export/<таблица>/: страницами, без загрузки
+    всей таблицы в память.
+    """
+    help = 'Выгружает таблицу в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=DATASETS)
+        parser.add_argument('--output', choices=EXPORT_FORMATS,
+                            default='ndjson')
+        parser.add_argument('--updated-since', default=None,
+                            help='Только строки, изменённые с этого '
+                                 'момента (ISO 8601).')
+        parser.add_argument('--batch-size', type=int,
+                            default=EXPORT_BATCH_SIZE)
+        parser.add_argument('--file', default=None,
+                            help='Файл выгрузки; по умолчанию stdout.')
+
+    def handle(self, *args, **options):
+        updated_since = self.parse_updated_since(options['updated_since'])
+        chunks = export(options['dataset'], options['output'],
+                        updated_since, options['batch_size'])
+        if options['file'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['file'], 'w', encoding='utf-8',
+                  newline='') as file:
+            file.writelines(chunks)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгрузка записана в {options["file"]}.'))
+
+    def parse_updated_since(self, value):
+        if value is None:
+            return None
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f'Некорректная дата: {value}')
+        if timezone.is_naive(moment):
+            return timezone.make_aware(moment)
+        return moment
@@ -1,73 +1,292 @@
-import csv
-
-from django.core.management.base import BaseCommand, CommandError
-from django.db import IntegrityError, OperationalError
-
-from reviews.models import (Category, Comment, Genre, Reviews, Title,
-                            GenreTitle, User)
-
-TABLE_MODEL = {
-    'users': User,
-    'category': Category,
-    'genre': Genre,
-    'titles': Title,
-    'review': Reviews,
-    'comments': Comment,
-    'genre_title': GenreTitle,
-}
-
-
-class Command(BaseCommand):
-    """
-    Импортирует данные из CSV-таблиц.
-    При обнаружении дубликата/некорректной записи(нет необходимых полей),
-    игнорирует конкретную запись и продолжает импорт дальше.
-    """
-    help = 'Импортирует в проект необходимые данные из csv-таблиц.'
-
-    def get_obj_from_db(self, row):
-        """
-        Функция для получения
-        существующего объекта User или Category из БД.
-        """
-        message = '{} c id {} не существует.'
-
-        if author_id := row.get('author'):
-            try:
-                row['author'] = User.objects.get(pk=author_id)
-            except User.DoesNotExist:
-                raise CommandError(message.format('User', author_id))
-
-        if category_id := row.get('category'):
-            try:
-                row['category'] = Category.objects.get(pk=category_id)
-            except Category.DoesNotExist:
-                raise CommandError(message.format('Category', category_id))
-
-        return row
-
-    def handle(self, *args, **options):
-        """Сами действия при запуске команды."""
-        self.stdout.write(self.style.NOTICE('Импорт начался, ожидайте...'))
-        self.stdout.write(self.style.NOTICE('============================='))
-        for table_name, model_name in TABLE_MODEL.items():
-            with open(f'static/data/{table_name}.csv',
-                      newline='',
-                      encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-
-                for row in reader:
-                    if any([row.get('author'), row.get('category')]):
-                        row = self.get_obj_from_db(row)
-
-                    try:
-                        model_name.objects.create(**row)
-
-                    except OperationalError as e:
-                        raise CommandError(e)
-
-                    except IntegrityError:
-                        continue
-
-        self.stdout.write(self.style.SUCCESS(
-            '\nДанные успешно импортированы!'))
+import csv
+import io
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import (DatabaseError, IntegrityError, OperationalError,
+                       connection, transaction)
+from reviews.cache import invalidate
+from reviews.models import (Category, Comment, Genre, GenreTitle, Review,
+                            Title, User, UserStats)
+from reviews.search import rebuild_index
+
+TABLE_MODEL = {
+    'users': User,
+    'category': Category,
+    'genre': Genre,
+    'titles': Title,
+    'review': Review,
+    'comments': Comment,
+    'genre_title': GenreTitle,
+}
+
+# Колонка CSV -> (поле модели, таблица, на которую она ссылается).
+FOREIGN_KEYS = {
+    'author': ('author_id', 'users'),
+    'category': ('category_id', 'category'),
+    'title_id': ('title_id', 'titles'),
+    'genre_id': ('genre_id', 'genre'),
+    'review_id': ('review_id', 'review'),
+}
+
+UNIQUE_FIELDS = {
+    'users': (('username',), ('email',)),
+    'category': (('slug',),),
+    'genre': (('slug',),),
+    'genre_title': (('title_id', 'genre_id'),),
+    'review': (('title_id', 'author_id'),),
+}
+
+
+class RowRejectedError(Exception):
+    pass
+
+
+class TableLoader:
+    """
+    Проверяет строки одной таблицы по множествам id и уникальных
+    ключей, загруженным из БД один раз перед импортом.
+    """
+
+    def __init__(self, table_name, known_ids):
+        self.table_name = table_name
+        self.model = TABLE_MODEL[table_name]
+        self.known_ids = known_ids
+        self.unique_fields = UNIQUE_FIELDS.get(table_name, ())
+        self.unique_keys = {
+            fields: set(self.model.objects.values_list(*fields))
+            for fields in self.unique_fields
+        }
+
+    def clean(self, row):
+        data = {}
+        for column, value in row.items():
+            if column in FOREIGN_KEYS:
+                field_name, table = FOREIGN_KEYS[column]
+                data[field_name] = self.clean_foreign_key(
+                    field_name, table, value)
+                continue
+            try:
+                field = self.model._meta.get_field(column)
+            except FieldDoesNotExist:
+                raise RowRejectedError(f'неизвестная колонка {column}')
+            try:
+                data[field.attname] = field.clean(value, None)
+            except ValidationError as error:
+                raise RowRejectedError(f'{column}: {" ".join(error.messages)}')
+        return data
+
+    def clean_foreign_key(self, field_name, table, value):
+        if value == '' and self.model._meta.get_field(field_name).null:
+            return None
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise RowRejectedError(
+                f'некорректная ссылка на {table}: {value!r}')
+        if value not in self.known_ids[table]:
+            raise RowRejectedError(f'{table} c id {value} не существует')
+        return value
+
+    def check_unique(self, data):
+        if data.get('id') in self.known_ids[self.table_name]:
+            raise RowRejectedError(f'дубликат id {data["id"]}')
+        keys = []
+        for fields in self.unique_fields:
+            key = tuple(data.get(field) for field in fields)
+            if key in self.unique_keys[fields]:
+                raise RowRejectedError(f'дубликат {", ".join(fields)}: {key}')
+            keys.append((fields, key))
+        return keys
+
+    def build(self, rows):
+        """
+        Возвращает пары (номер строки, объект) для вставки
+        и отклонённые строки.
+        """
+        objects = []
+        rejected = []
+        for line, row in rows:
+            try:
+                data = self.clean(row)
+                keys = self.check_unique(data)
+            except RowRejectedError as error:
+                rejected.append((line, str(error)))
+                continue
+            for fields, key in keys:
+                self.unique_keys[fields].add(key)
+            objects.append((line, self.model(**data)))
+        return objects, rejected
+
+    def remember(self, objects):
+        self.known_ids[self.table_name].update(
+            obj.pk for obj in objects if obj.pk is not None)
+
+
+class Command(BaseCommand):
+    """
+    Импортирует данные из CSV-таблиц.
+    Таблицы читаются пачками, внешние ключи проверяются по множествам id,
+    загруженным один раз, а запись идёт через bulk_create
+    (или COPY на PostgreSQL) по пачке в транзакции.
+    Дубликаты и некорректные записи пропускаются с указанием причины.
+    """
+    help = 'Импортирует в проект необходимые данные из csv-таблиц.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='static/data',
+                            help='Каталог с csv-таблицами.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--method', choices=('auto', 'bulk', 'copy'),
+                            default='auto')
+        parser.add_argument('--tables', nargs='+', choices=TABLE_MODEL,
+                            default=list(TABLE_MODEL))
+        parser.add_argument('--rejects', default=None,
+                            help='CSV-файл для отклонённых строк.')
+
+    def handle(self, *args, **options):
+        """Сами действия при запуске команды."""
+        method = options['method']
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'bulk'
+        elif method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL.')
+        self.write_batch = getattr(self, f'write_{method}')
+        self.batch_size = options['batch_size']
+
+        self.stdout.write(self.style.NOTICE('Импорт начался, ожидайте...'))
+        self.stdout.write(self.style.NOTICE('============================='))
+        known_ids = {
+            table_name: set(model.objects.values_list('pk', flat=True))
+            for table_name, model in TABLE_MODEL.items()
+        }
+        rejects = []
+        for table_name in TABLE_MODEL:
+            if table_name not in options['tables']:
+                continue
+            loader = TableLoader(table_name, known_ids)
+            path = os.path.join(options['path'], f'{table_name}.csv')
+            rejects += [
+                (table_name, line, reason)
+                for line, reason in self.import_table(loader, path)
+            ]
+
+        self.reset_sequences()
+        Title.objects.all().recalculate_rating()
+        Title.objects.all().rebuild_histogram()
+        UserStats.objects.rebuild()
+        invalidate('genres', 'categories', 'titles')
+        self.stdout.write(f'Поисковый индекс: {rebuild_index()} документов')
+        self.report_rejects(rejects, options['rejects'])
+        self.stdout.write(self.style.SUCCESS(
+            '\nДанные успешно импортированы!'))
+
+    def import_table(self, loader, path):
+        started = time.monotonic()
+        inserted = 0
+        rejected = []
+        with open(path, newline='', encoding='utf-8') as file:
+            # Первая строка файла - заголовок.
+            rows = enumerate(csv.DictReader(file), start=2)
+            batches = iter(lambda: list(islice(rows, self.batch_size)), [])
+            for batch in batches:
+                built, batch_rejected = loader.build(batch)
+                rejected += batch_rejected
+                inserted += self.save_batch(loader, built, rejected)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(
+            f'{loader.table_name}: вставлено {inserted}, '
+            f'отклонено {len(rejected)}, '
+            f'{inserted / elapsed:.0f} строк/с'
+        )
+        return rejected
+
+    def save_batch(self, loader, rows, rejected):
+        if not rows:
+            return 0
+        objects = [obj for _, obj in rows]
+        try:
+            with transaction.atomic():
+                self.write_batch(loader.model, objects)
+        except OperationalError as e:
+            raise CommandError(e)
+        except IntegrityError:
+            # Пачка конфликтует с данными, появившимися после загрузки
+            # ключей: сохраняем построчно, чтобы найти виноватые строки.
+            objects = self.save_one_by_one(loader.model, rows, rejected)
+        loader.remember(objects)
+        return len(objects)
+
+    def save_one_by_one(self, model, rows, rejected):
+        saved = []
+        for line, obj in rows:
+            try:
+                with transaction.atomic():
+                    self.write_bulk(model, [obj])
+            except IntegrityError as error:
+                rejected.append((line, str(error).strip()))
+            else:
+                saved.append(obj)
+        return saved
+
+    def write_bulk(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def write_copy(self, model, objects):
+        fields = [
+            field for field in model._meta.concrete_fields
+            if objects[0].pk is not None or not field.primary_key
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objects:
+            writer.writerow([
+                r'\N' if value is None else value
+                for value in (
+                    field.get_db_prep_save(
+                        field.pre_save(obj, add=True), connection)
+                    for field in fields
+                )
+            ])
+        buffer.seek(0)
+        columns = ', '.join(
+            connection.ops.quote_name(field.column) for field in fields)
+        # copy_expert идёт мимо обёртки курсора Django: без
+        # wrap_database_errors конфликт ключей не станет IntegrityError.
+        with connection.cursor() as cursor, connection.wrap_database_errors:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(model._meta.db_table)} '
+                f"({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(TABLE_MODEL.values()))
+        if not statements:
+            return
+        try:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+        except DatabaseError as e:
+            raise CommandError(e)
+
+    def report_rejects(self, rejects, path):
+        if not rejects:
+            return
+        reasons = Counter(
+            (table, reason.split(':')[0]) for table, _, reason in rejects)
+        for (table, reason), count in reasons.most_common():
+            self.stdout.write(self.style.WARNING(
+                f'{table}: {reason} - {count}'))
+        if path:
+            with open(path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(('table', 'line', 'reason'))
+                writer.writerows(rejects)
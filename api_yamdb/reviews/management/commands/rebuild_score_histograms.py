@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.cache import invalidate
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """
+    Пересобирает гистограммы оценок всех произведений одним запросом
+    с группировкой по таблице отзывов. Нужна после массового импорта
+    отзывов в обход сигналов или для исправления расхождений.
+    """
+    help = 'Пересобирает гистограммы оценок произведений.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = Title.objects.all().rebuild_histogram()
+            invalidate('titles')
+        self.stdout.write(self.style.SUCCESS(
+            f'Гистограммы пересобраны: {rows} строк.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Перестраивает поисковый индекс по произведениям, отзывам
+    и комментариям. Нужна после загрузки данных в обход сигналов.
+    """
+    help = 'Перестраивает полнотекстовый поисковый индекс.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано документов: {total}.'))
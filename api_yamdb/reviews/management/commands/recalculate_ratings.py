@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.cache import invalidate
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает рейтинг всех произведений с нуля.
+    Нужна после массового импорта отзывов в обход сигналов
+    или для исправления расхождений.
+    """
+    help = 'Пересчитывает сумму и количество оценок произведений.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Title.objects.all().recalculate_rating()
+            invalidate('titles')
+        self.stdout.write(self.style.SUCCESS(
+            f'Рейтинг пересчитан для {updated} произведений.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from reviews.models import User, UserStats
+
+
+class Command(BaseCommand):
+    """
+    Пересобирает счётчики отзывов и комментариев пользователей с нуля.
+    Нужна после массового импорта в обход сигналов или для исправления
+    расхождений.
+    """
+    help = 'Пересчитывает счётчики отзывов и комментариев пользователей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи; по умолчанию все.')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        rows = UserStats.objects.rebuild(users)
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны: {rows} пользователей.'))
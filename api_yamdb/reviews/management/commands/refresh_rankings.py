@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from reviews.rankings import refresh_rankings
+
+
+class Command(BaseCommand):
+    """
+    Пересобирает таблицу рейтингов (лучшие и набирающие отзывы
+    произведения). С --interval работает постоянно и обновляет
+    рейтинги с заданным периодом.
+    """
+    help = 'Обновляет рейтинги произведений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Период обновления в секундах.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            rows = refresh_rankings()
+            self.stdout.write(self.style.SUCCESS(
+                f'Рейтинги обновлены: {rows} строк '
+                f'за {time.monotonic() - started:.1f} с.'))
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
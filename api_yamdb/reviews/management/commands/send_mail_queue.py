@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from reviews.mail import close_quietly, send_batch
+
+
+class Command(BaseCommand):
+    """
+    Обработчик очереди исходящих писем. Отправляет письма пачками через
+    одно соединение с почтовым сервером, неудачные повторяет с растущей
+    задержкой. Пока очередь пуста, соединение закрыто.
+    """
+    help = 'Отправляет письма из очереди OutgoingEmail.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.MAIL_QUEUE['BATCH_SIZE'])
+        parser.add_argument('--interval', type=float,
+                            default=settings.MAIL_QUEUE['POLL_INTERVAL'],
+                            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument('--once', action='store_true',
+                            help='Разобрать очередь и завершиться.')
+
+    def handle(self, *args, **options):
+        mail_connection = get_connection()
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = send_batch(
+                    mail_connection, options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    continue
+                close_quietly(mail_connection)
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            close_quietly(mail_connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено писем: {total_sent}, ошибок: {total_failed}.'))
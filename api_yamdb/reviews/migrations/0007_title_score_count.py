@@ -0,0 +1,42 @@
+# Generated by Django 3.2.10 on 2026-10-18 04:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_histogram(apps, schema_editor):
+    """Собирает гистограммы оценок по существующим отзывам."""
+    TitleScoreCount = apps.get_model('reviews', 'TitleScoreCount')
+    Review = apps.get_model('reviews', 'Review')
+    quote = schema_editor.connection.ops.quote_name
+    schema_editor.execute(
+        f'INSERT INTO {quote(TitleScoreCount._meta.db_table)} '
+        f'(title_id, score, count) '
+        f'SELECT title_id, score, COUNT(*) '
+        f'FROM {quote(Review._meta.db_table)} '
+        f'GROUP BY title_id, score'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleScoreCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('title', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='score_counts', to='reviews.title')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='titlescorecount',
+            constraint=models.UniqueConstraint(fields=('title', 'score'), name='unique_title_score'),
+        ),
+        migrations.RunPython(fill_histogram, migrations.RunPython.noop),
+    ]
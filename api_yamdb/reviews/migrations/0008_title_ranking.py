@@ -0,0 +1,39 @@
+# Generated by Django 3.2.10 on 2026-10-18 04:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_title_score_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=64)),
+                ('category_slug', models.CharField(blank=True, max_length=50)),
+                ('year', models.IntegerField()),
+                ('rating', models.FloatField(verbose_name='Взвешенный рейтинг')),
+                ('trending', models.FloatField(verbose_name='Отзывов в день')),
+                ('refreshed_at', models.DateTimeField()),
+                ('title', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='reviews.title')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['scope', '-rating', 'title'], name='ranking_scope_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='titleranking',
+            index=models.Index(fields=['scope', '-trending', 'title'], name='ranking_scope_trending_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='titleranking',
+            constraint=models.UniqueConstraint(fields=('title', 'scope'), name='unique_title_ranking_scope'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.10 on 2026-10-18 04:48
+
+from django.db import migrations
+import reviews.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_ranking'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', reviews.models.SignupUserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.10 on 2026-10-18 04:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_user_stats(apps, schema_editor):
+    """Собирает счётчики пользователей по существующим отзывам и комментариям."""
+    UserStats = apps.get_model('reviews', 'UserStats')
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    quote = schema_editor.connection.ops.quote_name
+    schema_editor.execute(
+        f'INSERT INTO {quote(UserStats._meta.db_table)} '
+        f'(user_id, review_count, comment_count, score_sum, last_activity) '
+        f'SELECT author_id, SUM(reviews), SUM(comments), SUM(score), '
+        f'MAX(pub_date) FROM ('
+        f'SELECT author_id, 1 AS reviews, 0 AS comments, score, pub_date '
+        f'FROM {quote(Review._meta.db_table)} '
+        f'UNION ALL '
+        f'SELECT author_id, 0, 1, 0, pub_date '
+        f'FROM {quote(Comment._meta.db_table)}'
+        f') AS activity GROUP BY author_id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_user_managers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.user')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('comment_count', models.PositiveIntegerField(default=0, verbose_name='Количество комментариев')),
+                ('score_sum', models.PositiveIntegerField(default=0, verbose_name='Сумма поставленных оценок')),
+                ('last_activity', models.DateTimeField(null=True, verbose_name='Последний отзыв или комментарий')),
+            ],
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.10 on 2026-10-18 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_title_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='tokens_revoked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Токены отозваны'),
+        ),
+    ]
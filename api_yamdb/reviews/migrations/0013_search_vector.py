@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_CONFIG = getattr(settings, 'SEARCH_CONFIG', 'simple')
+
+
+class PostgreSQLRunSQL(migrations.RunSQL):
+    """RunSQL, который на других базах ничего не делает."""
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(
+                app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(
+                app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    """
+    На PostgreSQL поиск идёт по генерируемому столбцу tsvector
+    с GIN-индексом; на других базах - по таблице SearchTerm.
+    """
+
+    dependencies = [
+        ('reviews', '0012_user_tokens_revoked_at'),
+    ]
+
+    operations = [
+        PostgreSQLRunSQL(
+            sql=[(
+                'ALTER TABLE reviews_searchdocument '
+                'ADD COLUMN IF NOT EXISTS search_vector tsvector '
+                'GENERATED ALWAYS AS '
+                '(to_tsvector(%s::regconfig, body)) STORED',
+                [SEARCH_CONFIG],
+            ), (
+                'CREATE INDEX IF NOT EXISTS '
+                'reviews_searchdocument_vector_idx '
+                'ON reviews_searchdocument USING gin (search_vector)'
+            )],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS reviews_searchdocument_vector_idx',
+                'ALTER TABLE reviews_searchdocument '
+                'DROP COLUMN IF EXISTS search_vector',
+            ],
+        ),
+    ]
@@ -1,5 +1,15 @@
+from api.metrics import RESPONSE_CACHE
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, mixins
 
+from .cache import get_etag, get_timeout, get_versions, response_key
+from .permissions import get_roles
+
 
 class ListCreateDestroyMixin(
         mixins.ListModelMixin,
@@ -7,3 +17,88 @@ class ListCreateDestroyMixin(
         mixins.DestroyModelMixin,
         GenericViewSet):
     pass
+
+
+class ResponseCacheMixin:
+    """
+    Кэширует ответы list (и retrieve, если вьюсет вызывает cached_response)
+    по пути и строке запроса. Ключ включает версии пространств имён
+    из get_cache_namespaces, которые сбрасывают сигналы при записи
+    в связанные модели. ETag выводится из тех же версий, поэтому
+    If-None-Match проверяется до запросов к БД и сериализации.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def get_cache_namespaces(self):
+        return (self.cache_namespace,)
+
+    def get_cache_variant(self, request):
+        """Часть ключа для ответов, которые зависят от пользователя."""
+        variant = getattr(super(), 'get_cache_variant', None)
+        return variant(request) if variant else ''
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        version, last_modified = get_versions(*self.get_cache_namespaces())
+        key = response_key(self.cache_namespace, version, request,
+                           self.get_cache_variant(request))
+        etag = get_etag(key)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            result = 'not_modified'
+        else:
+            data = cache.get(key)
+            if data is None:
+                result = 'miss'
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data, get_timeout())
+            else:
+                result = 'hit'
+                response = Response(data)
+        RESPONSE_CACHE.labels(self.cache_namespace, result).inc()
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class FastReadMixin:
+    """
+    list и retrieve через reader (см. reviews.readers) вместо
+    сериализатора DRF. Фильтры, пагинация и права доступа те же,
+    остальные действия работают через serializer_class.
+    ?fields= и ?expand= сокращают и ответ, и список столбцов в SQL.
+    """
+    reader = None
+
+    def get_cache_variant(self, request):
+        # Поля вроде can_edit у каждого пользователя свои.
+        fields, _ = self.reader.get_options(request.query_params)
+        if self.reader.personal_fields.isdisjoint(fields):
+            return ''
+        return '{}:{}'.format(request.user.pk, get_roles(request)[1])
+
+    def list(self, request, *args, **kwargs):
+        fields, expand = self.reader.get_options(request.query_params)
+        rows = self.reader.rows(
+            self.filter_queryset(self.get_queryset()), fields, expand)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                self.reader.serialize(page, fields, expand, request))
+        return Response(self.reader.serialize(rows, fields, expand, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        fields, expand = self.reader.get_options(request.query_params)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        rows = self.reader.rows(
+            self.filter_queryset(self.get_queryset()), fields, expand)
+        row = get_object_or_404(
+            rows, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        return Response(
+            self.reader.serialize([row], fields, expand, request)[0])
@@ -1,12 +1,62 @@
-from django.contrib.auth.models import AbstractUser
+from contextlib import nullcontext
+
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from api_yamdb.settings import RATING_SCORE
 
 from .validators import year_validator
 
 
+class SignupUserManager(UserManager):
+
+    def signup(self, username, email, confirmation_code):
+        """
+        Регистрация одним INSERT ... ON CONFLICT: новый пользователь
+        создаётся, у существующего с теми же именем и почтой, ещё
+        не входившего в систему, заменяется код подтверждения.
+        Возвращает False, если имя или почта заняты другим пользователем
+        или учётная запись уже активирована.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        user = self.model(username=username, email=email,
+                          confirmation_code=confirmation_code)
+        fields = [field for field in self.model._meta.local_concrete_fields
+                  if not field.primary_key]
+        table = quote(self.model._meta.db_table)
+        sql = (
+            f'INSERT INTO {table} '
+            f'({", ".join(quote(field.column) for field in fields)}) '
+            f'SELECT {", ".join(["%s"] * len(fields))} '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {table} '
+            f'WHERE email = %s AND username <> %s) '
+            f'ON CONFLICT (username) DO UPDATE '
+            f'SET confirmation_code = EXCLUDED.confirmation_code '
+            f'WHERE {table}.email = EXCLUDED.email '
+            f'AND ({table}.last_login IS NULL '
+            f"OR {table}.confirmation_code = '')"
+        )
+        params = [
+            field.get_db_prep_save(field.pre_save(user, add=True), connection)
+            for field in fields
+        ] + [email, username]
+        # Ошибка в транзакции без точки сохранения сделала бы её негодной.
+        savepoint = (transaction.atomic(using=self.db)
+                     if connection.in_atomic_block else nullcontext())
+        try:
+            with savepoint, connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.rowcount == 1
+        except IntegrityError:
+            # Почту одновременно заняла другая регистрация.
+            return False
+
+
 class User(AbstractUser):
     ADMIN = 'admin'
     MODERATOR = 'moderator'
@@ -50,6 +100,44 @@ class User(AbstractUser):
         default='user',
         verbose_name='Роль пользователя'
     )
+    # Токены доступа, выпущенные до этого момента, не принимаются
+    # (см. reviews.authentication.revoke_user_tokens).
+    tokens_revoked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Токены отозваны'
+    )
+
+    objects = SignupUserManager()
+
+    # При смене этих полей выданные токены доступа отзываются.
+    CLAIM_FIELDS = ('role', 'is_staff', 'is_superuser', 'is_active')
+    # Поля автора в отзывах и комментариях (reviews.readers.AUTHOR_COLUMNS):
+    # их смена сбрасывает кэш ответов.
+    PROFILE_FIELDS = ('username',)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_claims()
+        instance.remember_profile()
+        return instance
+
+    def get_claims(self):
+        return {field: self.__dict__.get(field) for field in self.CLAIM_FIELDS}
+
+    def remember_claims(self):
+        """Запоминает значения, выданные в claims токенов."""
+        self._loaded_claims = self.get_claims()
+
+    def get_profile(self):
+        return {
+            field: self.__dict__.get(field) for field in self.PROFILE_FIELDS
+        }
+
+    def remember_profile(self):
+        self._loaded_profile = self.get_profile()
 
     @property
     def is_admin(self):
@@ -91,6 +179,57 @@ class Category(AbstractModel):
         return self.name
 
 
+class TitleQuerySet(models.QuerySet):
+
+    def recalculate_rating(self):
+        """Пересчитывает сумму и количество оценок по таблице отзывов."""
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return self.update(
+            score_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0
+            ),
+            score_count=Coalesce(
+                Subquery(reviews.annotate(total=Count('id')).values('total')),
+                0
+            ),
+        )
+
+    def touch(self):
+        """
+        Отмечает произведения изменёнными сейчас: updated_at не меняется
+        сам, когда меняются их жанры или категория, а выгрузка
+        с ?updated_since= ищет изменения по нему.
+        """
+        return self.update(updated_at=timezone.now())
+
+    def rebuild_histogram(self):
+        """
+        Пересобирает гистограммы оценок одним INSERT ... SELECT с группировкой
+        по таблице отзывов, без выгрузки строк в Python.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        titles = self.order_by().values('pk')
+        titles_sql, params = titles.query.get_compiler(self.db).as_sql()
+        with transaction.atomic(using=self.db):
+            TitleScoreCount.objects.using(self.db).filter(
+                title__in=titles).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {quote(TitleScoreCount._meta.db_table)} '
+                    f'(title_id, score, count) '
+                    f'SELECT title_id, score, COUNT(*) '
+                    f'FROM {quote(Review._meta.db_table)} '
+                    f'WHERE title_id IN ({titles_sql}) '
+                    f'GROUP BY title_id, score',
+                    params,
+                )
+                return cursor.rowcount
+
+
 class Title(models.Model):
     """Модель произведения."""
     name = models.CharField(max_length=256)
@@ -101,8 +240,44 @@ class Title(models.Model):
         Category,
         null=True,
         on_delete=models.SET_NULL,
-        related_name='titles'
+        related_name='titles',
+        db_index=False
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
+    score_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество оценок'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        # Фильтры TitleFilters: category__slug (+ year) и name.
+        # Индекс по одному category_id не нужен: его покрывает составной.
+        # (updated_at, id) - порядок выгрузки и фильтр updated_since.
+        indexes = [
+            models.Index(fields=['category', 'year'],
+                         name='title_category_year_idx'),
+            models.Index(fields=['year'], name='title_year_idx'),
+            models.Index(fields=['name'], name='title_name_idx'),
+            models.Index(fields=['updated_at', 'id'],
+                         name='title_updated_at_idx'),
+        ]
+
+    @property
+    def rating(self):
+        if not self.score_count:
+            return None
+        return self.score_sum / self.score_count
 
     def __str__(self):
         return self.name
@@ -113,21 +288,29 @@ class GenreTitle(models.Model):
     genre = models.ForeignKey(
         Genre,
         on_delete=models.CASCADE,
-        default=None
+        default=None,
+        db_index=False
     )
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
-        default=None
+        default=None,
+        db_index=False
     )
 
     class Meta:
+        # Уникальный (title, genre) обслуживает жанры произведения,
+        # а (genre, title) - фильтр по genre__slug без обращения к таблице.
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'genre'],
                 name='unique_genre_title'
             )
         ]
+        indexes = [
+            models.Index(fields=['genre', 'title'],
+                         name='genretitle_genre_title_idx')
+        ]
 
     def __str__(self):
         return f'{self.genre} {self.title}'
@@ -135,7 +318,8 @@ class GenreTitle(models.Model):
 
 class Review(models.Model):
     title = models.ForeignKey(
-        Title, on_delete=models.CASCADE, related_name='review')
+        Title, on_delete=models.CASCADE, related_name='review',
+        db_index=False)
     text = models.TextField()
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='review')
@@ -148,22 +332,267 @@ class Review(models.Model):
     pub_date = models.DateTimeField(auto_now=True)
 
     class Meta:
+        # Индекс по title_id не нужен: его покрывают уникальный
+        # (title, author) и (title, pub_date, id) для пагинации.
         constraints = [
             models.UniqueConstraint(fields=['title', 'author'],
                                     name='one_review_by_title_for_user')
         ]
+        # (pub_date, id) - порядок выгрузки и фильтр updated_since.
+        indexes = [
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_pub_date_idx'),
+            models.Index(fields=['pub_date', 'id'],
+                         name='review_pub_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_rating_state()
+        return instance
+
+    def remember_rating_state(self):
+        """
+        Запоминает оценку, произведение и автора, учтённые в рейтинге
+        и счётчиках пользователя.
+        """
+        self._loaded_score = self.__dict__.get('score')
+        self._loaded_title_id = self.__dict__.get('title_id')
+        self._loaded_author_id = self.__dict__.get('author_id')
+
+    def save(self, *args, **kwargs):
+        # Рейтинг произведения обновляется в post_save,
+        # поэтому сохранение и пересчёт идут в одной транзакции.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text
 
 
+class TitleScoreCount(models.Model):
+    """Гистограмма оценок: число отзывов с оценкой score на произведение."""
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='score_counts',
+        db_index=False)
+    score = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Уникальный индекс покрывает выборку по title_id.
+        constraints = [
+            models.UniqueConstraint(fields=['title', 'score'],
+                                    name='unique_title_score')
+        ]
+
+    def __str__(self):
+        return f'{self.title_id}: {self.score} x {self.count}'
+
+
+class TitleRanking(models.Model):
+    """
+    Строка материализованного рейтинга: произведение в области scope
+    ('' - весь каталог, 'genre:<slug>', 'category:<slug>', 'year:<год>').
+    Категория и год продублированы для фильтров внутри области.
+    Таблицу заполняет команда refresh_rankings.
+    """
+    scope = models.CharField(max_length=64)
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='rankings',
+        db_index=False)
+    category_slug = models.CharField(max_length=50, blank=True)
+    year = models.IntegerField()
+    rating = models.FloatField(verbose_name='Взвешенный рейтинг')
+    trending = models.FloatField(verbose_name='Отзывов в день')
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['title', 'scope'],
+                                    name='unique_title_ranking_scope')
+        ]
+        indexes = [
+            models.Index(fields=['scope', '-rating', 'title'],
+                         name='ranking_scope_rating_idx'),
+            models.Index(fields=['scope', '-trending', 'title'],
+                         name='ranking_scope_trending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.scope or "*"}: {self.title_id}'
+
+
 class Comment(models.Model):
     review = models.ForeignKey(
-        Review, on_delete=models.CASCADE, related_name='comments')
+        Review, on_delete=models.CASCADE, related_name='comments',
+        db_index=False)
     text = models.TextField()
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='comments')
     pub_date = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_pub_date_idx'),
+            models.Index(fields=['pub_date', 'id'],
+                         name='comment_pub_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Счётчики автора обновляются в post_save той же транзакции.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return self.text
+
+
+class UserStatsManager(models.Manager):
+
+    def rebuild(self, users=None):
+        """
+        Пересобирает счётчики пользователей users (по умолчанию всех)
+        одним INSERT ... SELECT с группировкой по отзывам и комментариям.
+        Строки получают только пользователи, у которых они есть.
+        """
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        if users is None:
+            users = User.objects.all()
+        users = users.order_by().values('pk')
+        users_sql, params = users.query.get_compiler(self.db).as_sql()
+        with transaction.atomic(using=self.db):
+            self.filter(user__in=users).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {quote(self.model._meta.db_table)} '
+                    f'(user_id, review_count, comment_count, score_sum, '
+                    f'last_activity) '
+                    f'SELECT author_id, SUM(reviews), SUM(comments), '
+                    f'SUM(score), MAX(pub_date) FROM ('
+                    f'SELECT author_id, 1 AS reviews, 0 AS comments, score, '
+                    f'pub_date FROM {quote(Review._meta.db_table)} '
+                    f'UNION ALL '
+                    f'SELECT author_id, 0, 1, 0, pub_date '
+                    f'FROM {quote(Comment._meta.db_table)}'
+                    f') AS activity '
+                    f'WHERE author_id IN ({users_sql}) '
+                    f'GROUP BY author_id',
+                    params,
+                )
+                return cursor.rowcount
+
+
+class UserStats(models.Model):
+    """
+    Счётчики активности пользователя. Обновляются сигналами в транзакции
+    записи отзыва или комментария; расхождения исправляет команда
+    recalculate_user_stats.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats')
+    review_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество отзывов')
+    comment_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество комментариев')
+    score_sum = models.PositiveIntegerField(
+        default=0, verbose_name='Сумма поставленных оценок')
+    last_activity = models.DateTimeField(
+        null=True, verbose_name='Последний отзыв или комментарий')
+
+    objects = UserStatsManager()
+
+    @property
+    def mean_score(self):
+        if not self.review_count:
+            return None
+        return self.score_sum / self.review_count
+
+    def __str__(self):
+        return f'{self.user_id}: {self.review_count}/{self.comment_count}'
+
+
+class SearchDocument(models.Model):
+    """
+    Документ полнотекстового поиска по произведению, отзыву или комментарию.
+    На PostgreSQL к таблице добавляется столбец tsvector с GIN-индексом
+    (миграция 0013_search_vector).
+    """
+    TITLE = 'title'
+    REVIEW = 'review'
+    COMMENT = 'comment'
+    KIND_CHOICES = (
+        (TITLE, 'Произведение'),
+        (REVIEW, 'Отзыв'),
+        (COMMENT, 'Комментарий'),
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name='search_documents')
+    body = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'],
+                                    name='unique_search_document')
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+
+class SearchTerm(models.Model):
+    """Инвертированный индекс для баз данных без tsvector (SQLite)."""
+    document = models.ForeignKey(
+        SearchDocument, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'document'],
+                         name='search_term_idx')
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class OutgoingEmail(models.Model):
+    """
+    Исходящее письмо. Запрос только ставит письмо в очередь,
+    отправляет его команда send_mail_queue. Текст отправленного
+    или окончательно не отправленного письма стирается.
+    """
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.EmailField(max_length=254)
+    recipient = models.EmailField(max_length=254)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='outgoing_email_queue_idx')
+        ]
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
@@ -0,0 +1,109 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CursorOrPageNumberPagination(PageNumberPagination):
+    """
+    Постраничная пагинация по номеру страницы,
+    а при наличии параметра ?cursor= - по ключу (pub_date, id).
+    В режиме курсора нет COUNT(*) и OFFSET, поэтому глубокие
+    страницы отдаются так же быстро, как первая.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        reverse, position = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+
+        if position is None:
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            pub_date, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+                ).order_by('pub_date', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+                ).order_by(*self.ordering)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return False, None
+        try:
+            direction, pub_date, pk = b64decode(
+                cursor.encode('ascii'), altchars=b'-_', validate=True
+            ).decode('ascii').split('|')
+            position = (parse_datetime(pub_date), int(pk))
+        except (BinasciiError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in ('n', 'p') or position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return direction == 'p', position
+
+    def encode_cursor(self, direction, obj):
+        # Страница - объекты модели или словари из .values().
+        if isinstance(obj, dict):
+            pub_date, pk = obj['pub_date'], obj['id']
+        else:
+            pub_date, pk = obj.pub_date, obj.pk
+        value = f'{direction}|{pub_date.isoformat()}|{pk}'
+        return b64encode(value.encode('ascii'), altchars=b'-_').decode('ascii')
+
+    def get_cursor_link(self, direction, obj):
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(direction, obj))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.get_cursor_link('n', self.page[-1])
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.get_cursor_link('p', self.page[0])
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
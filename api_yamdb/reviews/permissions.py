@@ -2,31 +2,49 @@ from rest_framework import permissions
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
+def get_roles(request):
+    """
+    Права пользователя запроса: (is_admin, can_moderate). Считаются
+    один раз за запрос и запоминаются в request.
+    """
+    roles = getattr(request, '_roles', None)
+    if roles is not None:
+        return roles
+    user = request.user
+    is_admin = bool(user.is_authenticated
+                    and (user.is_admin or user.is_superuser))
+    request._roles = (
+        is_admin,
+        bool(is_admin or user.is_authenticated and user.is_moderator),
+    )
+    return request._roles
+
+
+def can_edit(request, author_id):
+    """
+    Может ли пользователь запроса менять объект автора author_id.
+    Сравниваются идентификаторы, строка автора не загружается, поэтому
+    проверка страницы объектов не делает запросов к БД.
+    """
+    if not request.user.is_authenticated:
+        return False
+    return get_roles(request)[1] or author_id == request.user.pk
+
+
 class IsAdminOrReadOnly(BasePermission):
     def has_permission(self, request, view):
-        return (
-            request.method in SAFE_METHODS
-            or request.user.is_authenticated
-            and request.user.is_admin
-        )
+        return request.method in SAFE_METHODS or get_roles(request)[0]
 
 
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and (
-            request.user.is_admin or request.user.is_superuser)
+        return get_roles(request)[0]
 
 
 class IsAuthorModeratorAdminSuperuser(BasePermission):
     def has_object_permission(self, request, view, obj):
         return (request.method in SAFE_METHODS
-                or request.user.is_authenticated
-                and (
-                    request.user.is_admin
-                    or request.user.is_moderator
-                    or request.user.is_superuser
-                    or obj.author == request.user)
-                )
+                or can_edit(request, obj.author_id))
 
 
 class IsGuest(BasePermission):
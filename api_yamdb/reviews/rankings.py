@@ -0,0 +1,106 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .cache import invalidate
+from .models import GenreTitle, Review, Title, TitleRanking
+
+BOARDS = {
+    'top': 'rating',
+    'trending': 'trending',
+}
+INSERT_BATCH_SIZE = 1000
+
+
+def bayesian_rating(score_sum, score_count, mean, min_votes):
+    """
+    Средняя оценка, подтянутая к средней по каталогу: у произведения
+    с парой отзывов она почти равна mean, с ростом числа отзывов
+    приближается к собственной средней.
+    """
+    if not score_count + min_votes:
+        return 0.0
+    return (score_sum + min_votes * mean) / (score_count + min_votes)
+
+
+def get_scopes(title, genres):
+    scopes = ['', f'year:{title["year"]}']
+    if title['category__slug']:
+        scopes.append(f'category:{title["category__slug"]}')
+    return scopes + [f'genre:{slug}' for slug in genres]
+
+
+def build_rows(now):
+    """Строки рейтинга всех произведений: по одной на каждую область."""
+    config = settings.RANKINGS
+    totals = Title.objects.aggregate(
+        total=Sum('score_sum'), count=Sum('score_count'))
+    mean = totals['total'] / totals['count'] if totals['count'] else 0
+    since = now - timedelta(days=config['TRENDING_DAYS'])
+    recent = Review.objects.filter(
+        pub_date__gte=since).order_by().values('title_id')
+    recent = dict(recent.annotate(
+        total=Count('id')).values_list('title_id', 'total'))
+    genres = defaultdict(list)
+    for title_id, slug in GenreTitle.objects.values_list(
+            'title_id', 'genre__slug').iterator():
+        genres[title_id].append(slug)
+
+    titles = Title.objects.values(
+        'pk', 'year', 'score_sum', 'score_count', 'category__slug')
+    for title in titles.iterator():
+        rating = bayesian_rating(
+            title['score_sum'], title['score_count'], mean,
+            config['MIN_VOTES'])
+        trending = recent.get(title['pk'], 0) / config['TRENDING_DAYS']
+        for scope in get_scopes(title, genres[title['pk']]):
+            yield TitleRanking(
+                scope=scope, title_id=title['pk'],
+                category_slug=title['category__slug'] or '',
+                year=title['year'], rating=rating, trending=trending,
+                refreshed_at=now,
+            )
+
+
+def refresh_rankings():
+    """Пересобирает таблицу рейтингов целиком в одной транзакции."""
+    rows = build_rows(timezone.now())
+    total = 0
+    with transaction.atomic():
+        TitleRanking.objects.all().delete()
+        for batch in iter(lambda: list(islice(rows, INSERT_BATCH_SIZE)), []):
+            TitleRanking.objects.bulk_create(batch)
+            total += len(batch)
+        invalidate('titles')
+    return total
+
+
+def get_leaderboard(board, category=None, genre=None, year=None, limit=10):
+    """
+    Первые limit строк рейтинга. Область выбирается по самому узкому
+    фильтру (жанр, категория, год), так что запрос читает индекс
+    (scope, -оценка) и останавливается на limit строках; остальные
+    фильтры проверяются по продублированным столбцам.
+    """
+    field = BOARDS[board]
+    if genre:
+        scope = f'genre:{genre}'
+    elif category:
+        scope = f'category:{category}'
+    elif year is not None:
+        scope = f'year:{year}'
+    else:
+        scope = ''
+    rows = TitleRanking.objects.filter(scope=scope)
+    if category:
+        rows = rows.filter(category_slug=category)
+    if year is not None:
+        rows = rows.filter(year=year)
+    if board == 'trending':
+        rows = rows.filter(trending__gt=0)
+    return list(rows.order_by(f'-{field}', 'title')[:limit])
@@ -0,0 +1,234 @@
+from collections import defaultdict
+from functools import partial
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import GenreTitle
+from .permissions import can_edit
+
+# Встроенный автор виден всем, кто читает отзывы и комментарии: только
+# публичные поля. Имя, фамилия и биография - в /users/ (администратору
+# и самому пользователю).
+AUTHOR_COLUMNS = ('author__username',)
+
+
+def format_datetime(value, tz):
+    """Дата в формате DateTimeField DRF (ISO 8601, UTC как Z)."""
+    if not value:
+        return None
+    if tz is not None:
+        if timezone.is_aware(value):
+            value = value.astimezone(tz)
+        else:
+            value = timezone.make_aware(value, tz)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        return value[:-6] + 'Z'
+    return value
+
+
+def get_timezone():
+    return timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+def parse_names(value, allowed, param):
+    """Имена через запятую из параметра запроса; неизвестные - ошибка 400."""
+    names = {name.strip() for name in value.split(',')} - {''}
+    unknown = sorted(names - set(allowed))
+    if unknown:
+        raise ValidationError(
+            {param: [f'Неизвестные поля: {", ".join(unknown)}.']})
+    return names
+
+
+class Reader:
+    """
+    Чтение для list и retrieve без сериализаторов DRF: нужные столбцы
+    выбираются через .values() вместе со связанными, ответ собирается
+    из словарей. Формат ответа совпадает с сериализатором ресурса.
+
+    fields - поля ответа и столбцы, из которых они собираются;
+    relations - столбцы связанных полей, встроенных объектом (?expand=);
+    personal_fields - поля, зависящие от пользователя запроса: они
+    отдаются только по ?fields=.
+    Поле без метода get_<поле> берётся из одноимённого столбца.
+    """
+    fields = {}
+    relations = {}
+    personal_fields = frozenset()
+    default_expand = frozenset()
+    # Нужны всегда: курсорной пагинации и запросам связанных записей.
+    key_columns = ('id',)
+
+    def get_default_fields(self):
+        return tuple(
+            name for name in self.fields if name not in self.personal_fields)
+
+    def get_options(self, params):
+        """Поля и встраиваемые связи из ?fields= и ?expand=."""
+        fields = self.get_default_fields()
+        if params.get('fields'):
+            names = parse_names(params['fields'], self.fields, 'fields')
+            fields = tuple(name for name in self.fields if name in names)
+        expand = self.default_expand
+        if 'expand' in params:
+            expand = frozenset(
+                parse_names(params['expand'], self.relations, 'expand'))
+        return fields, expand
+
+    def get_columns(self, fields, expand):
+        columns = dict.fromkeys(self.key_columns)
+        for name in fields:
+            if name in expand:
+                columns.update(dict.fromkeys(self.relations[name]))
+            else:
+                columns.update(dict.fromkeys(self.fields[name]))
+        return list(columns)
+
+    def rows(self, queryset, fields=None, expand=None):
+        fields = fields or self.get_default_fields()
+        expand = self.default_expand if expand is None else expand
+        return queryset.prefetch_related(None).values(
+            *self.get_columns(fields, expand))
+
+    def serialize(self, rows, fields=None, expand=None, request=None):
+        fields = fields or self.get_default_fields()
+        expand = self.default_expand if expand is None else expand
+        rows = list(rows)
+        context = self.get_context(rows, fields, expand)
+        context['request'] = request
+        getters = [
+            (name, self.get_getter(name, name in expand, context))
+            for name in fields
+        ]
+        return [
+            {name: getter(row) for name, getter in getters} for row in rows
+        ]
+
+    def get_getter(self, name, expanded, context):
+        method = getattr(self, f'expand_{name}', None) if expanded else None
+        method = method or getattr(self, f'get_{name}', None)
+        if method is None:
+            return itemgetter(name)
+        return partial(method, context=context)
+
+    def get_context(self, rows, fields, expand):
+        """Общие для страницы данные: часовой пояс, связанные записи."""
+        return {'tz': get_timezone()}
+
+
+class TitleReader(Reader):
+    """Формат SafeMethodTitleSerializer."""
+    fields = {
+        'id': ('id',),
+        'name': ('name',),
+        'year': ('year',),
+        'rating': ('score_sum', 'score_count'),
+        'description': ('description',),
+        'genre': (),
+        'category': ('category__slug',),
+    }
+    relations = {
+        'genre': (),
+        'category': ('category__name', 'category__slug'),
+    }
+    default_expand = frozenset(('genre', 'category'))
+
+    def get_context(self, rows, fields, expand):
+        # Жанры всей страницы - одним запросом и только если они нужны.
+        genres = defaultdict(list)
+        if 'genre' not in fields:
+            return {'genres': genres}
+        links = GenreTitle.objects.filter(
+            title_id__in=[row['id'] for row in rows]
+        ).order_by('title_id', 'genre_id')
+        if 'genre' in expand:
+            for title_id, name, slug in links.values_list(
+                    'title_id', 'genre__name', 'genre__slug'):
+                genres[title_id].append({'name': name, 'slug': slug})
+        else:
+            for title_id, slug in links.values_list(
+                    'title_id', 'genre__slug'):
+                genres[title_id].append(slug)
+        return {'genres': genres}
+
+    def get_rating(self, row, context):
+        if not row['score_count']:
+            return None
+        return int(row['score_sum'] / row['score_count'])
+
+    def get_genre(self, row, context):
+        return context['genres'][row['id']]
+
+    def get_category(self, row, context):
+        return row['category__slug']
+
+    def expand_category(self, row, context):
+        if row['category__slug'] is None:
+            return None
+        return {'name': row['category__name'], 'slug': row['category__slug']}
+
+
+class AuthoredReader(Reader):
+    """
+    Общие поля отзывов и комментариев. can_edit - может ли пользователь
+    запроса изменить или удалить объект.
+    """
+    relations = {'author': AUTHOR_COLUMNS}
+    personal_fields = frozenset(('can_edit',))
+    key_columns = ('id', 'pub_date')
+
+    def get_author(self, row, context):
+        return row['author__username']
+
+    def expand_author(self, row, context):
+        return {
+            column[len('author__'):]: row[column] for column in AUTHOR_COLUMNS
+        }
+
+    def get_pub_date(self, row, context):
+        return format_datetime(row['pub_date'], context['tz'])
+
+    def get_can_edit(self, row, context):
+        return can_edit(context['request'], row['author_id'])
+
+
+class ReviewReader(AuthoredReader):
+    """Формат ReviewsSerializer."""
+    fields = {
+        'id': ('id',),
+        'title': ('title__name',),
+        'text': ('text',),
+        'author': ('author__username',),
+        'score': ('score',),
+        'pub_date': ('pub_date',),
+        'can_edit': ('author_id',),
+    }
+    relations = {
+        **AuthoredReader.relations,
+        'title': ('title_id', 'title__name', 'title__year'),
+    }
+
+    def get_title(self, row, context):
+        return row['title__name']
+
+    def expand_title(self, row, context):
+        return {
+            'id': row['title_id'],
+            'name': row['title__name'],
+            'year': row['title__year'],
+        }
+
+
+class CommentReader(AuthoredReader):
+    """Формат CommentSerializer."""
+    fields = {
+        'id': ('id',),
+        'text': ('text',),
+        'author': ('author__username',),
+        'pub_date': ('pub_date',),
+        'can_edit': ('author_id',),
+    }
@@ -0,0 +1,32 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Даты и типы, которых orjson не знает
+    (ленивые строки, Decimal), кодируются как в DRF. Без orjson
+    и при запросе отступов (?indent) работает обычный JSONRenderer.
+    """
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if orjson is not None else None
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(
+                accepted_media_type, renderer_context or {}):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        content = orjson.dumps(
+            data, default=self.encoder_class().default, option=self.options)
+        # Как JSONRenderer: разделители строк недопустимы в JavaScript.
+        return content.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,191 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Review, SearchDocument, SearchTerm, Title
+
+TERM_RE = re.compile(r'\w+')
+TERM_MAX_LENGTH = 64
+INDEX_BATCH_SIZE = 2000
+
+
+def get_config():
+    return getattr(settings, 'SEARCH_CONFIG', 'simple')
+
+
+def uses_tsvector():
+    return connection.vendor == 'postgresql'
+
+
+def tokenize(text):
+    return [term[:TERM_MAX_LENGTH] for term in TERM_RE.findall(text.lower())]
+
+
+KINDS = {
+    Title: SearchDocument.TITLE,
+    Review: SearchDocument.REVIEW,
+    Comment: SearchDocument.COMMENT,
+}
+
+
+def get_document(obj):
+    """Возвращает id произведения и текст для индексации объекта."""
+    if isinstance(obj, Title):
+        return obj.pk, f'{obj.name} {obj.description}'
+    if isinstance(obj, Review):
+        return obj.title_id, obj.text
+    if Comment.review.is_cached(obj):
+        return obj.review.title_id, obj.text
+    # Отзыв целиком не нужен: достаточно id его произведения.
+    title_id = Review.objects.filter(
+        pk=obj.review_id).values_list('title_id', flat=True).get()
+    return title_id, obj.text
+
+
+def build_terms(document):
+    return [
+        SearchTerm(document=document, term=term, frequency=frequency)
+        for term, frequency in Counter(tokenize(document.body)).items()
+    ]
+
+
+def index_object(obj):
+    title_id, body = get_document(obj)
+    document, created = SearchDocument.objects.update_or_create(
+        kind=KINDS[type(obj)], object_id=obj.pk,
+        defaults={'title_id': title_id, 'body': body},
+    )
+    if uses_tsvector():
+        return
+    if not created:
+        document.terms.all().delete()
+    SearchTerm.objects.bulk_create(build_terms(document))
+
+
+def index_objects(objects):
+    """Индексирует пачку новых объектов одной модели."""
+    if not objects:
+        return 0
+    documents = []
+    for obj in objects:
+        title_id, body = get_document(obj)
+        documents.append(SearchDocument(
+            kind=KINDS[type(obj)], object_id=obj.pk,
+            title_id=title_id, body=body))
+    return save_documents(documents[0].kind, documents)
+
+
+def remove_object(obj):
+    SearchDocument.objects.filter(
+        kind=KINDS[type(obj)], object_id=obj.pk).delete()
+
+
+def rebuild_index():
+    """Полностью перестраивает индекс по всем объектам."""
+    SearchDocument.objects.all().delete()
+    sources = (
+        (SearchDocument.TITLE, Title.objects.values_list(
+            'pk', 'pk', 'name', 'description')),
+        (SearchDocument.REVIEW, Review.objects.values_list(
+            'pk', 'title_id', 'text')),
+        (SearchDocument.COMMENT, Comment.objects.values_list(
+            'pk', 'review__title_id', 'text')),
+    )
+    total = 0
+    for kind, rows in sources:
+        batch = []
+        for pk, title_id, *text in rows.iterator(chunk_size=INDEX_BATCH_SIZE):
+            batch.append(SearchDocument(
+                kind=kind, object_id=pk, title_id=title_id,
+                body=' '.join(text)))
+            if len(batch) == INDEX_BATCH_SIZE:
+                total += save_documents(kind, batch)
+                batch = []
+        total += save_documents(kind, batch)
+    return total
+
+
+def save_documents(kind, documents):
+    if not documents:
+        return 0
+    SearchDocument.objects.bulk_create(documents)
+    if not uses_tsvector():
+        ids = dict(SearchDocument.objects.filter(
+            kind=kind, object_id__in=[doc.object_id for doc in documents]
+        ).values_list('object_id', 'pk'))
+        terms = []
+        for document in documents:
+            document.pk = ids[document.object_id]
+            terms += build_terms(document)
+        SearchTerm.objects.bulk_create(terms, batch_size=INDEX_BATCH_SIZE)
+    return len(documents)
+
+
+def search(query, kinds=None, limit=20, offset=0):
+    """
+    Ищет документы, содержащие все слова запроса (по префиксу).
+    Возвращает (количество, фасеты по типам, страницу документов с rank).
+    """
+    terms = tokenize(query)
+    if not terms:
+        return 0, {}, []
+    if uses_tsvector():
+        return search_tsvector(terms, kinds, limit, offset)
+    return search_inverted_index(terms, kinds, limit, offset)
+
+
+def search_tsvector(terms, kinds, limit, offset):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    params = [get_config(), tsquery]
+    matched = SearchDocument.objects.extra(
+        where=['search_vector @@ to_tsquery(%s::regconfig, %s)'],
+        params=params,
+    )
+    facets = dict(
+        matched.order_by().values_list('kind').annotate(Count('id')))
+    if kinds:
+        matched = matched.filter(kind__in=kinds)
+    count = sum(facets.get(kind, 0) for kind in (kinds or facets))
+    documents = matched.annotate(rank=RawSQL(
+        'ts_rank(search_vector, to_tsquery(%s::regconfig, %s))', params
+    )).order_by('-rank', '-pk')[offset:offset + limit]
+    return count, facets, list(documents)
+
+
+def search_inverted_index(terms, kinds, limit, offset):
+    ranks = None
+    for term in set(terms):
+        term_ranks = Counter()
+        rows = SearchTerm.objects.filter(
+            term__gte=term, term__lt=term + '\uffff'
+        ).values_list('document_id', 'frequency')
+        for document_id, frequency in rows:
+            term_ranks[document_id] += frequency
+        if ranks is None:
+            ranks = term_ranks
+        else:
+            ranks = Counter({
+                document_id: rank + term_ranks[document_id]
+                for document_id, rank in ranks.items()
+                if document_id in term_ranks
+            })
+    kind_of = dict(SearchDocument.objects.filter(
+        pk__in=ranks).values_list('pk', 'kind'))
+    facets = dict(Counter(kind_of.values()))
+    ordered = sorted(
+        (document_id for document_id in ranks
+         if not kinds or kind_of[document_id] in kinds),
+        key=lambda document_id: (-ranks[document_id], -document_id),
+    )
+    page = ordered[offset:offset + limit]
+    documents = SearchDocument.objects.in_bulk(page)
+    results = []
+    for document_id in page:
+        document = documents[document_id]
+        document.rank = float(ranks[document_id])
+        results.append(document)
+    return len(ordered), facets, results
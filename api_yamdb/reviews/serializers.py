@@ -3,10 +3,13 @@ import re
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from rest_framework import serializers
+from rest_framework.response import Response
+from reviews.models import (Category, Comment, Genre, Review, SearchDocument,
+                            Title, User)
+from reviews.export import EXPORT_FORMATS
+from reviews.stats import get_user_stats
 
 from api_yamdb.settings import RATING_SCORE
-from rest_framework.response import Response
-from reviews.models import Category, Comment, Genre, Review, Title, User
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -48,7 +51,7 @@ class ReviewsSerializer(serializers.ModelSerializer):
 
     def validate_dup(self, request, data):
         if Review.objects.get(
-            author=request.user,
+            author_id=request.user.pk,
             title=self.data['title']
         ).exists():
             raise ValidationError('Уже есть')
@@ -76,14 +79,25 @@ class TitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('score_sum', 'score_count', 'updated_at')
+
+
+class BulkTitleSerializer(serializers.ModelSerializer):
+    """
+    Элемент пакетного создания произведений. Слаги проверяются
+    не здесь, а одним запросом на весь пакет (см. reviews.bulk).
+    """
+    genre = serializers.ListField(
+        child=serializers.SlugField(), allow_empty=False)
+    category = serializers.SlugField()
+
+    class Meta:
+        model = Title
+        fields = ('name', 'year', 'description', 'genre', 'category')
 
 
 class SafeMethodTitleSerializer(serializers.ModelSerializer):
-    rating = serializers.IntegerField(
-        source='review__score__avg',
-        read_only=True
-    )
+    rating = serializers.IntegerField(read_only=True)
     category = CategorySerializer()
     genre = GenreSerializer(many=True)
 
@@ -101,6 +115,23 @@ class SafeMethodTitleSerializer(serializers.ModelSerializer):
         exclude = []
 
 
+class RankedTitleSerializer(SafeMethodTitleSerializer):
+    """Произведение в рейтинге: место и оценка по выбранному рейтингу."""
+    rank = serializers.IntegerField(read_only=True)
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(SafeMethodTitleSerializer.Meta):
+        fields = ('rank', 'score') + SafeMethodTitleSerializer.Meta.fields
+
+
+class RankingQuerySerializer(serializers.Serializer):
+    category = serializers.SlugField(required=False)
+    genre = serializers.SlugField(required=False)
+    year = serializers.IntegerField(required=False)
+    limit = serializers.IntegerField(
+        required=False, default=10, min_value=1, max_value=100)
+
+
 class ValidateUserSerializer(serializers.ModelSerializer):
 
     def validate_username(self, value):
@@ -119,7 +150,15 @@ class ValidateUserSerializer(serializers.ModelSerializer):
         return value
 
 
-class UserSerializer(ValidateUserSerializer):
+class UserStatsSerializer(ValidateUserSerializer):
+    """Профиль со счётчиками отзывов и комментариев пользователя."""
+    stats = serializers.SerializerMethodField()
+
+    def get_stats(self, user):
+        return get_user_stats(user)
+
+
+class UserSerializer(UserStatsSerializer):
     username = serializers.CharField(required=True, max_length=150)
     email = serializers.CharField(required=True, max_length=254)
     role = serializers.StringRelatedField(read_only=True)
@@ -127,7 +166,8 @@ class UserSerializer(ValidateUserSerializer):
     class Meta:
         model = User
         fields = (
-            'username', 'email', 'first_name', 'last_name', 'bio', 'role'
+            'username', 'email', 'first_name', 'last_name', 'bio', 'role',
+            'stats',
         )
         ordering = ['-pk']
 
@@ -147,17 +187,22 @@ class UserSerializer(ValidateUserSerializer):
         return value
 
 
-class AdminUserSerializer(ValidateUserSerializer):
+class AdminUserSerializer(UserStatsSerializer):
 
     class Meta:
         model = User
         fields = (
             'username', 'email', 'first_name', 'last_name', 'bio', 'role',
+            'stats',
         )
         ordering = ['-pk']
 
 
 class SignupSerializer(ValidateUserSerializer):
+    # Без UniqueValidator: занятые имя и почту находит сам INSERT
+    # в User.objects.signup, отдельные запросы на проверку не нужны.
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField(max_length=254)
 
     class Meta:
         model = User
@@ -172,3 +217,34 @@ class TokenSerializer(serializers.Serializer):
     class Meta:
         model = User
         fields = ('username', 'confirmation_code')
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField(source='object_id')
+    title_id = serializers.IntegerField()
+    rank = serializers.FloatField()
+    text = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SearchDocument
+        fields = ('type', 'id', 'title_id', 'rank', 'text')
+
+    def get_text(self, obj):
+        return obj.body[:200]
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(required=True, max_length=200)
+    type = serializers.MultipleChoiceField(
+        choices=SearchDocument.KIND_CHOICES, required=False)
+    limit = serializers.IntegerField(
+        required=False, default=20, min_value=1, max_value=100)
+    offset = serializers.IntegerField(required=False, default=0, min_value=0)
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    # Не format: этот параметр DRF занимает под выбор рендерера.
+    output = serializers.ChoiceField(
+        choices=list(EXPORT_FORMATS), required=False, default='ndjson')
+    updated_since = serializers.DateTimeField(required=False)
@@ -0,0 +1,267 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .authentication import revoke_user_tokens
+from .cache import invalidate
+from .models import (Category, Comment, Genre, GenreTitle, Review, Title,
+                     TitleScoreCount, User, UserStats)
+from .search import index_object, remove_object
+
+# Модель -> пространства имён кэша ответов, которые зависят от неё.
+CACHE_DEPENDENCIES = {
+    Genre: ('genres', 'titles'),
+    Category: ('categories', 'titles'),
+    Title: ('titles',),
+    GenreTitle: ('titles',),
+    Review: ('titles',),
+}
+
+
+def change_rating(title_id, score_delta, count_delta):
+    Title.objects.filter(pk=title_id).update(
+        score_sum=F('score_sum') + score_delta,
+        score_count=F('score_count') + count_delta,
+    )
+
+
+def change_histogram(title_id, score, delta):
+    """Меняет на delta число отзывов с оценкой score в гистограмме."""
+    counts = TitleScoreCount.objects.filter(title_id=title_id, score=score)
+    if delta < 0:
+        counts.filter(count__gte=-delta).update(count=F('count') + delta)
+        return
+    if counts.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            TitleScoreCount.objects.create(
+                title_id=title_id, score=score, count=delta)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        counts.update(count=F('count') + delta)
+
+
+def change_user_stats(user_id, reviews=0, comments=0, score=0, activity=None):
+    """
+    Меняет счётчики пользователя на заданные приращения; строка
+    создаётся при первой записи. Уменьшение ниже нуля пропускается:
+    такое расхождение исправляет recalculate_user_stats.
+    """
+    counters = {
+        'review_count': reviews, 'comment_count': comments,
+        'score_sum': score,
+    }
+    stats = UserStats.objects.filter(user_id=user_id)
+    changes = {}
+    for field, delta in counters.items():
+        if delta:
+            changes[field] = F(field) + delta
+        if delta < 0:
+            stats = stats.filter(**{f'{field}__gte': -delta})
+    if activity is not None:
+        changes['last_activity'] = activity
+    if not changes or stats.update(**changes) or min(counters.values()) < 0:
+        return
+    try:
+        with transaction.atomic():
+            UserStats.objects.create(
+                user_id=user_id, last_activity=activity, **counters)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        stats.update(**changes)
+
+
+def update_title_counters(instance, created, loaded_score, loaded_title_id):
+    """Инкрементально обновляет рейтинг и гистограмму оценок."""
+    if created:
+        change_rating(instance.title_id, instance.score, 1)
+        change_histogram(instance.title_id, instance.score, 1)
+    elif loaded_score is None or loaded_title_id is None:
+        titles = Title.objects.filter(pk=instance.title_id)
+        titles.recalculate_rating()
+        titles.rebuild_histogram()
+    elif loaded_title_id != instance.title_id:
+        change_rating(loaded_title_id, -loaded_score, -1)
+        change_rating(instance.title_id, instance.score, 1)
+        change_histogram(loaded_title_id, loaded_score, -1)
+        change_histogram(instance.title_id, instance.score, 1)
+    elif loaded_score != instance.score:
+        change_rating(instance.title_id, instance.score - loaded_score, 0)
+        change_histogram(instance.title_id, loaded_score, -1)
+        change_histogram(instance.title_id, instance.score, 1)
+
+
+def update_author_counters(instance, created, loaded_score,
+                           loaded_author_id):
+    """Обновляет счётчики автора отзыва."""
+    if created:
+        change_user_stats(instance.author_id, reviews=1, score=instance.score,
+                          activity=instance.pub_date)
+    elif loaded_score is None or loaded_author_id is None:
+        UserStats.objects.rebuild(User.objects.filter(pk=instance.author_id))
+    elif loaded_author_id != instance.author_id:
+        change_user_stats(loaded_author_id, reviews=-1, score=-loaded_score)
+        change_user_stats(instance.author_id, reviews=1, score=instance.score,
+                          activity=instance.pub_date)
+    else:
+        change_user_stats(instance.author_id,
+                          score=instance.score - loaded_score,
+                          activity=instance.pub_date)
+
+
+@receiver(post_save, sender=Review)
+def update_counters_on_review_save(sender, instance, created, raw,
+                                   **kwargs):
+    """
+    Обновляет рейтинг, гистограмму, счётчики автора и кэш отзывов
+    произведения (при переносе отзыва - и прежнего) по одному снимку
+    оценки, произведения и автора, учтённых до этой записи. Снимок
+    обновляется только здесь, после всех изменений. Загрузка фикстур
+    (raw) счётчики не меняет: их пересчитывают recalculate_ratings,
+    rebuild_score_histograms и recalculate_user_stats.
+    """
+    loaded_score = getattr(instance, '_loaded_score', None)
+    loaded_title_id = getattr(instance, '_loaded_title_id', None)
+    loaded_author_id = getattr(instance, '_loaded_author_id', None)
+    if not raw:
+        update_title_counters(
+            instance, created, loaded_score, loaded_title_id)
+        update_author_counters(
+            instance, created, loaded_score, loaded_author_id)
+    title_ids = {instance.title_id, loaded_title_id} - {None}
+    invalidate(*(f'reviews:{title_id}' for title_id in title_ids))
+    instance.remember_rating_state()
+
+
+@receiver(post_delete, sender=Review)
+def update_counters_on_review_delete(sender, instance, **kwargs):
+    """Вычитает удалённый отзыв из рейтинга, гистограммы и счётчиков."""
+    score = getattr(instance, '_loaded_score', None)
+    if score is None:
+        score = instance.score
+    title_id = getattr(instance, '_loaded_title_id', None) or instance.title_id
+    author_id = (getattr(instance, '_loaded_author_id', None)
+                 or instance.author_id)
+    change_rating(title_id, -score, -1)
+    change_histogram(title_id, score, -1)
+    change_user_stats(author_id, reviews=-1, score=-score)
+    invalidate(*{f'reviews:{title_id}', f'reviews:{instance.title_id}'})
+
+
+@receiver(post_save, sender=Comment)
+def update_author_stats_on_comment_save(sender, instance, created, **kwargs):
+    if not kwargs.get('raw'):
+        change_user_stats(instance.author_id, comments=int(created),
+                          activity=instance.pub_date)
+
+
+@receiver(post_delete, sender=Comment)
+def update_author_stats_on_comment_delete(sender, instance, **kwargs):
+    change_user_stats(instance.author_id, comments=-1)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_response_cache(sender, **kwargs):
+    if sender in CACHE_DEPENDENCIES:
+        invalidate(*CACHE_DEPENDENCIES[sender])
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def invalidate_title_reviews_on_title_change(sender, instance, **kwargs):
+    # Отзывы показывают название произведения, а у удалённого
+    # произведения без отзывов список иначе остался бы в кэше.
+    invalidate(f'reviews:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_review_comments(sender, instance, **kwargs):
+    invalidate(f'comments:{instance.review_id}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate('titles')
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_titles(sender, instance, **kwargs):
+    """
+    Произведения показывают слаг категории, а удаление категории обнуляет
+    её у произведений запросом UPDATE без сигналов модели Title.
+    """
+    if not kwargs.get('created') and not kwargs.get('raw'):
+        Title.objects.filter(category=instance).touch()
+
+
+@receiver(post_save, sender=Genre)
+def touch_genre_titles(sender, instance, created, **kwargs):
+    if not created and not kwargs.get('raw'):
+        Title.objects.filter(genre=instance).touch()
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def touch_linked_title(sender, instance, **kwargs):
+    # В том числе связи, удаляемые каскадом вместе с жанром.
+    if not kwargs.get('raw'):
+        Title.objects.filter(pk=instance.title_id).touch()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genre_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    # title.genre.set() и genre.title_set.add() не сохраняют связи по одной.
+    if not reverse:
+        titles = Title.objects.filter(pk=instance.pk)
+    elif action == 'pre_clear':
+        titles = Title.objects.filter(genre=instance)
+    else:
+        titles = Title.objects.filter(pk__in=pk_set or ())
+    if action in ('post_add', 'post_remove', 'pre_clear'):
+        titles.touch()
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def update_search_index(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        index_object(instance)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_claims_change(sender, instance, created, **kwargs):
+    """Токены с устаревшими ролью или флагами больше не принимаются."""
+    loaded_claims = getattr(instance, '_loaded_claims', None)
+    if not created and loaded_claims != instance.get_claims():
+        revoke_user_tokens(instance.pk)
+    instance.remember_claims()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_profile(sender, instance, created, **kwargs):
+    """Отзывы и комментарии показывают имя и профиль автора."""
+    loaded_profile = getattr(instance, '_loaded_profile', None)
+    if not created and loaded_profile != instance.get_profile():
+        invalidate('authors')
+    instance.remember_profile()
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
@@ -0,0 +1,68 @@
+from django.db.models import Max
+
+from api_yamdb.settings import RATING_SCORE
+
+from .models import Review, TitleScoreCount, UserStats
+
+SCORES = range(RATING_SCORE['min'], RATING_SCORE['max'] + 1)
+
+
+def get_histogram(title_id):
+    """Число отзывов для каждой оценки от минимальной до максимальной."""
+    counts = dict(TitleScoreCount.objects.filter(
+        title_id=title_id).values_list('score', 'count'))
+    return {score: counts.get(score, 0) for score in SCORES}
+
+
+def histogram_median(histogram):
+    total = sum(histogram.values())
+    if not total:
+        return None
+    # Позиции средних элементов (для чётного числа - два соседних).
+    middle = {(total - 1) // 2, total // 2}
+    values = []
+    seen = 0
+    for score, count in histogram.items():
+        values += [score for position in middle
+                   if seen <= position < seen + count]
+        seen += count
+    return sum(values) / len(values)
+
+
+def get_title_stats(title):
+    """
+    Статистика оценок произведения: гистограмма, среднее, медиана
+    и дата последнего отзыва. Все значения читаются из готовых
+    счётчиков и индекса отзывов, без обхода отзывов.
+    """
+    histogram = get_histogram(title.pk)
+    last_review = Review.objects.filter(
+        title_id=title.pk).aggregate(last=Max('pub_date'))['last']
+    return {
+        'id': title.pk,
+        'count': title.score_count,
+        'mean': (round(title.score_sum / title.score_count, 2)
+                 if title.score_count else None),
+        'median': histogram_median(histogram),
+        'histogram': {str(score): count for score, count in histogram.items()},
+        'last_review': last_review,
+    }
+
+
+def get_user_stats(user):
+    """
+    Счётчики пользователя: число отзывов и комментариев, средняя
+    поставленная оценка и время последней записи. Для пользователя
+    без отзывов и комментариев строки счётчиков нет - отдаются нули.
+    """
+    try:
+        stats = user.stats
+    except UserStats.DoesNotExist:
+        stats = UserStats(user=user)
+    mean = stats.mean_score
+    return {
+        'reviews': stats.review_count,
+        'comments': stats.comment_count,
+        'mean_score': round(mean, 2) if mean is not None else None,
+        'last_activity': stats.last_activity,
+    }
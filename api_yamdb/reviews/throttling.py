@@ -0,0 +1,243 @@
+import threading
+import time
+from collections import OrderedDict
+
+from api.metrics import THROTTLE_CHECKS
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Сколько вёдер процесс помнит; давно не использованные вытесняются.
+LOCAL_BUCKETS_SIZE = 10000
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 60): ёмкость ведра и время его наполнения, с."""
+    number, period = rate.split('/')
+    return int(number), PERIODS[period[0]]
+
+
+def get_scope(view):
+    return (getattr(view, 'throttle_scope', None)
+            or getattr(view, 'basename', None)
+            or type(view).__name__)
+
+
+def increment(cache, key, delta, timeout):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key, delta)
+
+
+class LocalBuckets:
+    """
+    Токены, которые процесс заранее списал из общего ведра (аренда),
+    и последняя известная заполненность ведра. Пока арендованные токены
+    есть, запрос проходит без обращения к кэшу. Аренда действует
+    в пределах своего отрезка времени.
+    """
+
+    def __init__(self, size=LOCAL_BUCKETS_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def take(self, key, slot):
+        """Берёт арендованный токен; иначе возвращает состояние ведра."""
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None or bucket['slot'] != slot:
+                return False, None
+            self.buckets.move_to_end(key)
+            if bucket['leased']:
+                bucket['leased'] -= 1
+                return True, bucket
+            return False, dict(bucket)
+
+    def give_back(self, key, slot):
+        """Возвращает токен в аренду; False - аренды этого отрезка нет."""
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None or bucket['slot'] != slot:
+                return False
+            bucket['leased'] += 1
+            return True
+
+    def update(self, key, slot, previous, leased, used):
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is not None and bucket['slot'] == slot:
+                # Аренду, взятую другим потоком, не теряем.
+                leased += bucket['leased']
+            self.buckets[key] = {
+                'slot': slot, 'previous': previous, 'leased': leased,
+                'used': used,
+            }
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.size:
+                self.buckets.popitem(last=False)
+
+
+_local_buckets = LocalBuckets()
+
+
+def is_throttled(request):
+    return getattr(request, '_throttle_denied', False)
+
+
+def refund_tokens(request):
+    """
+    Возвращает токены, которые запрос уже списал из других вёдер,
+    когда его отклоняет следующее ограничение: в аренду процесса,
+    если её отрезок не сменился, иначе в общий счётчик.
+    """
+    cache = caches[settings.THROTTLING['CACHE']]
+    for local, key, slot in getattr(request, '_throttle_tokens', ()):
+        if local.give_back(key, slot):
+            continue
+        try:
+            cache.decr(f'{key}:{slot}')
+        except ValueError:
+            # Счётчик отрезка уже истёк.
+            pass
+    request._throttle_tokens = []
+
+
+class BucketThrottle(BaseThrottle):
+    """
+    Ведро токенов: rate '20/min' - не больше 20 запросов подряд, пустое
+    ведро наполняется за минуту. Расход считают атомарные incr общего
+    кэша (THROTTLING['CACHE']) по отрезкам длиной в период;
+    заполненность ведра - счётчик текущего отрезка и убывающая доля
+    предыдущего.
+
+    Клиент, занявший меньше FAST_PATH_SHARE ведра, списывает токены
+    пачкой до LEASE_SHARE ёмкости, и следующие его запросы к этому
+    процессу проходят без обращения к кэшу. Арендованные токены уже
+    учтены в общем счётчике, поэтому лимит не превышается.
+
+    Лимит берётся из throttle_rates[kind] у view, затем из
+    DEFAULT_THROTTLE_RATES['<scope>.<kind>'] и DEFAULT_THROTTLE_RATES[kind];
+    None отключает ограничение, '0/<период>' запрещает запись. Запросы
+    чтения не ограничиваются. Если запрос отклоняет одно из ограничений,
+    токены, списанные для него другими, возвращаются в их вёдра.
+    """
+    kind = None
+    local = _local_buckets
+
+    def get_bucket_ident(self, request):
+        raise NotImplementedError
+
+    def get_rate(self, view, scope):
+        rates = getattr(view, 'throttle_rates', None) or {}
+        if self.kind in rates:
+            return rates[self.kind]
+        defaults = api_settings.DEFAULT_THROTTLE_RATES
+        return defaults.get(f'{scope}.{self.kind}', defaults.get(self.kind))
+
+    def allow_request(self, request, view):
+        # Запрос уже отклонён другим ограничением: токены не списываются.
+        if request.method in SAFE_METHODS or is_throttled(request):
+            return True
+        scope = get_scope(view)
+        rate = self.get_rate(view, scope)
+        ident = self.get_bucket_ident(request)
+        if rate is None or ident is None:
+            return True
+        capacity, period = parse_rate(rate)
+        key = f'throttle:{self.kind}:{scope}:{ident}'
+        now = time.time()
+        if self.take(key, capacity, period, now):
+            tokens = getattr(request, '_throttle_tokens', [])
+            slot = int(now // period)
+            request._throttle_tokens = tokens + [(self.local, key, slot)]
+            return True
+        refund_tokens(request)
+        request._throttle_denied = True
+        return False
+
+    def take(self, key, capacity, period, now):
+        if not capacity:
+            # Лимит '0/<период>' закрывает запись совсем.
+            THROTTLE_CHECKS.labels(self.kind, 'denied').inc()
+            self.wait_seconds = float(period)
+            return False
+        taken, bucket = self.local.take(key, int(now // period))
+        if taken:
+            THROTTLE_CHECKS.labels(self.kind, 'local').inc()
+            return True
+        return self.consume(key, capacity, period, now, bucket)
+
+    def consume(self, key, capacity, period, now, bucket):
+        """Списывает токены в общем кэше и решает по заполненности ведра."""
+        config = settings.THROTTLING
+        cache = caches[config['CACHE']]
+        slot = int(now // period)
+        decay = 1 - now % period / period
+        if bucket is None:
+            previous = cache.get(f'{key}:{slot - 1}', 0)
+            used = previous * decay
+        else:
+            previous, used = bucket['previous'], bucket['used']
+        lease = max(1, min(
+            int(capacity * config['LEASE_SHARE']),
+            int(capacity * config['FAST_PATH_SHARE'] - used),
+        ))
+        # Счётчик нужен два периода: как текущий и как предыдущий.
+        count = increment(cache, f'{key}:{slot}', lease, 2 * period)
+        used = previous * decay + count
+        if used <= capacity:
+            self.local.update(key, slot, previous, lease - 1, used)
+            THROTTLE_CHECKS.labels(self.kind, 'shared').inc()
+            return True
+        cache.decr(f'{key}:{slot}', lease)
+        count -= lease
+        self.local.update(key, slot, previous, 0, used - lease)
+        THROTTLE_CHECKS.labels(self.kind, 'denied').inc()
+        # Когда освободится токен: в этом отрезке, пока убывает доля
+        # предыдущего, или в следующем, где предыдущим станет текущий.
+        if count < capacity and previous:
+            self.wait_seconds = max(
+                0.0, 1 - (capacity - 1 - count) / previous - (1 - decay)
+            ) * period
+        else:
+            self.wait_seconds = (
+                decay + max(0.0, 1 - (capacity - 1) / count)) * period
+        return False
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class IPThrottle(BucketThrottle):
+    """
+    Ведро на адрес клиента. За NUM_PROXIES прокси адрес - NUM_PROXIES-й
+    с конца в X-Forwarded-For: его дописывает сам прокси, поэтому
+    присланный клиентом заголовок ведро не меняет.
+    """
+    kind = 'ip'
+
+    def get_bucket_ident(self, request):
+        return self.get_ident(request)
+
+
+class UserThrottle(BucketThrottle):
+    """Ведро на пользователя; анонимные запросы не ограничивает."""
+    kind = 'user'
+
+    def get_bucket_ident(self, request):
+        user = request.user
+        return user.pk if user and user.is_authenticated else None
+
+
+class RouteThrottle(BucketThrottle):
+    """Одно ведро на маршрут для всех клиентов."""
+    kind = 'route'
+
+    def get_bucket_ident(self, request):
+        return 'all'
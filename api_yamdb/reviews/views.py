@@ -1,32 +1,43 @@
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
-from django.http import QueryDict
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status
 from rest_framework.decorators import action, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.tokens import RefreshToken
 from reviews.models import Category, Comment, Genre, Review, Title, User
 
+from .authentication import ClaimsAccessToken
+from .bulk import MAX_ITEMS, create_titles
+from .confirmation import check_confirmation_code, make_confirmation_code
+from .export import DATASETS, EXPORT_FORMATS, export
 from .filters import TitleFilters
-from .mixins import ListCreateDestroyMixin
+from .mail import enqueue_mail
+from .mixins import FastReadMixin, ListCreateDestroyMixin, ResponseCacheMixin
+from .pagination import CursorOrPageNumberPagination
 from .permissions import (IsAdmin, IsAdminOrReadOnly,
                           IsAuthorModeratorAdminSuperuser)
+from .rankings import BOARDS, get_leaderboard
+from .readers import CommentReader, ReviewReader, TitleReader
+from .search import search
 from .serializers import (AdminUserSerializer, CategorySerializer,
-                          CommentSerializer, GenreSerializer,
-                          ReviewsSerializer, SafeMethodTitleSerializer,
-                          SignupSerializer, TitleSerializer, TokenSerializer,
-                          UserSerializer)
+                          CommentSerializer, ExportQuerySerializer,
+                          GenreSerializer, RankedTitleSerializer,
+                          RankingQuerySerializer, ReviewsSerializer,
+                          SafeMethodTitleSerializer, SearchQuerySerializer,
+                          SearchResultSerializer, SignupSerializer,
+                          TitleSerializer, TokenSerializer, UserSerializer)
+from .stats import get_title_stats
 
 
-class AbstractViewSet(ListCreateDestroyMixin):
+class AbstractViewSet(ResponseCacheMixin, ListCreateDestroyMixin):
     serializer_class = ...
     queryset = ...
     permission_classes = [IsAdminOrReadOnly, ]
@@ -39,45 +50,70 @@ class AbstractViewSet(ListCreateDestroyMixin):
         abstract = True
 
 
-class CommentViewSet(ModelViewSet):
+class CommentViewSet(ResponseCacheMixin, FastReadMixin, ModelViewSet):
     serializer_class = CommentSerializer
-    pagination_class = PageNumberPagination
+    reader = CommentReader()
+    pagination_class = CursorOrPageNumberPagination
     permission_classes = [
         IsAuthorModeratorAdminSuperuser,
         IsAuthenticatedOrReadOnly
     ]
+    # Комментарии пишут люди: больше 30 в минуту - это спам.
+    throttle_rates = {'user': '30/min'}
+    cache_namespace = 'comments'
+
+    def get_cache_namespaces(self):
+        return (f'comments:{self.kwargs["review_id"]}', 'authors')
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
 
     def get_queryset(self):
-        queryset = Comment.objects.filter(
-            review_id=self.kwargs['review_id'])
-        return queryset
+        # Автор нужен ответу на PATCH; чтение идёт через reader и .values().
+        return Comment.objects.filter(
+            review_id=self.kwargs['review_id']).select_related('author')
 
     def perform_create(self, serializer):
         review = get_object_or_404(Review, id=self.kwargs['review_id'])
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author_id=self.request.user.pk, review=review)
 
 
-class ReviewsViewSet(ModelViewSet):
+class ReviewsViewSet(ResponseCacheMixin, FastReadMixin, ModelViewSet):
     serializer_class = ReviewsSerializer
-    pagination_class = PageNumberPagination
+    reader = ReviewReader()
+    pagination_class = CursorOrPageNumberPagination
     permission_classes = [
         IsAuthorModeratorAdminSuperuser,
         IsAuthenticatedOrReadOnly
     ]
+    throttle_rates = {'user': '30/min'}
+    cache_namespace = 'reviews'
+
+    def get_cache_namespaces(self):
+        return (f'reviews:{self.kwargs["title_id"]}', 'authors')
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get("title_id"))
-        return title.review.all()
+        if self.action == 'list':
+            # Для списка нет объекта, который дал бы 404 сам.
+            get_object_or_404(Title, pk=self.kwargs['title_id'])
+        return Review.objects.filter(
+            title_id=self.kwargs['title_id']
+        ).select_related('author', 'title')
 
     def create(self, request, *args, **kwargs):
         title = get_object_or_404(Title, id=self.kwargs['title_id'])
         serializer = ReviewsSerializer(data=request.data)
 
         if serializer.is_valid(raise_exception=True):
-            if title.review.filter(author=self.request.user).exists():
+            if title.review.filter(author_id=self.request.user.pk).exists():
 
                 return Response(status=status.HTTP_400_BAD_REQUEST)
-            serializer.save(author=self.request.user, title=title)
+            serializer.save(author_id=self.request.user.pk, title=title)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -85,28 +121,106 @@ class ReviewsViewSet(ModelViewSet):
 class GenreViewSet(AbstractViewSet):
     serializer_class = GenreSerializer
     queryset = Genre.objects.all()
+    cache_namespace = 'genres'
 
 
 class CategoryViewSet(AbstractViewSet):
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
+    cache_namespace = 'categories'
 
 
-class TitleViewSet(ModelViewSet):
-    queryset = Title.objects.all().annotate(Avg('review__score'))
+class TitleViewSet(ResponseCacheMixin, FastReadMixin, ModelViewSet):
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre')
+    reader = TitleReader()
     permission_classes = [IsAdminOrReadOnly, ]
     pagination_class = PageNumberPagination
     filter_backends = [DjangoFilterBackend, ]
     filterset_class = TitleFilters
+    cache_namespace = 'titles'
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action in ("retrieve", "list"):
             return SafeMethodTitleSerializer
         return TitleSerializer
 
+    @action(detail=False, methods=['get'], url_path='top', url_name='top')
+    def top(self, request):
+        return self.cached_response(
+            self.get_leaderboard, request, board='top')
+
+    @action(
+        detail=False, methods=['get'],
+        url_path='trending', url_name='trending',
+    )
+    def trending(self, request):
+        return self.cached_response(
+            self.get_leaderboard, request, board='trending')
+
+    def get_leaderboard(self, request, board):
+        params = RankingQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        rows = get_leaderboard(board, **params.validated_data)
+        titles = self.get_queryset().in_bulk([row.title_id for row in rows])
+        ranked = []
+        for rank, row in enumerate(rows, start=1):
+            title = titles[row.title_id]
+            title.rank = rank
+            title.score = getattr(row, BOARDS[board])
+            ranked.append(title)
+        return Response(
+            {'results': RankedTitleSerializer(ranked, many=True).data},
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['get'], url_path='stats', url_name='stats')
+    def stats(self, request, pk=None):
+        return self.cached_response(self.get_stats, request, pk=pk)
+
+    def get_stats(self, request, pk=None):
+        title = get_object_or_404(
+            Title.objects.only('score_sum', 'score_count'), pk=pk)
+        return Response(get_title_stats(title), status=status.HTTP_200_OK)
+
+    @action(
+        detail=False, methods=['post'],
+        url_path='bulk', url_name='bulk',
+    )
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'detail': 'Ожидается непустой список произведений.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > MAX_ITEMS:
+            return Response(
+                {'detail': f'Не больше {MAX_ITEMS} произведений за запрос.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        results = create_titles(items)
+        created = sum(result['status'] == 'created' for result in results)
+        if created == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+        }, status=response_status)
+
 
 class UserViewSet(ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('stats')
     serializer_class = AdminUserSerializer
     permission_classes = (IsAdmin, )
     filter_backends = (filters.SearchFilter,)
@@ -121,10 +235,13 @@ class UserViewSet(ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def about_me(self, request):
-        serializer = UserSerializer(request.user)
+        # request.user может быть собран из токена, профиль читается из БД.
+        user = get_object_or_404(
+            User.objects.select_related('stats'), pk=request.user.pk)
+        serializer = UserSerializer(user)
         if request.method == 'PATCH':
             serializer = UserSerializer(
-                request.user, data=request.data, partial=True
+                user, data=request.data, partial=True
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
@@ -132,47 +249,56 @@ class UserViewSet(ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-def send_confirmation_code(user):
-    user.confirmation_code = default_token_generator.make_token(user)
-    user.save()
+def send_confirmation_code(email, code):
+    # Письмо уходит из очереди командой send_mail_queue.
     subject = 'Код подтверждения YaMDb'
-    message = f'{user.confirmation_code} - ваш код для авторизации на YaMDb'
+    message = f'{code} - ваш код для авторизации на YaMDb'
     admin_email = 'admin@yamdb.ru'
-    user_email = [user.email]
-    return send_mail(subject, message, admin_email, user_email)
+    return enqueue_mail(subject, message, admin_email, [email])
 
 
 @permission_classes([AllowAny])
 class UserRegView(APIView):
+    throttle_scope = 'signup'
+
     def post(self, request):
-        data = request.data
-        serializer = SignupSerializer(data=data)
-        if isinstance(data, QueryDict):
-            data = data.dict()
-        if User.objects.filter(**data).exists():
-            user = User.objects.get(**data)
-            if user.last_login and user.confirmation_code:
-                return Response(
-                    'Учетная запись уже активирована',
-                    status=status.HTTP_200_OK
-                )
-            send_confirmation_code(user)
-            return Response(serializer.initial_data, status=status.HTTP_200_OK)
-        else:
-            if serializer.is_valid():
-                user, created = User.objects.update_or_create(
-                    **serializer.validated_data
-                )
-                send_confirmation_code(user)
-                return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = SignupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        username = serializer.validated_data['username']
+        email = serializer.validated_data['email']
+        code, stored_code = make_confirmation_code(username)
+        # Новый код сохраняется только вместе с письмом: если письмо
+        # не встало в очередь, остаётся действовать прежний код.
+        with transaction.atomic():
+            signed_up = User.objects.signup(username, email, stored_code)
+            if signed_up:
+                send_confirmation_code(email, code)
+        if not signed_up:
+            return self.conflict(username, email)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def conflict(self, username, email):
+        """Ответ, если регистрация не прошла: только здесь нужен SELECT."""
+        users = list(User.objects.filter(
+            Q(username=username) | Q(email=email)
+        ).values_list('username', 'email'))
+        if (username, email) in users:
             return Response(
-                serializer.errors,
-                status=status.HTTP_400_BAD_REQUEST
+                'Учетная запись уже активирована',
+                status=status.HTTP_200_OK
             )
+        errors = {}
+        if any(row[0] == username for row in users):
+            errors['username'] = ['Это имя пользователя уже занято.']
+        if any(row[1] == email for row in users):
+            errors['email'] = ['Эта почта уже занята.']
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @permission_classes([AllowAny])
 class GetTokenView(APIView):
+    throttle_scope = 'token'
+
     def post(self, request):
         serializer = TokenSerializer(data=request.data)
         if not serializer.is_valid():
@@ -180,8 +306,58 @@ class GetTokenView(APIView):
         username = serializer.data['username']
         user = get_object_or_404(User, username=username)
         confirmation_code = serializer.data['confirmation_code']
-        if not default_token_generator.check_token(user, confirmation_code):
+        if not check_confirmation_code(
+                user.username, user.confirmation_code, confirmation_code):
             return Response({'Wrong Code'}, status=status.HTTP_400_BAD_REQUEST)
-        token = RefreshToken.for_user(user)
-        return Response({'token': str(token.access_token)},
+        token = ClaimsAccessToken.for_user(user)
+        return Response({'token': str(token)},
                         status=status.HTTP_200_OK)
+
+
+class SearchView(APIView):
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        count, facets, documents = search(
+            params.validated_data['q'],
+            kinds=params.validated_data.get('type'),
+            limit=params.validated_data['limit'],
+            offset=params.validated_data['offset'],
+        )
+        return Response({
+            'count': count,
+            'facets': facets,
+            'results': SearchResultSerializer(documents, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+
+class ExportView(APIView):
+    """
+    Потоковая выгрузка titles, reviews или comments в NDJSON или CSV
+    (?output=), с ?updated_since= - только строки, изменённые с этого
+    момента. Строки читаются и отправляются страницами, ответ не
+    собирается в памяти целиком.
+    """
+    permission_classes = (IsAdmin,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # Формат ответа задаёт ?output=, а не Accept: text/csv не должен
+        # давать 406 из-за того, что рендереры у DRF только JSON.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            raise NotFound('Нет такой выгрузки.')
+        params = ExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        output = params.validated_data['output']
+        response = StreamingHttpResponse(
+            export(dataset, output, params.validated_data.get(
+                'updated_since')),
+            content_type=f'{EXPORT_FORMATS[output][1]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{output}"')
+        return response
@@ -1,9 +1,102 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture
+def api_client():
+    from rest_framework.test import APIClient
+
+    return APIClient()
+
+
+@pytest.fixture
+def make_user():
+    """Создаёт пользователя с почтой <username>@yamdb.ru."""
+    from reviews.models import User
+
+    def make(username, **fields):
+        fields.setdefault('email', f'{username}@yamdb.ru')
+        return User.objects.create(username=username, **fields)
+
+    return make
+
+
+@pytest.fixture
+def author(make_user):
+    return make_user('author')
+
+
+@pytest.fixture
+def admin(make_user):
+    from reviews.models import User
+
+    return make_user('admin', role=User.ADMIN)
+
+
+@pytest.fixture
+def category():
+    from reviews.models import Category
+
+    return Category.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genre():
+    from reviews.models import Genre
+
+    return Genre.objects.create(name='Драма', slug='drama')
+
+
+@pytest.fixture
+def make_title():
+    from reviews.models import Title
+
+    def make(name='Сталкер', year=1979, genres=(), **fields):
+        title = Title.objects.create(name=name, year=year, **fields)
+        if genres:
+            title.genre.set(genres)
+        return title
+
+    return make
+
+
+@pytest.fixture
+def title(make_title, category, genre):
+    return make_title(description='Зона', category=category, genres=[genre])
+
+
+@pytest.fixture
+def make_review():
+    from reviews.models import Review
+
+    def make(title, author, score=9, text='Отзыв', **fields):
+        return Review.objects.create(
+            title=title, author=author, score=score, text=text, **fields)
+
+    return make
+
+
+@pytest.fixture
+def review(make_review, title, author):
+    return make_review(title, author)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    from reviews.authentication import _local_denylist
+
+    cache.clear()
+    _local_denylist.clear()
+    yield
+    cache.clear()
+    _local_denylist.clear()
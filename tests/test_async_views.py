@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import include, path
+
+
+def get_urlpatterns():
+    from api.urls import router_v1
+    from reviews.async_views import async_read_urls
+    from reviews.views import CommentViewSet, ReviewsViewSet, TitleViewSet
+
+    return [path('api/v1/', include((async_read_urls(
+        router_v1.urls, (TitleViewSet, ReviewsViewSet, CommentViewSet)
+    ), 'api')))]
+
+
+urlpatterns = get_urlpatterns()
+
+
+@pytest.fixture
+def dataset(title, review, author):
+    from reviews.models import Comment
+
+    Comment.objects.create(review=review, author=author, text='Комментарий')
+    return title, review
+
+
+def read_paths(title, review):
+    base = f'/api/v1/titles/{title.pk}/'
+    return [
+        '/api/v1/titles/',
+        base,
+        base + 'reviews/',
+        f'{base}reviews/{review.pk}/',
+        f'{base}reviews/{review.pk}/comments/',
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncReadViews:
+
+    def test_only_read_viewsets_are_async(self):
+        async_views = {
+            pattern.callback.cls.__name__
+            for pattern in urlpatterns[0].url_patterns
+            if asyncio.iscoroutinefunction(pattern.callback)
+        }
+        assert async_views == {
+            'TitleViewSet', 'ReviewsViewSet', 'CommentViewSet'}
+
+    def test_same_responses_as_sync_views(
+            self, api_client, dataset, settings):
+        sync_responses = [
+            api_client.get(url) for url in read_paths(*dataset)]
+
+        settings.ROOT_URLCONF = __name__
+        client = AsyncClient()
+        async_responses = [
+            async_to_sync(client.get)(url) for url in read_paths(*dataset)]
+
+        for sync_response, async_response in zip(
+                sync_responses, async_responses):
+            assert async_response.status_code == sync_response.status_code
+            assert async_response.json() == sync_response.json()
+
+    def test_write_keeps_permissions(self, dataset, settings):
+        title, _ = dataset
+        settings.ROOT_URLCONF = __name__
+        client = AsyncClient()
+        response = async_to_sync(client.post)(
+            '/api/v1/titles/', {'name': 'Новое'},
+            content_type='application/json')
+        delete = async_to_sync(client.delete)(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 401
+        assert delete.status_code == 401
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+
+@pytest.mark.django_db
+class TestBenchmarkApi:
+
+    def test_reports_every_route(self, tmp_path):
+        output = tmp_path / 'bench.json'
+        call_command(
+            'benchmark_api', titles=3, reviews=2, comments=1, repeat=2,
+            output=str(output)
+        )
+        results = json.loads(output.read_text())['results']
+        assert set(results) == {
+            'titles-list', 'titles-detail', 'titles-stats', 'genres-list',
+            'categories-list',
+            'reviews-list', 'reviews-detail', 'comments-list',
+            'comments-detail', 'users-list', 'users-detail',
+        }
+        for result in results.values():
+            assert result['status'] == 200
+            assert {'queries', 'p50_ms', 'p95_ms', 'rows'} <= set(result)
+
+    def test_fails_when_budget_exceeded(self, tmp_path):
+        budgets = tmp_path / 'budgets.json'
+        budgets.write_text(json.dumps({'titles-list': {'queries': 0}}))
+        with pytest.raises(CommandError, match='titles-list: queries'):
+            call_command(
+                'benchmark_api', titles=2, reviews=1, comments=1, repeat=1,
+                budgets=str(budgets), output=str(tmp_path / 'bench.json')
+            )
+
+    def test_seeded_data_is_rolled_back(self, tmp_path):
+        from reviews.models import Title
+
+        call_command(
+            'benchmark_api', titles=2, reviews=1, comments=1, repeat=1,
+            output=str(tmp_path / 'bench.json')
+        )
+        assert not Title.objects.exists()
+
+
+@pytest.mark.django_db
+def test_benchmark_signup(tmp_path):
+    from reviews.models import OutgoingEmail, User
+
+    output = tmp_path / 'signup.json'
+    call_command('benchmark_signup', count=3, output=str(output))
+
+    results = json.loads(output.read_text())['results']
+    assert set(results) == {'signup', 'token'}
+    assert results['token']['queries'] == 1
+    assert all(result['errors'] == 0 for result in results.values())
+    assert not User.objects.exists()
+    assert not OutgoingEmail.objects.exists()
+
+
+@pytest.mark.parametrize('values,percent,expected', [
+    ([1, 2, 3, 4], 50, 2),
+    ([1, 2, 3, 4], 95, 4),
+    ([1, 2, 3, 4], 0, 1),
+    (list(range(1, 21)), 95, 19),
+    (list(range(1, 101)), 50, 50),
+    ([5], 99, 5),
+])
+def test_percentile_nearest_rank(values, percent, expected):
+    from reviews.benchmark import percentile
+
+    assert percentile(values, percent) == expected
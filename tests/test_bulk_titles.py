@@ -0,0 +1,114 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+URL = '/api/v1/titles/bulk/'
+
+
+@pytest.fixture
+def editor(api_client, admin, category):
+    from reviews.models import Genre
+
+    api_client.force_authenticate(admin)
+    Genre.objects.bulk_create([
+        Genre(name=f'Жанр {number}', slug=f'genre-{number}')
+        for number in range(5)
+    ])
+    return api_client
+
+
+def make_items(count):
+    return [
+        {
+            'name': f'Произведение {number}',
+            'year': 2000,
+            'description': 'Описание',
+            'genre': [f'genre-{number % 5}', f'genre-{(number + 1) % 5}'],
+            'category': 'movie',
+        }
+        for number in range(count)
+    ]
+
+
+def count_queries(queries, fragment):
+    return sum(fragment in query['sql'] for query in queries)
+
+
+@pytest.mark.django_db
+class TestBulkTitles:
+
+    def test_creates_titles_and_genre_links(self, editor):
+        from reviews.models import GenreTitle, Title
+
+        response = editor.post(URL, make_items(20), format='json')
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data['created'] == 20
+        assert [result['index'] for result in data['results']] \
+            == list(range(20))
+        title = Title.objects.get(pk=data['results'][3]['id'])
+        assert title.name == 'Произведение 3'
+        assert set(title.genre.values_list('slug', flat=True)) \
+            == {'genre-3', 'genre-4'}
+        assert GenreTitle.objects.count() == 40
+
+    def test_slugs_resolved_once_per_batch(self, editor):
+        with CaptureQueriesContext(connection) as context:
+            response = editor.post(URL, make_items(50), format='json')
+
+        assert response.status_code == 201
+        queries = context.captured_queries
+        assert count_queries(queries, 'FROM "reviews_genre"') == 1
+        assert count_queries(queries, 'FROM "reviews_category"') == 1
+        assert count_queries(queries, 'INSERT INTO "reviews_genretitle"') == 1
+        if connection.features.can_return_rows_from_bulk_insert:
+            assert count_queries(queries, 'INSERT INTO "reviews_title"') == 1
+
+    def test_reports_invalid_items(self, editor):
+        from reviews.models import Title
+
+        items = make_items(3)
+        items[0]['genre'] = ['unknown']
+        items[2]['year'] = 'не год'
+
+        response = editor.post(URL, items, format='json')
+
+        assert response.status_code == 207
+        results = response.json()['results']
+        assert [result['status'] for result in results] \
+            == ['error', 'created', 'error']
+        assert 'genre' in results[0]['errors']
+        assert 'year' in results[2]['errors']
+        assert Title.objects.count() == 1
+
+    def test_new_titles_visible_in_list_and_search(
+            self, editor, django_capture_on_commit_callbacks):
+        editor.get('/api/v1/titles/')
+        with django_capture_on_commit_callbacks(execute=True):
+            editor.post(URL, make_items(2), format='json')
+
+        assert editor.get('/api/v1/titles/').json()['count'] == 2
+        search = editor.get('/api/v1/search/', {'q': 'произведение'})
+        assert search.json()['count'] == 2
+
+    @pytest.mark.parametrize('payload', [[], {'name': 'Одно'}])
+    def test_rejects_non_list(self, editor, payload):
+        assert editor.post(URL, payload, format='json').status_code == 400
+
+    def test_requires_admin(self, api_client):
+        assert api_client.post(
+            URL, make_items(1), format='json').status_code == 401
+
+    def test_index_objects(self):
+        from reviews.models import SearchDocument, Title
+        from reviews.search import index_objects, search
+
+        titles = [Title.objects.create(name=f'Пачка {number}', year=2000,
+                                       description='Описание')
+                  for number in range(3)]
+        SearchDocument.objects.all().delete()
+
+        assert index_objects(titles) == 3
+        count, _, _ = search('пачка')
+        assert count == 3
@@ -0,0 +1,128 @@
+import gzip
+import json
+
+import brotli
+import pytest
+
+
+@pytest.fixture
+def review(make_title, make_review, category, author):
+    titles = [
+        make_title(f'Произведение {number}', year=2000,
+                   description='Описание ' * 40, category=category)
+        for number in range(5)
+    ]
+    return make_review(titles[0], author, score=7)
+
+
+@pytest.mark.django_db
+class TestCompression:
+
+    @pytest.mark.parametrize('accept, encoding, decompress', [
+        ('gzip, deflate, br', 'br', brotli.decompress),
+        ('gzip', 'gzip', gzip.decompress),
+        ('br;q=0, gzip;q=0.5', 'gzip', gzip.decompress),
+    ])
+    def test_negotiated_encoding(
+            self, api_client, review, accept, encoding, decompress):
+        plain = api_client.get('/api/v1/titles/')
+
+        response = api_client.get(
+            '/api/v1/titles/', HTTP_ACCEPT_ENCODING=accept)
+
+        assert response['Content-Encoding'] == encoding
+        assert 'Accept-Encoding' in response['Vary']
+        assert int(response['Content-Length']) == len(response.content)
+        assert len(response.content) < len(plain.content) / 3
+        assert json.loads(decompress(response.content)) == plain.json()
+        assert response['ETag'] == f'{plain["ETag"][:-1]}-{encoding}"'
+
+    @pytest.mark.parametrize('accept', ['', 'identity', 'gzip;q=0, br;q=0'])
+    def test_identity(self, api_client, review, accept):
+        response = api_client.get(
+            '/api/v1/titles/', HTTP_ACCEPT_ENCODING=accept)
+
+        assert not response.has_header('Content-Encoding')
+        assert 'Accept-Encoding' in response['Vary']
+
+    def test_small_and_write_responses_not_compressed(
+            self, api_client, review, admin, settings):
+        settings.COMPRESSION = {**settings.COMPRESSION, 'MIN_SIZE': 10 ** 6}
+        response = api_client.get(
+            '/api/v1/titles/', HTTP_ACCEPT_ENCODING='br')
+        assert not response.has_header('Content-Encoding')
+
+        settings.COMPRESSION = {**settings.COMPRESSION, 'MIN_SIZE': 0}
+        api_client.force_authenticate(admin)
+        response = api_client.post(
+            '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'},
+            HTTP_ACCEPT_ENCODING='br')
+        assert response.status_code == 201
+        assert not response.has_header('Content-Encoding')
+
+    def test_not_modified_before_queries(
+            self, api_client, review, django_assert_num_queries):
+        etag = api_client.get(
+            '/api/v1/titles/', HTTP_ACCEPT_ENCODING='br')['ETag']
+
+        with django_assert_num_queries(0):
+            response = api_client.get(
+                '/api/v1/titles/', HTTP_ACCEPT_ENCODING='br',
+                HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+
+
+@pytest.mark.django_db
+class TestReviewValidators:
+
+    def test_review_list_not_modified(
+            self, api_client, review, django_assert_num_queries):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        etag = api_client.get(url)['ETag']
+
+        with django_assert_num_queries(0):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+
+    def test_writes_change_etags(
+            self, api_client, review, django_capture_on_commit_callbacks):
+        from reviews.models import Comment, Title
+
+        reviews_url = f'/api/v1/titles/{review.title_id}/reviews/'
+        comments_url = f'{reviews_url}{review.pk}/comments/'
+        other_url = f'/api/v1/titles/{review.title_id + 1}/reviews/'
+
+        def etags():
+            return [api_client.get(url)['ETag']
+                    for url in (reviews_url, comments_url, other_url)]
+
+        before = etags()
+        with django_capture_on_commit_callbacks(execute=True):
+            Comment.objects.create(review=review, author=review.author,
+                                   text='Да')
+        after_comment = etags()
+        assert after_comment[0] == before[0]
+        assert after_comment[1] != before[1]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Title.objects.filter(pk=review.title_id).get().save()
+        after_title = etags()
+        assert after_title[0] != after_comment[0]
+        assert after_title[2] == before[2]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            review.author.email = 'new@yamdb.ru'
+            review.author.save()
+        after_email = etags()
+        assert after_email[:2] == after_title[:2]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            review.author.username = 'renamed'
+            review.author.save()
+        assert all(
+            new != old for new, old in zip(etags()[:2], after_email[:2]))
+        assert api_client.get(reviews_url).json()['results'][0][
+            'author'] == 'renamed'
@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.db import connection
+
+from .conftest import root_dir
+
+SETTINGS = '''
+from api_yamdb import settings
+database = settings.DATABASES['default']
+print(database['CONN_MAX_AGE'], database['DISABLE_SERVER_SIDE_CURSORS'])
+'''
+
+
+@pytest.fixture
+def closable(transactional_db):
+    if connection.vendor == 'sqlite':
+        pytest.skip('Соединение с базой SQLite в памяти не закрывается.')
+
+
+def closed(alias, reason):
+    from api.metrics import DB_CONNECTIONS_CLOSED
+
+    return DB_CONNECTIONS_CLOSED.labels(alias, reason)._value.get()
+
+
+def make_idle(seconds):
+    from api.db import release_connections
+
+    connection.ensure_connection()
+    release_connections()
+    connection.released_at -= seconds
+
+
+@pytest.mark.usefixtures('closable')
+class TestPersistentConnections:
+
+    def test_idle_connection_closed(self, settings):
+        from api.db import prepare_connections
+
+        before = closed('default', 'idle')
+        make_idle(settings.DB_POOL['IDLE_TIMEOUT'])
+
+        prepare_connections()
+
+        assert connection.connection is None
+        assert closed('default', 'idle') == before + 1
+
+    def test_health_check(self, settings, monkeypatch):
+        from api.db import prepare_connections
+
+        settings.DB_POOL = {**settings.DB_POOL, 'HEALTH_CHECK_AFTER': 1}
+        make_idle(0)
+        prepare_connections()
+        assert connection.connection is not None
+
+        before = closed('default', 'unusable')
+        make_idle(1)
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        prepare_connections()
+
+        assert connection.connection is None
+        assert closed('default', 'unusable') == before + 1
+
+    def test_new_connections_counted(self):
+        from api.metrics import DB_CONNECTIONS
+
+        counter = DB_CONNECTIONS.labels('default')
+        connection.close()
+        before = counter._value.get()
+
+        connection.ensure_connection()
+
+        assert counter._value.get() == before + 1
+
+
+@pytest.mark.django_db
+def test_connection_in_transaction_kept(settings):
+    from api.db import prepare_connections
+
+    make_idle(settings.DB_POOL['IDLE_TIMEOUT'])
+
+    prepare_connections()
+
+    assert connection.connection is not None
+
+
+@pytest.mark.parametrize('mode, expected', [
+    ('persistent', '600 False'),
+    ('pgbouncer', '600 True'),
+    ('none', '0 False'),
+])
+def test_pool_mode_settings(mode, expected):
+    env = {
+        **os.environ,
+        'DB_POOL_MODE': mode,
+        'PYTHONPATH': os.path.join(root_dir, 'api_yamdb'),
+    }
+    env.pop('DB_CONN_MAX_AGE', None)
+    output = subprocess.run(
+        [sys.executable, '-c', SETTINGS], env=env, check=True,
+        capture_output=True, text=True
+    ).stdout
+
+    assert output.strip() == expected
@@ -27,3 +27,15 @@ class TestDockerfileCompose:
         assert re.search(r'image:\s+([a-zA-Z0-9]+)\/([a-zA-Z0-9_\.])+(\:[a-zA-Z0-9_-]+)?', docker_compose), (
             'Проверьте, что добавили сборку контейнера из образа на вашем DockerHub в файл docker-compose.yaml'
         )
+
+    def test_app_services_share_cache(self):
+        with open(os.path.join(infra_dir_path, 'docker-compose.yaml')) as f:
+            docker_compose = f.read()
+        services = dict(re.findall(
+            r'^  (\w+):\n((?:(?:    .*)?\n)*)', docker_compose, re.M))
+
+        # Сброс кэша из rankings и команд manage.py должен доходить до web.
+        for name in ('web', 'mail', 'rankings'):
+            assert 'REDIS_URL=redis://redis:6379/0' in services[name], name
+            assert re.search(r'depends_on:\n(\s+- \w+\n)*\s+- redis\n',
+                             services[name]), name
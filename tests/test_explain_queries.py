@@ -0,0 +1,20 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_hot_filters_use_indexes():
+    output = io.StringIO()
+    call_command(
+        'explain_queries', titles=200, reviews=3, comments=1, json=True,
+        fail_on_seq_scan=True, stdout=output
+    )
+    report = {probe['name']: probe for probe in json.loads(output.getvalue())}
+    assert {
+        'titles-by-category-year', 'titles-by-genre', 'comments-by-review',
+        'review-exists-by-author', 'review', 'comments',
+    } <= set(report)
+    assert not any(probe['flagged'] for probe in report.values())
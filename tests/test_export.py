@@ -0,0 +1,201 @@
+import csv
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def catalogue(make_title, make_review, category, genre, author):
+    from reviews.models import Comment, Genre
+
+    genres = [genre, Genre.objects.create(name='Фантастика', slug='sf')]
+    titles = []
+    for number in range(5):
+        title = make_title(
+            f'Фильм {number}', year=1970 + number, description='Описание',
+            category=category, genres=genres[:number % 2 + 1])
+        review = make_review(title, author, score=number + 5)
+        Comment.objects.create(review=review, author=author, text='Да')
+        titles.append(title)
+    return titles
+
+
+@pytest.fixture
+def admin_client(api_client, admin):
+    api_client.force_authenticate(admin)
+    return api_client
+
+
+def read(response):
+    return b''.join(response.streaming_content).decode()
+
+
+def ndjson(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_pages_read_by_key(self, catalogue):
+        from reviews.export import export
+
+        with CaptureQueriesContext(connection) as context:
+            titles = ndjson(''.join(export('titles', batch_size=2)))
+
+        assert [title['id'] for title in titles] == [
+            title.pk for title in catalogue]
+        assert titles[1]['genre'] == ['drama', 'sf']
+        assert titles[0]['category'] == 'movie'
+        assert set(titles[0]) == {
+            'id', 'name', 'year', 'description', 'genre', 'category',
+            'updated_at'}
+        # Три страницы: строки и жанры страницы, без OFFSET.
+        assert len(context) == 6
+        assert not any('OFFSET' in query['sql']
+                       for query in context.captured_queries)
+
+    def test_updated_since(self, catalogue):
+        from django.utils import timezone
+        from reviews.export import export
+
+        moment = timezone.now()
+        catalogue[3].name = 'Сталкер'
+        catalogue[3].save()
+
+        titles = ndjson(''.join(export('titles', updated_since=moment)))
+        assert [title['name'] for title in titles] == ['Сталкер']
+
+    def test_related_changes_update_titles(self, catalogue):
+        from django.utils import timezone
+        from reviews.export import export
+        from reviews.models import Category, Genre
+
+        def changed_since(moment):
+            return {title['id']: title for title in ndjson(
+                ''.join(export('titles', updated_since=moment)))}
+
+        moment = timezone.now()
+        catalogue[0].genre.set(Genre.objects.filter(slug='sf'))
+        assert set(changed_since(moment)) == {catalogue[0].pk}
+
+        # Удаление жанра удаляет связи каскадом, удаление категории
+        # обнуляет её запросом UPDATE: произведения всё равно изменены.
+        moment = timezone.now()
+        Genre.objects.get(slug='sf').delete()
+        assert set(changed_since(moment)) == {
+            title.pk for title in catalogue[:2]} | {catalogue[3].pk}
+
+        moment = timezone.now()
+        Category.objects.get(slug='movie').delete()
+        titles = changed_since(moment)
+        assert set(titles) == {title.pk for title in catalogue}
+        assert {title['category'] for title in titles.values()} == {None}
+
+    def test_csv(self, catalogue):
+        from datetime import datetime, timezone
+
+        from reviews.export import export
+
+        rows = list(csv.DictReader(io.StringIO(
+            ''.join(export('comments', 'csv', batch_size=3)))))
+
+        assert len(rows) == 5
+        assert rows[0]['title_id'] == str(catalogue[0].pk)
+        assert rows[0]['author'] == 'author'
+        future = datetime(2100, 1, 1, tzinfo=timezone.utc)
+        assert list(export('comments', 'csv', updated_since=future)) == [
+            'id,title_id,review_id,text,author,pub_date\r\n']
+
+
+@pytest.mark.django_db
+class TestExportEndpoint:
+
+    def test_admin_only(self, api_client, catalogue):
+        from reviews.models import User
+
+        assert api_client.get('/api/v1/export/titles/').status_code == 401
+        api_client.force_authenticate(
+            User.objects.get(username='author'))
+        assert api_client.get('/api/v1/export/titles/').status_code == 403
+
+    def test_streams_ndjson_and_csv(self, admin_client, catalogue):
+        response = admin_client.get('/api/v1/export/reviews/')
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        reviews = ndjson(read(response))
+        assert [review['score'] for review in reviews] == [5, 6, 7, 8, 9]
+        assert reviews[0]['title_id'] == catalogue[0].pk
+
+        response = admin_client.get(
+            '/api/v1/export/reviews/', {'output': 'csv'},
+            HTTP_ACCEPT='text/csv')
+        assert response.status_code == 200
+        assert response['Content-Disposition'] == (
+            'attachment; filename="reviews.csv"')
+        assert len(read(response).splitlines()) == 6
+
+    def test_bad_params(self, admin_client):
+        assert admin_client.get('/api/v1/export/users/').status_code == 404
+        response = admin_client.get(
+            '/api/v1/export/titles/', {'updated_since': 'вчера'})
+        assert response.status_code == 400
+        assert 'updated_since' in response.json()
+
+
+async def asgi_get(application, path, token):
+    from asgiref.testing import ApplicationCommunicator
+
+    communicator = ApplicationCommunicator(application, {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [(b'authorization', f'Bearer {token}'.encode())],
+    })
+    await communicator.send_input({'type': 'http.request'})
+    start = await communicator.receive_output(timeout=5)
+    body = b''
+    while True:
+        message = await communicator.receive_output(timeout=5)
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return start['status'], body.decode()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_streams_under_asgi(catalogue, admin):
+    from api.handlers import StreamingASGIHandler
+    from asgiref.sync import async_to_sync
+    from reviews.authentication import ClaimsAccessToken
+
+    # Страницы выгрузки читаются из БД при переборе потокового ответа:
+    # ASGIHandler Django 3.2 делал бы это в цикле событий.
+    token = ClaimsAccessToken.for_user(admin)
+
+    status, body = async_to_sync(asgi_get)(
+        StreamingASGIHandler(), '/api/v1/export/titles/', token)
+
+    assert status == 200
+    assert [title['id'] for title in ndjson(body)] == [
+        title.pk for title in catalogue]
+
+
+@pytest.mark.django_db
+def test_export_command(catalogue, tmp_path):
+    path = tmp_path / 'titles.csv'
+
+    call_command('export_data', 'titles', output='csv', file=str(path),
+                 stdout=io.StringIO())
+
+    with open(path, encoding='utf-8', newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert [row['genre'] for row in rows[:2]] == ['drama', 'drama,sf']
+
+    stdout = io.StringIO()
+    call_command('export_data', 'comments', stdout=stdout,
+                 updated_since='2100-01-01T00:00:00')
+    assert stdout.getvalue() == ''
@@ -0,0 +1,146 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+
+@pytest.fixture
+def catalogue(make_user, make_title, make_review, title):
+    from reviews.models import Comment, Genre
+
+    title.genre.add(Genre.objects.create(name='Фантастика', slug='sci-fi'))
+    make_title('Без категории', year=2000, description='')
+    users = [make_user(f'user{number}') for number in range(3)]
+    # Средняя 7.5 - сериализатор отдаёт целую часть.
+    reviews = [
+        make_review(title, user, score=score, text=f'Отзыв {user.pk}')
+        for user, score in zip(users[:2], (7, 8))
+    ]
+    for user in users:
+        Comment.objects.create(review=reviews[0], author=user, text='Да')
+    return title, reviews[0]
+
+
+def roundtrip(data):
+    return json.loads(json.dumps(data))
+
+
+@pytest.mark.django_db
+class TestReaders:
+
+    def test_titles_match_serializer(self, catalogue):
+        from reviews.models import Title
+        from reviews.readers import TitleReader
+        from reviews.serializers import SafeMethodTitleSerializer
+
+        queryset = Title.objects.select_related(
+            'category').prefetch_related('genre').order_by('pk')
+        reader = TitleReader()
+
+        data = reader.serialize(reader.rows(queryset))
+
+        assert data == roundtrip(
+            SafeMethodTitleSerializer(queryset, many=True).data)
+        assert data[0]['rating'] == 7
+        assert data[1]['category'] is None
+
+    def test_reviews_and_comments_match_serializers(self, catalogue):
+        from reviews.readers import CommentReader, ReviewReader
+        from reviews.serializers import CommentSerializer, ReviewsSerializer
+
+        title, review = catalogue
+        reviews = title.review.order_by('pk')
+        comments = review.comments.order_by('pk')
+
+        assert ReviewReader().serialize(ReviewReader().rows(reviews)) \
+            == roundtrip(ReviewsSerializer(reviews, many=True).data)
+        assert CommentReader().serialize(CommentReader().rows(comments)) \
+            == roundtrip(CommentSerializer(comments, many=True).data)
+
+    def test_format_datetime_matches_drf(self):
+        from reviews.readers import format_datetime, get_timezone
+        from rest_framework.fields import DateTimeField
+
+        field = DateTimeField()
+        for value in (timezone.now(), timezone.now().replace(microsecond=0)):
+            assert format_datetime(value, get_timezone()) \
+                == field.to_representation(value)
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/',
+        '/api/v1/titles/{title}/',
+        '/api/v1/titles/{title}/reviews/',
+        '/api/v1/titles/{title}/reviews/?cursor=',
+        '/api/v1/titles/{title}/reviews/{review}/',
+        '/api/v1/titles/{title}/reviews/{review}/comments/',
+    ])
+    def test_endpoints_keep_contract(self, api_client, catalogue, url):
+        title, review = catalogue
+        url = url.format(title=title.pk, review=review.pk)
+
+        response = api_client.get(url)
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/json'
+
+    def test_review_list_does_not_query_per_row(self, api_client, catalogue):
+        title, _ = catalogue
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(f'/api/v1/titles/{title.pk}/reviews/')
+
+        assert response.json()['count'] == 2
+        # Произведение, COUNT и страница.
+        assert len(context) == 3
+
+    def test_cursor_pages_from_rows(self, api_client, catalogue):
+        from reviews.models import Comment
+
+        _, review = catalogue
+        Comment.objects.bulk_create([
+            Comment(review=review, author_id=review.author_id, text='Ещё')
+            for _ in range(4)
+        ])
+        url = f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+
+        first = api_client.get(url, {'cursor': ''}).json()
+        second = api_client.get(first['next']).json()
+
+        ids = [item['id'] for item in first['results'] + second['results']]
+        assert len(set(ids)) == 7
+        assert second['next'] is None
+
+    def test_missing_object(self, api_client, catalogue):
+        assert api_client.get('/api/v1/titles/0/').status_code == 404
+
+
+class TestFastJSONRenderer:
+
+    def test_matches_json_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from reviews.renderers import FastJSONRenderer
+
+        data = {
+            'text': 'Зона\u2028',
+            'lazy': gettext_lazy('Некорректный курсор.'),
+            'date': timezone.now(),
+            'price': Decimal('1.50'),
+            1: None,
+        }
+
+        assert json.loads(FastJSONRenderer().render(data)) \
+            == json.loads(JSONRenderer().render(data))
+        assert b'\\u2028' in FastJSONRenderer().render(data)
+        assert FastJSONRenderer().render(None) == b''
+
+    def test_indent_uses_json_renderer(self):
+        from reviews.renderers import FastJSONRenderer
+
+        content = FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=2')
+
+        assert content == b'{\n  "a": 1\n}'
@@ -0,0 +1,46 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def reset_registry():
+    from api.instrumentation import registry
+
+    registry.reset()
+
+
+@pytest.mark.django_db
+class TestInstrumentation:
+
+    def test_server_timing_header(self, api_client):
+        response = api_client.get('/api/v1/genres/')
+        assert response.status_code == 200
+        phases = dict(
+            item.split(';dur=')
+            for item in response['Server-Timing'].split(', ')
+        )
+        assert set(phases) == {'db', 'serialize', 'render', 'total'}
+        assert float(phases['total']) >= float(phases['db'])
+
+    def test_histograms_per_route_and_action(self, api_client, admin):
+        api_client.get('/api/v1/genres/')
+        api_client.get('/api/v1/genres/?page=2')
+        api_client.force_authenticate(admin)
+        data = api_client.get('/api/v1/instrumentation/').json()
+
+        series = {
+            (item['route'], item['action']): item for item in data['series']
+        }
+        genres = series[('api:genres-list', 'list')]
+        assert genres['total']['count'] == 2
+        assert genres['queries']['sum'] >= 2
+
+    def test_sampling(self, api_client, settings):
+        from api.middleware import InstrumentationMiddleware
+
+        settings.INSTRUMENTATION = {'SAMPLE_RATE': 0}
+        middleware = InstrumentationMiddleware(lambda request: {})
+        assert middleware(object()) == {}
+
+    def test_instrumentation_requires_admin(self, api_client):
+        assert api_client.get(
+            '/api/v1/instrumentation/').status_code == 401
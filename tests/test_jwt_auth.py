@@ -0,0 +1,167 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def user_queries(queries):
+    return [
+        query['sql'] for query in queries
+        if 'FROM "reviews_user"' in query['sql']
+    ]
+
+
+def get_token(api_client, user):
+    from reviews.confirmation import make_confirmation_code
+    from reviews.models import User
+
+    code, stored_code = make_confirmation_code(user.username)
+    User.objects.filter(pk=user.pk).update(confirmation_code=stored_code)
+    api_client.credentials()
+    response = api_client.post('/api/v1/auth/token/', {
+        'username': user.username,
+        'confirmation_code': code,
+    })
+    assert response.status_code == 200
+    return response.json()['token']
+
+
+@pytest.mark.django_db
+class TestStatelessJWT:
+
+    def test_token_carries_role_claims(self, api_client, admin):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        token = AccessToken(get_token(api_client, admin))
+
+        assert token['role'] == 'admin'
+        assert token['is_superuser'] is False
+        assert 'iat' in token
+
+    def test_authenticated_request_skips_user_lookup(
+            self, api_client, admin):
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+        # Время отзыва читается один раз и запоминается процессом.
+        api_client.get('/api/v1/users/me/')
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(
+                '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'})
+
+        assert response.status_code == 201
+        assert user_queries(context.captured_queries) == []
+
+    def test_role_change_revokes_token(self, api_client, admin):
+        from reviews.models import User
+
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+        admin.role = User.USER
+        admin.save()
+
+        response = api_client.post(
+            '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 401
+
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+        response = api_client.post(
+            '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 403
+
+    def test_revocation_survives_cache_loss(self, api_client, admin):
+        from django.core.cache import cache
+        from reviews.authentication import _local_denylist
+        from reviews.models import User
+
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+        admin.role = User.USER
+        admin.save()
+        cache.clear()
+        _local_denylist.clear()
+
+        assert api_client.get('/api/v1/users/me/').status_code == 401
+
+    def test_revocation_by_other_process(self, api_client, admin):
+        from django.utils import timezone
+        from reviews.authentication import _local_denylist
+        from reviews.models import User
+
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+        assert api_client.get('/api/v1/users/me/').status_code == 200
+
+        # Другой воркер отозвал токены; кэш этого процесса о том не знает.
+        User.objects.filter(pk=admin.pk).update(
+            tokens_revoked_at=timezone.now())
+        _local_denylist.clear()
+        assert api_client.get('/api/v1/users/me/').status_code == 401
+
+    def test_deleted_user_token_rejected(self, api_client, admin):
+        from reviews.authentication import _local_denylist
+        from reviews.models import User
+
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+        User.objects.filter(pk=admin.pk).delete()
+        _local_denylist.clear()
+
+        assert api_client.get('/api/v1/users/me/').status_code == 401
+
+    def test_shared_cache_serves_revocation_time(
+            self, api_client, admin, monkeypatch):
+        from reviews import authentication
+        from reviews.models import User
+
+        monkeypatch.setattr(authentication, 'is_shared', lambda: True)
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+        api_client.get('/api/v1/genres/')
+        authentication._local_denylist.clear()
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(
+                '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'})
+        assert response.status_code == 201
+        assert user_queries(context.captured_queries) == []
+
+        admin.role = User.USER
+        admin.save()
+        assert api_client.get('/api/v1/users/me/').status_code == 401
+
+    def test_unrelated_save_keeps_token(self, api_client, admin):
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+        admin.bio = 'Новая биография'
+        admin.save()
+
+        response = api_client.get('/api/v1/users/me/')
+        assert response.status_code == 200
+        assert response.json()['bio'] == 'Новая биография'
+
+    def test_author_edits_own_review(self, api_client, review, author):
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, author)}')
+
+        url = f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/'
+        response = api_client.patch(url, {'text': 'Правка'})
+        assert response.status_code == 200
+        assert response.json()['author'] == 'author'
+
+        response = api_client.post(
+            f'/api/v1/titles/{review.title_id}/reviews/',
+            {'text': 'Второй', 'score': 5})
+        assert response.status_code == 400
+
+    def test_database_fallback(self, api_client, admin, settings):
+        settings.JWT_STATELESS_AUTH = False
+        api_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {get_token(api_client, admin)}')
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.post(
+                '/api/v1/genres/', {'name': 'Драма', 'slug': 'drama'})
+
+        assert response.status_code == 201
+        assert len(user_queries(context.captured_queries)) == 1
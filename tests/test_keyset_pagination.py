@@ -0,0 +1,66 @@
+import pytest
+
+
+@pytest.fixture
+def reviews(make_user, make_review, title):
+    return [
+        make_review(title, make_user(f'user{i}'), score=5, text=f'Отзыв {i}')
+        for i in range(12)
+    ]
+
+
+def walk(client, url, link):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert 'count' not in data
+        pages.append([review['id'] for review in data['results']])
+        url = data[link]
+    return pages
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_cursor_walks_all_reviews_in_order(self, api_client, reviews):
+        url = f'/api/v1/titles/{reviews[0].title_id}/reviews/?cursor='
+        pages = walk(api_client, url, 'next')
+        expected = [
+            review.pk for review in sorted(
+                reviews, key=lambda review: (review.pub_date, review.pk),
+                reverse=True)
+        ]
+        assert [len(page) for page in pages] == [5, 5, 2]
+        assert sum(pages, []) == expected
+
+        last_page = api_client.get(url).json()
+        while last_page['next']:
+            last_page = api_client.get(last_page['next']).json()
+        back = walk(api_client, last_page['previous'], 'previous')
+        assert sum(reversed(back), []) == expected[:10]
+
+    def test_cursor_page_skips_count(self, api_client, reviews):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(
+                f'/api/v1/titles/{reviews[0].title_id}/reviews/?cursor=')
+        assert response.status_code == 200
+        assert not any(
+            'COUNT(' in query['sql'].upper() for query in context)
+        assert not any(
+            'OFFSET' in query['sql'].upper() for query in context)
+
+    def test_page_number_is_default(self, api_client, reviews):
+        response = api_client.get(
+            f'/api/v1/titles/{reviews[0].title_id}/reviews/?page=2')
+        assert response.status_code == 200
+        assert response.json()['count'] == 12
+
+    def test_invalid_cursor(self, api_client, reviews):
+        response = api_client.get(
+            f'/api/v1/titles/{reviews[0].title_id}/reviews/?cursor=broken')
+        assert response.status_code == 404
@@ -0,0 +1,149 @@
+import os
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+
+@pytest.fixture
+def mail_dir(settings, tmp_path):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+    settings.EMAIL_FILE_PATH = str(tmp_path)
+    settings.MAIL_QUEUE = {**settings.MAIL_QUEUE, 'RETRY_DELAY': 30,
+                           'MAX_RETRY_DELAY': 60, 'MAX_ATTEMPTS': 3}
+    return tmp_path
+
+
+def signup(api_client, username):
+    return api_client.post('/api/v1/auth/signup/', {
+        'username': username, 'email': f'{username}@yamdb.ru'})
+
+
+@pytest.mark.django_db
+class TestMailQueue:
+
+    def test_signup_only_enqueues(self, api_client, mail_dir):
+        from reviews.confirmation import check_confirmation_code
+        from reviews.models import OutgoingEmail, User
+
+        response = signup(api_client, 'reader')
+
+        assert response.status_code == 200
+        assert os.listdir(mail_dir) == []
+        email = OutgoingEmail.objects.get()
+        user = User.objects.get(username='reader')
+        assert email.recipient == 'reader@yamdb.ru'
+        assert email.status == OutgoingEmail.PENDING
+        assert check_confirmation_code(
+            user.username, user.confirmation_code, email.body.split()[0])
+
+    def test_worker_sends_batch_over_one_connection(
+            self, api_client, mail_dir):
+        from reviews.models import OutgoingEmail
+
+        for number in range(3):
+            signup(api_client, f'reader{number}')
+
+        call_command('send_mail_queue', '--once', stdout=open(os.devnull, 'w'))
+
+        assert set(OutgoingEmail.objects.values_list('status', flat=True)) \
+            == {OutgoingEmail.SENT}
+        assert set(OutgoingEmail.objects.values_list('body', flat=True)) \
+            == {''}
+        # Файловый бэкенд пишет в один файл на соединение.
+        files = os.listdir(mail_dir)
+        assert len(files) == 1
+        content = (mail_dir / files[0]).read_text()
+        for number in range(3):
+            assert f'reader{number}@yamdb.ru' in content
+
+    def test_failed_mail_is_retried_with_backoff(
+            self, api_client, mail_dir, monkeypatch):
+        from django.core.mail.backends.filebased import EmailBackend
+        from reviews.models import OutgoingEmail
+
+        def refuse(self, messages):
+            raise ConnectionRefusedError('mail server is down')
+
+        signup(api_client, 'reader')
+        monkeypatch.setattr(EmailBackend, 'send_messages', refuse)
+        call_command('send_mail_queue', '--once', stdout=open(os.devnull, 'w'))
+
+        email = OutgoingEmail.objects.get()
+        assert email.status == OutgoingEmail.PENDING
+        assert email.attempts == 1
+        assert 'ConnectionRefusedError' in email.last_error
+        assert email.next_attempt_at > timezone.now() + timedelta(seconds=20)
+
+        # Следующие попытки: задержка растёт, затем письмо помечается
+        # как неотправленное.
+        for attempts in (2, 3):
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            call_command(
+                'send_mail_queue', '--once', stdout=open(os.devnull, 'w'))
+            email.refresh_from_db()
+            assert email.attempts == attempts
+        assert email.status == OutgoingEmail.FAILED
+        assert email.body == ''
+
+        monkeypatch.undo()
+        call_command('send_mail_queue', '--once', stdout=open(os.devnull, 'w'))
+        email.refresh_from_db()
+        assert (email.status, email.attempts) == (OutgoingEmail.FAILED, 3)
+
+    def test_error_in_one_mail_keeps_the_rest(
+            self, api_client, mail_dir, monkeypatch):
+        from django.core.mail.backends.filebased import EmailBackend
+        from reviews.models import OutgoingEmail
+
+        send_messages = EmailBackend.send_messages
+
+        def reject_second(self, messages):
+            if messages[0].to == ['reader1@yamdb.ru']:
+                raise UnicodeEncodeError('ascii', '', 0, 1, 'bad header')
+            return send_messages(self, messages)
+
+        for number in range(3):
+            signup(api_client, f'reader{number}')
+        monkeypatch.setattr(EmailBackend, 'send_messages', reject_second)
+        call_command('send_mail_queue', '--once', stdout=open(os.devnull, 'w'))
+
+        statuses = dict(OutgoingEmail.objects.values_list(
+            'recipient', 'status'))
+        assert statuses == {
+            'reader0@yamdb.ru': OutgoingEmail.SENT,
+            'reader1@yamdb.ru': OutgoingEmail.PENDING,
+            'reader2@yamdb.ru': OutgoingEmail.SENT,
+        }
+        assert 'UnicodeEncodeError' in OutgoingEmail.objects.get(
+            recipient='reader1@yamdb.ru').last_error
+
+    def test_sent_mail_survives_worker_crash(
+            self, api_client, mail_dir, monkeypatch):
+        from django.core.mail import get_connection
+        from django.core.mail.backends.filebased import EmailBackend
+        from reviews.mail import send_batch
+        from reviews.models import OutgoingEmail
+
+        send_messages = EmailBackend.send_messages
+
+        def crash_on_second(self, messages):
+            if messages[0].to == ['reader1@yamdb.ru']:
+                raise KeyboardInterrupt
+            return send_messages(self, messages)
+
+        for number in range(2):
+            signup(api_client, f'reader{number}')
+        monkeypatch.setattr(EmailBackend, 'send_messages', crash_on_second)
+        with pytest.raises(KeyboardInterrupt):
+            send_batch(get_connection())
+
+        first, second = OutgoingEmail.objects.order_by('id')
+        assert first.status == OutgoingEmail.SENT
+        # Недоотправленное письмо остаётся за упавшим обработчиком
+        # до истечения захвата.
+        assert second.status == OutgoingEmail.PENDING
+        assert second.next_attempt_at > timezone.now()
+        monkeypatch.undo()
+        assert send_batch(get_connection()) == (0, 0)
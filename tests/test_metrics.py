@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from .conftest import root_dir
+
+
+def sample(body, name, **labels):
+    prefix = name + '{' + ','.join(
+        f'{key}="{value}"' for key, value in sorted(labels.items())) + '}'
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_request_and_cache_metrics(self, client, settings):
+        settings.METRICS_TOKEN = 'secret'
+        auth = {'HTTP_AUTHORIZATION': 'Bearer secret'}
+        before = client.get('/metrics', **auth).content.decode()
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/genres/')
+        body = client.get('/metrics', **auth).content.decode()
+
+        labels = {'method': 'GET', 'route': 'api:genres-list',
+                  'status': '200'}
+        assert sample(body, 'yamdb_http_requests_total', **labels) == (
+            sample(before, 'yamdb_http_requests_total', **labels) + 2)
+        for result in ('miss', 'hit'):
+            labels = {'namespace': 'genres', 'result': result}
+            assert sample(body, 'yamdb_response_cache_total', **labels) == (
+                sample(before, 'yamdb_response_cache_total', **labels) + 1)
+        assert 'yamdb_db_queries_per_request_bucket' in body
+
+    def test_metrics_token(self, client, settings):
+        settings.METRICS_TOKEN = ''
+        assert client.get('/metrics').status_code == 403
+        assert client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer ').status_code == 403
+
+        settings.METRICS_TOKEN = 'secret'
+        assert client.get('/metrics').status_code == 403
+        response = client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
+
+
+WORKER = '''
+from api.metrics import REQUESTS
+REQUESTS.labels('api:title-list', 'GET', 200).inc(3)
+'''
+COLLECT = '''
+from prometheus_client import generate_latest
+from api.metrics import get_registry
+print(generate_latest(get_registry()).decode())
+'''
+
+
+def test_metrics_aggregate_across_processes(tmp_path):
+    env = {
+        **os.environ,
+        'PROMETHEUS_MULTIPROC_DIR': str(tmp_path),
+        'PYTHONPATH': os.path.join(root_dir, 'api_yamdb'),
+    }
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', WORKER], env=env, check=True)
+    body = subprocess.run(
+        [sys.executable, '-c', COLLECT], env=env, check=True,
+        capture_output=True, text=True
+    ).stdout
+    assert sample(
+        body, 'yamdb_http_requests_total',
+        route='api:title-list', method='GET', status='200'
+    ) == 6
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def review(review, author):
+    from reviews.models import Comment
+
+    Comment.objects.create(review=review, author=author, text='Да')
+    return review
+
+
+@pytest.fixture
+def users(make_user):
+    from reviews.models import User
+
+    return {
+        role: make_user(role, role=role)
+        for role in (User.USER, User.MODERATOR)
+    }
+
+
+def reviews_url(review):
+    return f'/api/v1/titles/{review.title_id}/reviews/'
+
+
+def user_queries(context):
+    """Отдельные запросы к пользователям (не JOIN к объекту)."""
+    return [query['sql'] for query in context.captured_queries
+            if 'FROM "reviews_user"' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestObjectPermissions:
+
+    @pytest.mark.parametrize('path', ['{pk}/', '{pk}/comments/{comment}/'])
+    def test_edit_does_not_load_user_for_check(
+            self, api_client, review, users, path):
+        url = reviews_url(review) + path.format(
+            pk=review.pk, comment=review.comments.get().pk)
+
+        api_client.force_authenticate(users['user'])
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.patch(url, {'text': 'Чужой'})
+        assert response.status_code == 403
+        assert user_queries(context) == []
+
+        api_client.force_authenticate(review.author)
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.patch(url, {'text': 'Свой'})
+        assert response.status_code == 200
+        assert response.json()['author'] == 'author'
+        assert user_queries(context) == []
+
+    def test_roles_evaluated_once_per_request(self):
+        from reviews.permissions import can_edit, get_roles
+
+        checks = []
+
+        class User:
+            pk = 1
+            is_authenticated = True
+            is_superuser = False
+            is_moderator = False
+
+            @property
+            def is_admin(self):
+                checks.append(1)
+                return False
+
+        request = SimpleNamespace(user=User())
+
+        assert [can_edit(request, author) for author in (1, 2, 1)] \
+            == [True, False, True]
+        assert get_roles(request) == (False, False)
+        assert len(checks) == 1
+
+
+@pytest.mark.django_db
+class TestCanEditField:
+
+    def test_flags_for_each_user(self, api_client, review, users):
+        from reviews.models import Review
+
+        Review.objects.create(title=review.title, author=users['user'],
+                              text='Второй', score=5)
+        params = {'fields': 'id,can_edit'}
+
+        def flags(user):
+            api_client.force_authenticate(user)
+            return [item['can_edit'] for item in api_client.get(
+                reviews_url(review), params).json()['results']]
+
+        assert sorted(flags(review.author)) == [False, True]
+        assert flags(users['moderator']) == [True, True]
+        assert flags(None) == [False, False]
+
+    def test_no_extra_queries(self, api_client, review):
+        api_client.force_authenticate(review.author)
+        url = f'{reviews_url(review)}{review.pk}/comments/'
+
+        counts = []
+        for params in ({'fields': 'id'}, {'fields': 'id,can_edit'}):
+            with CaptureQueriesContext(connection) as context:
+                response = api_client.get(url, params)
+            counts.append(len(context))
+
+        assert response.json()['results'] == [
+            {'id': review.comments.get().pk, 'can_edit': True}]
+        assert counts[0] == counts[1]
+
+    def test_not_in_default_fields(self, api_client, review):
+        response = api_client.get(reviews_url(review))
+
+        assert 'can_edit' not in response.json()['results'][0]
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def catalogue(settings, make_user, make_title, make_review, category, genre):
+    """
+    Три фильма и книга. У «Много отзывов» средняя 8 на 10 отзывах,
+    у «Один отзыв» - единственная 10: байесовское среднее ставит
+    первый выше.
+    """
+    from django.utils import timezone
+    from reviews.models import Category, Review
+
+    settings.RANKINGS = {'MIN_VOTES': 5, 'TRENDING_DAYS': 7}
+    book = Category.objects.create(name='Книга', slug='book')
+    titles = {
+        'many': make_title(
+            'Много отзывов', category=category, genres=[genre]),
+        'single': make_title('Один отзыв', category=category),
+        'old': make_title('Старые отзывы', year=1972, category=category),
+        'book': make_title('Книга', category=book, genres=[genre]),
+    }
+    users = [make_user(f'user{number}') for number in range(10)]
+    for user in users:
+        make_review(titles['many'], user, score=8)
+        make_review(titles['old'], user, score=6)
+    make_review(titles['single'], users[0], score=10)
+    make_review(titles['book'], users[0], score=5)
+    # Отзывы на «Старые отзывы» вне окна трендов.
+    Review.objects.filter(title=titles['old']).update(
+        pub_date=timezone.now() - timedelta(days=30))
+    call_command('refresh_rankings', stdout=StringIO())
+    return titles
+
+
+def names(response):
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db
+class TestRankings:
+
+    def test_top_uses_bayesian_rating(self, api_client, catalogue):
+        response = api_client.get('/api/v1/titles/top/')
+
+        assert names(response) == [
+            'Много отзывов', 'Один отзыв', 'Книга', 'Старые отзывы']
+        first = response.json()['results'][0]
+        assert first['rank'] == 1
+        assert first['rating'] == 8
+        assert first['genre'] == [{'name': 'Драма', 'slug': 'drama'}]
+        # Средняя по каталогу (8 * 10 + 6 * 10 + 10 + 5) / 22.
+        mean = 155 / 22
+        assert first['score'] == pytest.approx((80 + 5 * mean) / 15)
+
+    def test_top_filters(self, api_client, catalogue):
+        url = '/api/v1/titles/top/'
+        assert names(api_client.get(url, {'genre': 'drama'})) == [
+            'Много отзывов', 'Книга']
+        assert names(api_client.get(url, {'category': 'book'})) == ['Книга']
+        assert names(api_client.get(url, {'year': 1972})) == [
+            'Старые отзывы']
+        assert names(api_client.get(
+            url, {'genre': 'drama', 'category': 'movie', 'year': 1979}
+        )) == ['Много отзывов']
+        assert names(api_client.get(url, {'limit': 1})) == ['Много отзывов']
+        assert api_client.get(url, {'limit': 0}).status_code == 400
+
+    def test_trending_counts_recent_reviews(self, api_client, catalogue):
+        response = api_client.get('/api/v1/titles/trending/')
+
+        assert names(response) == ['Много отзывов', 'Один отзыв', 'Книга']
+        assert response.json()['results'][0]['score'] == pytest.approx(10 / 7)
+
+    def test_top_n_reads_n_rows(self, catalogue):
+        from reviews.rankings import get_leaderboard
+
+        with CaptureQueriesContext(connection) as context:
+            rows = get_leaderboard('top', genre='drama', limit=1)
+
+        assert len(rows) == 1
+        assert len(context) == 1
+        assert 'LIMIT 1' in context.captured_queries[0]['sql']
+
+    def test_refresh_replaces_rows(self, catalogue):
+        from reviews.models import TitleRanking
+
+        catalogue['book'].delete()
+        call_command('refresh_rankings', stdout=StringIO())
+
+        scopes = set(TitleRanking.objects.values_list('scope', flat=True))
+        assert scopes == {
+            '', 'year:1979', 'year:1972', 'category:movie', 'genre:drama'}
+        assert TitleRanking.objects.filter(scope='').count() == 3
@@ -0,0 +1,91 @@
+import pytest
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_repeated_list_served_from_cache(
+        self, api_client, title, django_assert_num_queries
+    ):
+        first = api_client.get('/api/v1/titles/')
+        with django_assert_num_queries(0):
+            second = api_client.get('/api/v1/titles/')
+        assert second.json() == first.json()
+        api_client.get(f'/api/v1/titles/{title.pk}/')
+        with django_assert_num_queries(0):
+            api_client.get(f'/api/v1/titles/{title.pk}/')
+
+    def test_writes_invalidate_dependent_endpoints(
+        self, api_client, title, django_capture_on_commit_callbacks
+    ):
+        from reviews.models import Genre, Review, User
+
+        assert api_client.get('/api/v1/titles/').json()['results'][0][
+            'rating'] is None
+        genres = api_client.get('/api/v1/genres/').json()
+        assert genres['count'] == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Review.objects.create(
+                title=title, text='t', score=8,
+                author=User.objects.create(username='u', email='u@yamdb.ru')
+            )
+        assert api_client.get('/api/v1/titles/').json()['results'][0][
+            'rating'] == 8
+
+        with django_capture_on_commit_callbacks(execute=True):
+            genre = Genre.objects.get(slug='drama')
+            genre.name = 'Комедия'
+            genre.save()
+        assert api_client.get('/api/v1/genres/').json()['results'][0][
+            'name'] == 'Комедия'
+        assert api_client.get(f'/api/v1/titles/{title.pk}/').json()[
+            'genre'] == [{'name': 'Комедия', 'slug': 'drama'}]
+
+    def test_deleted_title_drops_cached_reviews(
+        self, api_client, title, django_capture_on_commit_callbacks
+    ):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert api_client.get(url).status_code == 200
+
+        with django_capture_on_commit_callbacks(execute=True):
+            title.delete()
+        assert api_client.get(url).status_code == 404
+
+    def test_conditional_get(self, api_client, title):
+        response = api_client.get('/api/v1/titles/')
+        assert response['ETag'] and response['Last-Modified']
+
+        response = api_client.get(
+            '/api/v1/titles/', HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304
+        assert response.content == b''
+
+        other_page = api_client.get(
+            '/api/v1/titles/?page=1', HTTP_IF_NONE_MATCH=response['ETag'])
+        assert other_page.status_code == 200
+
+
+class TestVersionTimeout:
+
+    def test_local_cache_versions_expire(self, settings, monkeypatch):
+        import time
+
+        from reviews.cache import get_version, get_version_timeout
+
+        # Смену версии в другом процессе кэш процесса не увидит:
+        # версия должна устареть вместе с закэшированными ответами.
+        assert get_version_timeout() == settings.RESPONSE_CACHE_TIMEOUT
+        version, _ = get_version('titles')
+        now = time.time()
+        monkeypatch.setattr(
+            time, 'time', lambda: now + settings.RESPONSE_CACHE_TIMEOUT + 1)
+        assert get_version('titles')[0] != version
+
+    def test_shared_cache_versions_live_until_bumped(self, settings):
+        from reviews.cache import get_version_timeout, is_shared
+
+        settings.CACHES = {
+            'default': {'BACKEND': 'django_redis.cache.RedisCache'}}
+        assert is_shared()
+        assert get_version_timeout() is None
@@ -0,0 +1,90 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def catalogue(make_title, make_review, category, author):
+    from reviews.models import Comment
+
+    matrix = make_title(
+        'Матрица', year=1999, category=category,
+        description='Фильм про виртуальную реальность'
+    )
+    solaris = make_title(
+        'Солярис', year=1972, category=category,
+        description='Фильм про океан'
+    )
+    review = make_review(
+        matrix, author, score=10,
+        text='Реальность здесь виртуальная, реальность ненастоящая'
+    )
+    Comment.objects.create(
+        review=review, author=author, text='Согласен про реальность')
+    return matrix, solaris, review
+
+
+@pytest.mark.django_db
+class TestSearch:
+
+    def test_ranked_prefix_search_with_facets(self, api_client, catalogue):
+        matrix, _, review = catalogue
+        response = api_client.get('/api/v1/search/', {'q': 'реальн'})
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == 3
+        assert data['facets'] == {'title': 1, 'review': 1, 'comment': 1}
+        first = data['results'][0]
+        assert (first['type'], first['id']) == ('review', review.pk)
+        assert first['title_id'] == matrix.pk
+
+    def test_all_terms_must_match_and_type_filter(self, api_client, catalogue):
+        matrix, solaris, _ = catalogue
+        data = api_client.get(
+            '/api/v1/search/', {'q': 'фильм океан'}).json()
+        assert [(r['type'], r['id']) for r in data['results']] == [
+            ('title', solaris.pk)]
+
+        data = api_client.get(
+            '/api/v1/search/', {'q': 'реальность', 'type': 'title'}).json()
+        assert data['count'] == 1
+        assert data['results'][0]['id'] == matrix.pk
+        assert data['facets']['review'] == 1
+
+    def test_index_follows_writes(self, api_client, catalogue):
+        matrix, _, review = catalogue
+        review.text = 'Теперь про симуляцию'
+        review.save()
+        assert api_client.get(
+            '/api/v1/search/', {'q': 'симуляц'}).json()['count'] == 1
+
+        matrix.delete()
+        data = api_client.get('/api/v1/search/', {'q': 'реальность'}).json()
+        assert data['count'] == 0
+
+    def test_comment_save_does_not_load_review(self, catalogue):
+        from reviews.models import Comment, SearchDocument
+
+        matrix, _, review = catalogue
+        comment = Comment.objects.get(review=review)
+        comment.text = 'Симуляция'
+        with CaptureQueriesContext(connection) as context:
+            comment.save()
+        assert not [query for query in context.captured_queries
+                    if '"reviews_review"."text"' in query['sql']]
+        assert SearchDocument.objects.get(
+            kind=SearchDocument.COMMENT, object_id=comment.pk
+        ).title_id == matrix.pk
+
+    def test_rebuild_search_index(self, catalogue):
+        from django.core.management import call_command
+        from reviews.models import SearchDocument
+        from reviews.search import search
+
+        SearchDocument.objects.all().delete()
+        call_command('rebuild_search_index', stdout=None)
+        count, _, _ = search('реальность')
+        assert count == 3
+
+    def test_query_is_required(self, api_client):
+        assert api_client.get('/api/v1/search/').status_code == 400
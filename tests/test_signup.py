@@ -0,0 +1,129 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def signup(api_client, username, email=None):
+    return api_client.post('/api/v1/auth/signup/', {
+        'username': username, 'email': email or f'{username}@yamdb.ru'})
+
+
+def last_code():
+    from reviews.models import OutgoingEmail
+
+    return OutgoingEmail.objects.latest('pk').body.split()[0]
+
+
+def get_token(api_client, username, code):
+    return api_client.post('/api/v1/auth/token/', {
+        'username': username, 'confirmation_code': code})
+
+
+@pytest.mark.django_db
+class TestSignup:
+
+    def test_signup_is_one_upsert(self, api_client):
+        from reviews.models import User
+
+        with CaptureQueriesContext(connection) as context:
+            response = signup(api_client, 'reader')
+
+        assert response.status_code == 200
+        assert response.json() == {
+            'username': 'reader', 'email': 'reader@yamdb.ru'}
+        # INSERT пользователя и INSERT письма в очередь; точки сохранения
+        # ставятся только внутри транзакции теста.
+        assert len([query for query in context.captured_queries
+                    if 'SAVEPOINT' not in query['sql']]) == 2
+        user = User.objects.get(username='reader')
+        assert last_code() not in user.confirmation_code
+        assert len(user.confirmation_code) < 50
+
+    def test_repeated_signup_replaces_code(self, api_client):
+        from reviews.models import User
+
+        signup(api_client, 'reader')
+        first = last_code()
+        signup(api_client, 'reader')
+
+        assert User.objects.count() == 1
+        assert get_token(api_client, 'reader', first).status_code == 400
+        assert get_token(api_client, 'reader', last_code()).status_code \
+            == 200
+
+    def test_failed_enqueue_keeps_previous_code(
+            self, api_client, monkeypatch):
+        from django.db import DatabaseError
+        from reviews import views
+
+        signup(api_client, 'reader')
+        first = last_code()
+
+        def fail(*args):
+            raise DatabaseError('outbox is unavailable')
+
+        monkeypatch.setattr(views, 'enqueue_mail', fail)
+        with pytest.raises(DatabaseError):
+            signup(api_client, 'reader')
+
+        assert get_token(api_client, 'reader', first).status_code == 200
+
+    @pytest.mark.parametrize('username, email, errors', [
+        ('reader', 'other@yamdb.ru', ['username']),
+        ('other', 'reader@yamdb.ru', ['email']),
+        ('me', 'me@yamdb.ru', ['username']),
+    ])
+    def test_conflicts_rejected(self, api_client, username, email, errors):
+        from reviews.models import OutgoingEmail, User
+
+        signup(api_client, 'reader')
+
+        response = signup(api_client, username, email)
+
+        assert response.status_code == 400
+        assert list(response.json()) == errors
+        assert User.objects.count() == 1
+        assert OutgoingEmail.objects.count() == 1
+
+    def test_activated_account_keeps_code(self, api_client):
+        from django.utils import timezone
+        from reviews.models import OutgoingEmail, User
+
+        signup(api_client, 'reader')
+        User.objects.update(last_login=timezone.now())
+
+        response = signup(api_client, 'reader')
+
+        assert response.status_code == 200
+        assert response.json() == 'Учетная запись уже активирована'
+        assert OutgoingEmail.objects.count() == 1
+
+
+@pytest.mark.django_db
+class TestConfirmationCode:
+
+    def test_token_for_valid_code_only(self, api_client):
+        signup(api_client, 'reader')
+        signup(api_client, 'writer')
+
+        assert get_token(api_client, 'reader', last_code()).status_code \
+            == 400
+        response = get_token(api_client, 'writer', last_code())
+        assert response.status_code == 200
+        assert 'token' in response.json()
+
+    def test_code_expires(self, settings):
+        from reviews.confirmation import (check_confirmation_code,
+                                          make_confirmation_code)
+
+        issued = int(time.time())
+        code, stored = make_confirmation_code('reader', now=issued)
+        ttl = settings.CONFIRMATION_CODE_TTL
+
+        assert check_confirmation_code('reader', stored, code, issued + ttl)
+        assert not check_confirmation_code(
+            'reader', stored, code, issued + ttl + 1)
+        assert not check_confirmation_code('writer', stored, code, issued)
+        assert not check_confirmation_code('reader', 'legacy-code', code)
@@ -0,0 +1,106 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def author(make_user):
+    return make_user('author', first_name='Андрей', bio='Режиссёр')
+
+
+def page_query(queries, table):
+    """SQL выборки страницы (без COUNT) из таблицы table."""
+    return next(
+        query['sql'] for query in queries
+        if f'FROM "{table}"' in query['sql'] and 'COUNT(' not in query['sql']
+    )
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_minimal_title_list_reads_only_its_columns(
+            self, api_client, review):
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(
+                '/api/v1/titles/', {'fields': 'id,name,rating'})
+
+        assert response.status_code == 200
+        assert response.json()['results'] == [
+            {'id': review.title_id, 'name': 'Сталкер', 'rating': 9}]
+        sql = page_query(context.captured_queries, 'reviews_title')
+        assert 'description' not in sql
+        assert 'reviews_category' not in sql
+        assert not any('reviews_genretitle' in query['sql']
+                       for query in context.captured_queries)
+
+    def test_title_relations_collapse_to_slugs(self, api_client, review):
+        url = f'/api/v1/titles/{review.title_id}/'
+
+        full = api_client.get(url).json()
+        collapsed = api_client.get(
+            url, {'fields': 'name,genre,category', 'expand': ''}).json()
+        partly = api_client.get(
+            url, {'fields': 'genre,category', 'expand': 'genre'}).json()
+
+        assert full['genre'] == [{'name': 'Драма', 'slug': 'drama'}]
+        assert collapsed == {
+            'name': 'Сталкер', 'genre': ['drama'], 'category': 'movie'}
+        assert partly == {
+            'genre': [{'name': 'Драма', 'slug': 'drama'}],
+            'category': 'movie'}
+
+    def test_review_expands_author_and_title(self, api_client, review):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get(
+                url, {'fields': 'id,author,title', 'expand': 'author,title'})
+
+        assert response.json()['results'] == [{
+            'id': review.pk,
+            'title': {'id': review.title_id, 'name': 'Сталкер', 'year': 1979},
+            'author': {'username': 'author'},
+        }]
+        sql = page_query(context.captured_queries, 'reviews_review')
+        assert '"text"' not in sql
+        assert '"email"' not in sql
+
+    def test_expanded_author_hides_profile(self, api_client, review):
+        from reviews.models import User
+
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.pk}/comments/')
+        review.comments.create(author=review.author, text='Да')
+        api_client.force_authenticate(User.objects.create(
+            username='reader', email='reader@yamdb.ru'))
+
+        for path in (f'/api/v1/titles/{review.title_id}/reviews/', url):
+            author = api_client.get(path, {'expand': 'author'}).json()[
+                'results'][0]['author']
+            assert author == {'username': 'author'}
+
+    def test_comment_fields_keep_cursor(self, api_client, review):
+        from reviews.models import Comment
+
+        Comment.objects.bulk_create([
+            Comment(review=review, author_id=review.author_id, text='Да')
+            for _ in range(6)
+        ])
+        url = f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+
+        first = api_client.get(url, {'cursor': '', 'fields': 'text'}).json()
+        second = api_client.get(first['next']).json()
+
+        assert first['results'][0] == {'text': 'Да'}
+        assert len(first['results'] + second['results']) == 6
+
+    @pytest.mark.parametrize('params', [
+        {'fields': 'id,email'},
+        {'expand': 'reviews'},
+    ])
+    def test_unknown_names_rejected(self, api_client, review, params):
+        response = api_client.get('/api/v1/titles/', params)
+
+        assert response.status_code == 400
+        assert list(response.json()) == list(params)
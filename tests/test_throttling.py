@@ -0,0 +1,199 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# Середина часа и минуты: границы отрезков не влияют на результат.
+NOW = 1000 * 3600 + 1830
+
+
+@pytest.fixture(autouse=True)
+def local_buckets(monkeypatch):
+    from reviews import throttling
+
+    buckets = throttling.LocalBuckets()
+    monkeypatch.setattr(throttling.BucketThrottle, 'local', buckets)
+    return buckets
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from reviews import throttling
+
+    clock = SimpleNamespace(now=NOW)
+    monkeypatch.setattr(
+        throttling, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def rates(settings):
+    def set_rates(**rates):
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                key.replace('__', '.'): rate for key, rate in rates.items()},
+        }
+    return set_rates
+
+
+def make_request(address='10.0.0.1', forwarded_for=None):
+    from rest_framework.test import APIRequestFactory
+
+    if forwarded_for is None:
+        return APIRequestFactory().post('/', REMOTE_ADDR=address)
+    return APIRequestFactory().post(
+        '/', REMOTE_ADDR=address, HTTP_X_FORWARDED_FOR=forwarded_for)
+
+
+def local_checks():
+    from api.metrics import THROTTLE_CHECKS
+
+    return THROTTLE_CHECKS.labels('ip', 'local')._value.get()
+
+
+def test_parse_rate():
+    from reviews.throttling import parse_rate
+
+    assert parse_rate('20/min') == (20, 60)
+    assert parse_rate('5/hour') == (5, 3600)
+
+
+class TestBucketThrottle:
+
+    def test_concurrent_clients_never_exceed_capacity(self, clock):
+        from reviews.throttling import IPThrottle, LocalBuckets
+
+        view = SimpleNamespace(
+            throttle_scope='load', throttle_rates={'ip': '100/hour'})
+        # Два процесса со своими арендами и общим кэшем.
+        throttles = [IPThrottle(), IPThrottle()]
+        throttles[1].local = LocalBuckets()
+        allowed = []
+        before = local_checks()
+
+        def client(throttle):
+            for _ in range(50):
+                if throttle.allow_request(make_request(), view):
+                    allowed.append(1)
+
+        threads = [
+            threading.Thread(target=client, args=(throttles[number % 2],))
+            for number in range(16)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(allowed) == 100
+        # Часть запросов прошла по аренде, без обращения к кэшу.
+        assert local_checks() > before
+
+    def test_bucket_refills(self, clock):
+        from reviews.throttling import IPThrottle
+
+        view = SimpleNamespace(throttle_rates={'ip': '10/min'})
+        throttle = IPThrottle()
+        results = [throttle.allow_request(make_request(), view)
+                   for _ in range(11)]
+        assert results == [True] * 10 + [False]
+        assert throttle.allow_request(make_request('10.0.0.2'), view)
+
+        wait = throttle.wait()
+        assert 0 < wait <= 60
+        clock.now += wait
+        assert throttle.allow_request(make_request(), view)
+
+    def test_zero_rate_closes_bucket(self, clock):
+        from reviews.throttling import IPThrottle
+
+        view = SimpleNamespace(throttle_rates={'ip': '0/min'})
+        throttle = IPThrottle()
+
+        assert not throttle.allow_request(make_request(), view)
+        assert throttle.wait() == 60
+
+    def test_address_set_by_proxy(self, clock):
+        from reviews.throttling import IPThrottle
+
+        view = SimpleNamespace(throttle_rates={'ip': '2/min'})
+        throttle = IPThrottle()
+        nginx = '172.18.0.5'
+        # Подменённое начало X-Forwarded-For не даёт нового ведра:
+        # адрес клиента nginx дописывает последним.
+        results = [
+            throttle.allow_request(make_request(
+                nginx, f'10.1.1.{number}, 10.0.0.1'), view)
+            for number in range(3)
+        ]
+        assert results == [True, True, False]
+        # Клиенты за одним nginx не делят ведро.
+        assert throttle.allow_request(
+            make_request(nginx, '10.0.0.2'), view)
+
+
+@pytest.mark.django_db
+class TestThrottledEndpoints:
+
+    def test_signup_limited_per_address(self, api_client, rates, clock):
+        rates(signup__ip='2/hour')
+
+        statuses = [
+            api_client.post('/api/v1/auth/signup/', {
+                'username': f'user{number}',
+                'email': f'user{number}@yamdb.ru'}).status_code
+            for number in range(3)
+        ]
+        response = api_client.post(
+            '/api/v1/auth/signup/',
+            {'username': 'other', 'email': 'other@yamdb.ru'},
+            REMOTE_ADDR='10.0.0.2')
+
+        assert statuses == [200, 200, 429]
+        assert response.status_code == 200
+        assert api_client.get('/api/v1/titles/').status_code == 200
+
+    def test_viewset_rates(self, api_client, rates, clock, monkeypatch,
+                           review, author, make_user):
+        from reviews.views import CommentViewSet
+
+        rates()
+        monkeypatch.setattr(CommentViewSet, 'throttle_rates', {'user': '2/min'})
+        other = make_user('other')
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.pk}/comments/')
+
+        api_client.force_authenticate(author)
+        statuses = [api_client.post(url, {'text': 'Да'}).status_code
+                    for _ in range(3)]
+        api_client.force_authenticate(other)
+
+        assert statuses == [201, 201, 429]
+        assert api_client.post(url, {'text': 'Да'}).status_code == 201
+
+    def test_denied_request_returns_tokens(
+            self, api_client, rates, clock, monkeypatch, review, author,
+            make_user):
+        from reviews.views import CommentViewSet
+
+        rates()
+        monkeypatch.setattr(CommentViewSet, 'throttle_rates',
+                            {'ip': '3/min', 'user': '1/min'})
+        other = make_user('other')
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.pk}/comments/')
+
+        api_client.force_authenticate(author)
+        statuses = [api_client.post(url, {'text': 'Да'}).status_code
+                    for _ in range(3)]
+        # Отказы по ведру пользователя не расходуют ведро адреса.
+        api_client.force_authenticate(other)
+        statuses += [api_client.post(url, {'text': 'Да'}).status_code
+                     for _ in range(3)]
+
+        assert statuses == [201, 429, 429, 201, 429, 429]
+
+        for name, status in (('third', 201), ('fourth', 429)):
+            api_client.force_authenticate(make_user(name))
+            assert api_client.post(url, {'text': 'Да'}).status_code == status
@@ -0,0 +1,69 @@
+import pytest
+
+
+@pytest.fixture
+def titles(request):
+    from reviews.models import Category, Genre, GenreTitle, Title
+
+    count = request.param
+    category = Category.objects.create(name='Книга', slug='book')
+    genres = [
+        Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+        for i in range(3)
+    ]
+    titles = Title.objects.bulk_create([
+        Title(name=f'Title {i}', year=2000, description='', category=category)
+        for i in range(count)
+    ])
+    titles = list(Title.objects.all())
+    GenreTitle.objects.bulk_create([
+        GenreTitle(title=title, genre=genre)
+        for title in titles for genre in genres
+    ])
+    return titles
+
+
+@pytest.mark.django_db
+class TestTitleQueries:
+
+    @pytest.mark.parametrize('titles', [1, 5], indirect=True)
+    def test_title_list_constant_queries(
+        self, api_client, titles, django_assert_num_queries
+    ):
+        # count + titles with category + genres prefetch
+        with django_assert_num_queries(3):
+            response = api_client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == len(titles)
+        assert len(response.json()['results'][0]['genre']) == 3
+
+    @pytest.mark.parametrize('titles', [1], indirect=True)
+    def test_title_detail_constant_queries(
+        self, api_client, titles, django_assert_num_queries
+    ):
+        with django_assert_num_queries(2):
+            response = api_client.get(f'/api/v1/titles/{titles[0].pk}/')
+        assert response.status_code == 200
+        assert response.json()['category'] == {'name': 'Книга', 'slug': 'book'}
+
+    @pytest.mark.parametrize('titles', [2], indirect=True)
+    def test_admin_changelist_constant_queries(self, admin_client, titles):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from reviews.models import GenreTitle, Title
+
+        def changelist_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = admin_client.get('/admin/reviews/title/')
+            assert response.status_code == 200
+            return len(context)
+
+        before = changelist_queries()
+        for i in range(5):
+            title = Title.objects.create(
+                name=f'Extra {i}', year=2000, description='',
+                category=titles[0].category
+            )
+            GenreTitle.objects.create(
+                title=title, genre=titles[0].genre.first())
+        assert changelist_queries() == before
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def authors(make_user):
+    return [make_user(f'user{i}') for i in range(3)]
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_follows_review_writes(self, title, authors):
+        from reviews.models import Review
+
+        first = Review.objects.create(
+            title=title, author=authors[0], text='a', score=10)
+        Review.objects.create(title=title, author=authors[1], text='b', score=4)
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (14, 2)
+        assert title.rating == 7
+
+        first = Review.objects.get(pk=first.pk)
+        first.score = 6
+        first.save()
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (10, 2)
+
+        first.delete()
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (4, 1)
+
+        authors[1].delete()
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (0, 0)
+        assert title.rating is None
+
+    def test_one_save_updates_every_counter(
+            self, title, authors, make_title):
+        from reviews.models import Review, UserStats
+        from reviews.stats import get_histogram
+
+        other = make_title('Солярис')
+        review = Review.objects.create(
+            title=title, author=authors[0], text='a', score=10)
+        review.title, review.author, review.score = other, authors[1], 4
+        review.save()
+        review.save()
+
+        title.refresh_from_db()
+        other.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (0, 0)
+        assert (other.score_sum, other.score_count) == (4, 1)
+        assert get_histogram(other.pk)[4] == 1
+        assert not any(get_histogram(title.pk).values())
+        assert dict(UserStats.objects.values_list(
+            'user_id', 'review_count')) == {
+            authors[0].pk: 0, authors[1].pk: 1}
+
+    def test_fixture_loading_keeps_counters(self, title, authors, tmp_path):
+        from reviews.models import TitleScoreCount, UserStats
+
+        fixture = tmp_path / 'reviews.json'
+        fixture.write_text(json.dumps([{
+            'model': 'reviews.review', 'pk': 100,
+            'fields': {'title': title.pk, 'author': authors[0].pk,
+                       'text': 'a', 'score': 10,
+                       'pub_date': '2020-01-01T00:00:00Z'},
+        }]))
+        call_command('loaddata', str(fixture), verbosity=0)
+
+        title.refresh_from_db()
+        assert (title.score_sum, title.score_count) == (0, 0)
+        assert not TitleScoreCount.objects.exists()
+        assert not UserStats.objects.exists()
+
+    def test_recalculate_ratings_command(self, title, authors):
+        from reviews.models import Review, Title
+
+        Review.objects.bulk_create([
+            Review(title=title, author=author, text='t', score=score)
+            for author, score in zip(authors, (3, 5, 10))
+        ])
+        title.refresh_from_db()
+        assert title.score_count == 0
+
+        call_command('recalculate_ratings', stdout=None)
+        title = Title.objects.get(pk=title.pk)
+        assert (title.score_sum, title.score_count) == (18, 3)
+
+    def test_api_reads_stored_rating(self, api_client, title, authors):
+        from reviews.models import Review
+
+        Review.objects.create(title=title, author=authors[0], text='a', score=9)
+        Review.objects.create(title=title, author=authors[1], text='b', score=6)
+
+        response = api_client.get(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 200
+        assert response.json()['rating'] == 7
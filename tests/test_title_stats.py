@@ -0,0 +1,86 @@
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def add_review(make_user, make_review, title):
+    def make(score, number, target=None):
+        return make_review(
+            target or title, make_user(f'user{number}'), score=score)
+
+    return make
+
+
+def histogram(title):
+    from reviews.stats import get_histogram
+
+    return {score: count
+            for score, count in get_histogram(title.pk).items() if count}
+
+
+@pytest.mark.django_db
+class TestTitleStats:
+
+    def test_histogram_follows_review_writes(self, title, add_review):
+        from reviews.models import Review, Title
+
+        first = add_review(8, 1)
+        add_review(8, 2)
+        third = add_review(3, 3)
+        assert histogram(title) == {8: 2, 3: 1}
+
+        first.score = 10
+        first.save()
+        assert histogram(title) == {8: 1, 10: 1, 3: 1}
+
+        third.delete()
+        assert histogram(title) == {8: 1, 10: 1}
+
+        other = Title.objects.create(name='Солярис', year=1972)
+        moved = Review.objects.get(pk=first.pk)
+        moved.title = other
+        moved.save()
+        assert histogram(title) == {8: 1}
+        assert histogram(other) == {10: 1}
+
+    def test_stats_endpoint(self, api_client, title, add_review):
+        for number, score in enumerate((1, 4, 4, 9)):
+            last = add_review(score, number)
+
+        response = api_client.get(f'/api/v1/titles/{title.pk}/stats/')
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data['count'] == 4
+        assert data['mean'] == 4.5
+        assert data['median'] == 4
+        assert list(data['histogram']) == [str(n) for n in range(1, 11)]
+        assert data['histogram']['4'] == 2
+        assert data['histogram']['10'] == 0
+        assert data['last_review'].startswith(
+            last.pub_date.isoformat()[:19])
+
+    def test_stats_without_reviews(self, api_client, title):
+        data = api_client.get(f'/api/v1/titles/{title.pk}/stats/').json()
+
+        assert (data['count'], data['mean'], data['median']) == (0, None, None)
+        assert data['last_review'] is None
+        assert api_client.get('/api/v1/titles/0/stats/').status_code == 404
+
+    def test_median_of_even_count(self):
+        from reviews.stats import histogram_median
+
+        assert histogram_median({1: 1, 2: 0, 3: 1}) == 2
+        assert histogram_median({5: 2, 7: 2}) == 6
+        assert histogram_median({5: 3, 7: 2}) == 5
+
+    def test_rebuild_command(self, title, add_review):
+        from reviews.models import TitleScoreCount
+
+        add_review(6, 1)
+        add_review(6, 2)
+        TitleScoreCount.objects.all().delete()
+
+        call_command('rebuild_score_histograms', stdout=open('/dev/null', 'w'))
+
+        assert histogram(title) == {6: 2}
@@ -0,0 +1,102 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def titles(make_title):
+    return [make_title(name) for name in ('Сталкер', 'Солярис')]
+
+
+def counters(user):
+    from reviews.models import UserStats
+
+    stats = UserStats.objects.filter(user=user).values(
+        'review_count', 'comment_count', 'score_sum').first()
+    return stats and tuple(stats.values())
+
+
+@pytest.mark.django_db
+class TestUserStats:
+
+    def test_counters_follow_writes(self, titles, author):
+        from reviews.models import Comment, Review, User
+
+        first = Review.objects.create(
+            title=titles[0], author=author, text='Отзыв', score=8)
+        second = Review.objects.create(
+            title=titles[1], author=author, text='Отзыв', score=4)
+        comment = Comment.objects.create(
+            review=first, author=author, text='Да')
+        assert counters(author) == (2, 1, 12)
+
+        first.score = 10
+        first.save()
+        assert counters(author) == (2, 1, 14)
+
+        other = User.objects.create(username='other', email='o@yamdb.ru')
+        moved = Review.objects.get(pk=second.pk)
+        moved.author = other
+        moved.save()
+        assert counters(author) == (1, 1, 10)
+        assert counters(other) == (1, 0, 4)
+
+        comment.delete()
+        titles[0].delete()
+        assert counters(author) == (0, 0, 0)
+
+    def test_failed_write_rolls_back_counters(self, titles, author):
+        from django.db import IntegrityError, transaction
+        from reviews.models import Review
+
+        Review.objects.create(
+            title=titles[0], author=author, text='Отзыв', score=8)
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Review.objects.create(
+                title=titles[0], author=author, text='Повтор', score=2)
+
+        assert counters(author) == (1, 0, 8)
+
+    def test_reconcile_drift(self, titles, author):
+        from reviews.models import Comment, Review, UserStats
+
+        review = Review.objects.create(
+            title=titles[0], author=author, text='Отзыв', score=7)
+        Comment.objects.create(review=review, author=author, text='Да')
+        UserStats.objects.update(review_count=5, score_sum=0)
+
+        call_command('recalculate_user_stats')
+
+        stats = UserStats.objects.get(user=author)
+        assert (stats.review_count, stats.comment_count, stats.score_sum) \
+            == (1, 1, 7)
+        assert stats.last_activity is not None
+
+
+@pytest.mark.django_db
+class TestUserStatsEndpoints:
+
+    def test_me_and_admin_views(self, api_client, titles, author, admin):
+        from reviews.models import Review
+
+        for title, score in zip(titles, (9, 6)):
+            Review.objects.create(
+                title=title, author=author, text='Отзыв', score=score)
+
+        api_client.force_authenticate(author)
+        with CaptureQueriesContext(connection) as context:
+            stats = api_client.get('/api/v1/users/me/').json()['stats']
+        assert len(context) == 1
+        assert stats['reviews'] == 2
+        assert stats['comments'] == 0
+        assert stats['mean_score'] == 7.5
+        assert stats['last_activity'] is not None
+
+        api_client.force_authenticate(admin)
+        response = api_client.get('/api/v1/users/author/')
+        assert response.json()['stats'] == stats
+        assert api_client.get('/api/v1/users/admin/').json()['stats'] == {
+            'reviews': 0, 'comments': 0, 'mean_score': None,
+            'last_activity': None,
+        }